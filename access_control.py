@@ -2,8 +2,10 @@
 ROLE_SECTIONS = {
     "pending": {"dashboard"},
     "staff":   {"dashboard","manage", "medical","reports"},
-    "manager": {"dashboard", "add", "manage", "medical", "staff", "reports", "requests"},
-    "admin":   {"dashboard", "add", "manage", "medical", "staff", "user_admin", "reports", "requests"},
+    "manager": {"dashboard", "add", "manage", "medical", "staff", "reports", "requests",
+                "applications"},
+    "admin":   {"dashboard", "add", "manage", "medical", "staff", "user_admin", "reports", "requests",
+                "applications"},
 }
 
 
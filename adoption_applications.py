@@ -0,0 +1,477 @@
+# adoption_applications.py - Adoption Applications inbox
+#
+# Lists ADOPTION_APPLICATION a page at a time (keyset paging on
+# application_id, filtered by status and the session's branch in SQL) and
+# moves any number of selected applications to a new status in one
+# transaction:
+#   - only open applications (Pending / Under Review) can move
+#   - final statuses (Approved / Rejected / Withdrawn) get today's decision_date
+#   - approving marks the pet Adopted and rejects the pet's other open
+#     applications, all in the same transaction
+# Every changed row is logged in DATA_CHANGE.
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import mysql.connector
+
+from change_tracking import record_changes
+from schema_utils import ensure_index
+
+BG = "#F5F5F7"
+CARD_BG = "#FFFFFF"
+TEXT_PRIMARY = "#1D1D1F"
+TEXT_SECONDARY = "#86868B"
+BORDER = "#E5E5EA"
+
+OPEN_STATUSES = ("Pending", "Under Review")
+FINAL_STATUSES = ("Approved", "Rejected", "Withdrawn")
+STATUSES = OPEN_STATUSES + FINAL_STATUSES
+STATUS_FILTER_ALL = "all statuses"
+PAGE_SIZE = 100
+IN_CHUNK = 1000
+
+OTHER_ADOPTION_NOTE = "Pet adopted through another application"
+
+APPLICATION_COLUMNS = ("AppID", "Status", "Applied", "Decided", "Adopter",
+                       "PetID", "Pet", "PetStatus", "Notes")
+
+
+def ensure_application_indexes(connection):
+    """Status filter + keyset paging of the inbox."""
+    ensure_index(connection, "ADOPTION_APPLICATION", "idx_app_status_id",
+                 "status, application_id")
+
+
+def _chunks(ids):
+    for start in range(0, len(ids), IN_CHUNK):
+        yield ids[start:start + IN_CHUNK]
+
+
+def _marks(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+def _status_filter(status, column="a.status"):
+    # applications created without a status count as Pending
+    if status == "Pending":
+        return f"({column} = %s OR {column} IS NULL)", [status]
+    return f"{column} = %s", [status]
+
+
+def fetch_applications(connection, status: str = None, branch_id: int = None,
+                       after_id: int = None, limit: int = None):
+    """
+    Inbox listing.
+    - status: only applications with this status
+    - branch_id: only applications for pets of this branch
+    - after_id / limit: keyset paging on application_id
+    Returns list of tuples in APPLICATION_COLUMNS order.
+    """
+    where = []
+    params = []
+    if status:
+        sql, status_params = _status_filter(status)
+        where.append(sql)
+        params.extend(status_params)
+    if branch_id is not None:
+        where.append("p.shelter_branch_id = %s")
+        params.append(branch_id)
+    if after_id is not None:
+        where.append("a.application_id > %s")
+        params.append(after_id)
+
+    sql = """
+        SELECT a.application_id, COALESCE(a.status, 'Pending'), a.application_date,
+               a.decision_date, CONCAT(ad.first_name, ' ', ad.last_name),
+               a.pet_id, p.name, p.adoption_status, a.review_notes
+        FROM ADOPTION_APPLICATION a
+        LEFT JOIN ADOPTER ad ON ad.adopter_id = a.adopter_id
+        LEFT JOIN PET p ON p.pet_id = a.pet_id
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY a.application_id"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, tuple(params))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def count_by_status(connection, branch_id: int = None):
+    """{status: number of applications} (in one branch, or all)."""
+    sql = """
+        SELECT COALESCE(a.status, 'Pending'), COUNT(*)
+        FROM ADOPTION_APPLICATION a
+    """
+    params = ()
+    if branch_id is not None:
+        sql += " JOIN PET p ON p.pet_id = a.pet_id WHERE p.shelter_branch_id = %s"
+        params = (branch_id,)
+    sql += " GROUP BY COALESCE(a.status, 'Pending')"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return dict(cursor.fetchall())
+    finally:
+        cursor.close()
+
+
+def apply_transition(connection, application_ids, new_status, notes=None, audit=None):
+    """
+    Move several applications to new_status in one transaction.
+    notes (optional) replaces review_notes of the moved applications.
+    audit (optional): an audit_log.AuditLog to record the changes in.
+    Returns (changed application_ids, {application_id: reason not changed},
+    pet_ids marked Adopted, application_ids rejected because their pet was
+    adopted).
+    """
+    if new_status not in STATUSES:
+        raise ValueError(f"Unknown status: {new_status}")
+    ids = sorted({int(i) for i in application_ids})
+    skipped = {}
+    cur = connection.cursor()
+    try:
+        found = {}
+        for chunk in _chunks(ids):
+            cur.execute(f"""
+                SELECT application_id, COALESCE(status, 'Pending'), pet_id
+                FROM ADOPTION_APPLICATION
+                WHERE application_id IN ({_marks(chunk)})
+                FOR UPDATE
+            """, chunk)
+            found.update((app_id, (status, pet_id)) for app_id, status, pet_id in cur.fetchall())
+
+        moving = []
+        for app_id in ids:
+            if app_id not in found:
+                skipped[app_id] = "not found"
+            elif found[app_id][0] == new_status:
+                skipped[app_id] = f"already {new_status}"
+            elif found[app_id][0] not in OPEN_STATUSES:
+                skipped[app_id] = f"already decided ({found[app_id][0]})"
+            else:
+                moving.append(app_id)
+
+        adopted = []
+        if new_status == "Approved" and moving:
+            # lock the pets too; one approval per pet, the oldest application wins
+            pet_ids = sorted({found[a][1] for a in moving if found[a][1] is not None})
+            pets = {}
+            for chunk in _chunks(pet_ids):
+                cur.execute(f"""
+                    SELECT pet_id, adoption_status FROM PET
+                    WHERE pet_id IN ({_marks(chunk)})
+                    FOR UPDATE
+                """, chunk)
+                pets.update(cur.fetchall())
+            approved = []
+            for app_id in moving:
+                pet_id = found[app_id][1]
+                if pet_id not in pets:
+                    skipped[app_id] = "pet not found"
+                elif pets[pet_id] == "Adopted":
+                    skipped[app_id] = "pet already adopted"
+                elif pet_id in adopted:
+                    continue        # an older selected one won; rejected below
+                else:
+                    approved.append(app_id)
+                    adopted.append(pet_id)
+            moving = approved
+
+        changes = []
+        stamp = ", decision_date = CURDATE()" if new_status in FINAL_STATUSES else ""
+        for chunk in _chunks(moving):
+            cur.execute(f"""
+                UPDATE ADOPTION_APPLICATION
+                SET status = %s, review_notes = COALESCE(%s, review_notes){stamp}
+                WHERE application_id IN ({_marks(chunk)})
+            """, (new_status, notes or None, *chunk))
+        changes += [("ADOPTION_APPLICATION", "update", a) for a in moving]
+
+        rejected = []           # competing applications of adopted pets
+        for chunk in _chunks(sorted(adopted)):
+            cur.execute(f"""
+                UPDATE PET SET adoption_status = 'Adopted'
+                WHERE pet_id IN ({_marks(chunk)})
+            """, chunk)
+            # the pet's other open applications can no longer succeed
+            status_sql, status_params = _status_filter("Pending", "status")
+            cur.execute(f"""
+                SELECT application_id FROM ADOPTION_APPLICATION
+                WHERE pet_id IN ({_marks(chunk)})
+                  AND ({status_sql} OR status = 'Under Review')
+                FOR UPDATE
+            """, (*chunk, *status_params))
+            competing = [a for (a,) in cur.fetchall()]
+            if competing:
+                cur.execute(f"""
+                    UPDATE ADOPTION_APPLICATION
+                    SET status = 'Rejected', decision_date = CURDATE(),
+                        review_notes = COALESCE(review_notes, %s)
+                    WHERE application_id IN ({_marks(competing)})
+                """, (OTHER_ADOPTION_NOTE, *competing))
+            changes += [("PET", "update", p) for p in chunk]
+            changes += [("ADOPTION_APPLICATION", "update", a) for a in competing]
+            rejected += competing
+
+        record_changes(cur, changes)
+        connection.commit()
+        if audit is not None:
+            for app_id in moving:
+                audit.record("update", "ADOPTION_APPLICATION", app_id,
+                             {"status": found[app_id][0]}, {"status": new_status})
+            for pet_id in adopted:
+                audit.record("update", "PET", pet_id, {"adoption_status": pets[pet_id]},
+                             {"adoption_status": "Adopted"})
+            for app_id in rejected:
+                before = {"status": found[app_id][0]} if app_id in found else None
+                audit.record("update", "ADOPTION_APPLICATION", app_id, before,
+                             {"status": "Rejected"})
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cur.close()
+    return moving, skipped, adopted, rejected
+
+
+def init_applications(content, connection, reader=None, branch_scope=None, on_change=None,
+                      audit=None):
+    """
+    Creates the Adoption Applications frame (manager / admin).
+    reader: returns the connection to list on (defaults to connection).
+    branch_scope: returns the session's branch_id, or None for all branches.
+    on_change: called after applications were moved (pets may be Adopted).
+    audit: an audit_log.AuditLog the transitions are recorded in.
+    Returns dict with:
+      {
+        "frame": <Frame>,
+        "refresh": <callable to refresh the inbox>
+      }
+    """
+    frame = tk.Frame(content, bg=BG)
+    frame.grid(row=0, column=0, sticky="nsew")
+
+    tk.Label(
+        frame,
+        text="Adoption Applications",
+        bg=BG,
+        fg=TEXT_PRIMARY,
+        font=("Segoe UI", 24, "bold")
+    ).pack(anchor="w", padx=40, pady=(30, 20))
+
+    container = tk.Frame(frame, bg=BG)
+    container.pack(fill="both", expand=True, padx=40, pady=(0, 30))
+
+    # Left: inbox table
+    table_card = tk.Frame(container, bg=CARD_BG,
+                          highlightthickness=1, highlightbackground=BORDER)
+    table_card.pack(side="left", fill="both", expand=True, padx=(0, 10))
+
+    tk.Label(
+        table_card,
+        text="Inbox",
+        bg=CARD_BG,
+        fg=TEXT_SECONDARY,
+        font=("Segoe UI", 11, "bold")
+    ).pack(anchor="w", padx=24, pady=(16, 4))
+
+    filter_row = tk.Frame(table_card, bg=CARD_BG)
+    filter_row.pack(fill="x", padx=24, pady=(0, 8))
+
+    status_filter_var = tk.StringVar(value="Pending")
+    ttk.Combobox(filter_row, textvariable=status_filter_var, width=14,
+                 values=(STATUS_FILTER_ALL,) + STATUSES,
+                 state="readonly").pack(side="left", padx=(0, 8))
+
+    counts_label = tk.Label(filter_row, text="", bg=CARD_BG,
+                            fg=TEXT_SECONDARY, font=("Segoe UI", 9))
+    counts_label.pack(side="left", padx=(8, 0))
+
+    tree = ttk.Treeview(table_card, columns=APPLICATION_COLUMNS, show="headings",
+                        height=18, selectmode="extended")
+    for col, w in zip(APPLICATION_COLUMNS, (60, 90, 90, 90, 150, 60, 110, 80, 200)):
+        tree.heading(col, text=col)
+        tree.column(col, width=w, anchor="w")
+
+    scroll = tk.Scrollbar(table_card, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scroll.set)
+    # Paging controls (packed before the tree so they stay at the bottom)
+    page_row = tk.Frame(table_card, bg=CARD_BG)
+    page_row.pack(side="bottom", fill="x", padx=24, pady=(4, 12))
+
+    tree.pack(side="left", fill="both", expand=True, padx=2, pady=(0, 4))
+    scroll.pack(side="right", fill="y")
+
+    # Right: decisions
+    side_card = tk.Frame(container, bg=CARD_BG,
+                         highlightthickness=1, highlightbackground=BORDER)
+    side_card.pack(side="left", fill="y", padx=(10, 0))
+
+    inner = tk.Frame(side_card, bg=CARD_BG)
+    inner.pack(fill="both", expand=True, padx=20, pady=20)
+
+    tk.Label(
+        inner,
+        text="Selected Applications",
+        bg=CARD_BG,
+        fg=TEXT_SECONDARY,
+        font=("Segoe UI", 11, "bold")
+    ).pack(anchor="w", pady=(0, 10))
+
+    selection_label = tk.Label(inner, text="None selected", bg=CARD_BG,
+                               fg=TEXT_PRIMARY, font=("Segoe UI", 10))
+    selection_label.pack(anchor="w", pady=(0, 6))
+
+    def on_select_page():
+        tree.selection_set(tree.get_children())
+
+    tk.Button(inner, text="Select whole page", command=on_select_page,
+              relief="flat", padx=10, cursor="hand2").pack(fill="x", pady=(0, 12))
+
+    tk.Label(
+        inner,
+        text="Review Notes (optional)",
+        bg=CARD_BG,
+        fg=TEXT_SECONDARY,
+        font=("Segoe UI", 9, "bold")
+    ).pack(anchor="w")
+    notes_var = tk.StringVar()
+    tk.Entry(
+        inner,
+        textvariable=notes_var,
+        bg="white",
+        fg=TEXT_PRIMARY,
+        relief="solid",
+        bd=1,
+        font=("Segoe UI", 10)
+    ).pack(fill="x", ipady=3, pady=(0, 12))
+
+    def on_transition(new_status):
+        app_ids = [tree.item(i, "values")[0] for i in tree.selection()]
+        if not app_ids:
+            messagebox.showwarning("No selection", "Select one or more applications first.")
+            return
+        if new_status == "Approved" and not messagebox.askyesno(
+            "Approve",
+            f"Approve {len(app_ids)} application(s)? Their pets will be marked "
+            "Adopted and other open applications for those pets rejected."
+        ):
+            return
+        try:
+            changed, skipped, adopted, rejected = apply_transition(
+                connection, app_ids, new_status, notes_var.get().strip() or None, audit)
+        except mysql.connector.Error as e:
+            messagebox.showerror("Error", f"Could not update applications:\n{e}")
+            return
+
+        message = f"{len(changed)} application(s) set to {new_status}."
+        if adopted:
+            message += f"\n{len(adopted)} pet(s) marked Adopted."
+        if rejected:
+            message += (f"\n{len(rejected)} other application(s) for those pets "
+                        "set to Rejected.")
+        if skipped:
+            reasons = [f"  #{a}: {why}" for a, why in sorted(skipped.items())[:10]]
+            if len(skipped) > 10:
+                reasons.append(f"  ... and {len(skipped) - 10} more")
+            message += f"\n\nNot changed ({len(skipped)}):\n" + "\n".join(reasons)
+        messagebox.showinfo("Applications Updated", message)
+        notes_var.set("")
+        if on_change is not None:
+            on_change()
+        refresh()
+
+    for label, new_status, color in (("Mark Under Review", "Under Review", "#007AFF"),
+                                     ("Approve", "Approved", "#34C759"),
+                                     ("Reject", "Rejected", "#FF3B30"),
+                                     ("Withdrawn", "Withdrawn", "#8E8E93")):
+        tk.Button(
+            inner,
+            text=label,
+            command=lambda s=new_status: on_transition(s),
+            bg=color,
+            fg="#000000",
+            relief="flat",
+            padx=12, pady=6,
+            font=("Segoe UI", 10, "bold"),
+            cursor="hand2"
+        ).pack(fill="x", pady=(0, 8))
+
+    # ---------- Refresh ----------
+    # Keyset paging state: after_id of every page visited so far
+    # (None for the first page) and whether a next page exists.
+    paging = {"starts": [None], "has_next": False}
+
+    def refresh():
+        for r in tree.get_children():
+            tree.delete(r)
+
+        status_filter = status_filter_var.get()
+        branch_id = branch_scope() if branch_scope else None
+        conn = reader() if reader else connection
+        try:
+            rows = fetch_applications(
+                conn,
+                status=None if status_filter == STATUS_FILTER_ALL else status_filter,
+                branch_id=branch_id,
+                after_id=paging["starts"][-1],
+                limit=PAGE_SIZE + 1,
+            )
+            counts = count_by_status(conn, branch_id)
+        except mysql.connector.Error as e:
+            messagebox.showerror("Error", f"Could not load applications:\n{e}")
+            return
+
+        paging["has_next"] = len(rows) > PAGE_SIZE
+        for row in rows[:PAGE_SIZE]:
+            tree.insert("", "end", values=tuple("" if v is None else v for v in row))
+
+        counts_label.config(text="   ".join(f"{s}: {counts.get(s, 0)}" for s in STATUSES))
+        page_label.config(text=f"Page {len(paging['starts'])}")
+        prev_btn.config(state="normal" if len(paging["starts"]) > 1 else "disabled")
+        next_btn.config(state="normal" if paging["has_next"] else "disabled")
+        selection_label.config(text="None selected")
+
+    def on_filter(*_):
+        paging["starts"] = [None]
+        refresh()
+
+    def on_next_page():
+        children = tree.get_children()
+        if not paging["has_next"] or not children:
+            return
+        last_id = tree.item(children[-1], "values")[0]
+        paging["starts"].append(int(last_id))
+        refresh()
+
+    def on_prev_page():
+        if len(paging["starts"]) > 1:
+            paging["starts"].pop()
+            refresh()
+
+    status_filter_var.trace_add("write", on_filter)
+
+    prev_btn = tk.Button(page_row, text="< Prev", command=on_prev_page,
+                         relief="flat", padx=10, cursor="hand2")
+    prev_btn.pack(side="left")
+    page_label = tk.Label(page_row, text="Page 1", bg=CARD_BG,
+                          fg=TEXT_SECONDARY, font=("Segoe UI", 9))
+    page_label.pack(side="left", padx=10)
+    next_btn = tk.Button(page_row, text="Next >", command=on_next_page,
+                         relief="flat", padx=10, cursor="hand2")
+    next_btn.pack(side="left")
+
+    def on_select(_event):
+        count = len(tree.selection())
+        selection_label.config(text=f"{count} selected" if count else "None selected")
+
+    tree.bind("<<TreeviewSelect>>", on_select)
+
+    return {"frame": frame, "refresh": refresh}
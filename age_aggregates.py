@@ -0,0 +1,150 @@
+# age_aggregates.py - pet age MIN / MAX / AVG kept up to date per group
+#
+# The age reports (system-wide statistics, age range per branch, average
+# age per species) only need count, sum, min and max per group. Instead of
+# re-aggregating PET for every report, AgeAggregates keeps them for every
+# combination of
+#   branch   all / one branch
+#   species  all / one species
+#   status   all pets / available pets only
+# and is told about each pet change (pet_columns.PetColumns forwards its
+# upserts and removals: the write paths and DATA_CHANGE catch-up).
+#
+# Count and sum are plain numbers. Min and max are two heaps per group with
+# lazy deletion: a removed age is remembered and popped once it reaches the
+# top, so a change costs O(log n) per group it touches (at most eight) and
+# reading a group's stats is O(1).
+import heapq
+from collections import Counter
+
+ANY = "any"     # group key part: not restricted (None is a real NULL branch / species)
+
+
+class AgeStats:
+    """count / sum / min / max of a multiset of ages, with removal."""
+
+    __slots__ = ("count", "total", "_low", "_high", "_gone_low", "_gone_high")
+
+    def __init__(self, ages=()):
+        self._low = list(ages)
+        self._high = [-age for age in self._low]
+        heapq.heapify(self._low)
+        heapq.heapify(self._high)
+        self.count = len(self._low)
+        self.total = sum(self._low)
+        self._gone_low = Counter()      # removed ages still in _low
+        self._gone_high = Counter()     # ... and in _high (negated)
+
+    def add(self, age):
+        self.count += 1
+        self.total += age
+        heapq.heappush(self._low, age)
+        heapq.heappush(self._high, -age)
+
+    def discard(self, age):
+        self.count -= 1
+        self.total -= age
+        self._gone_low[age] += 1
+        self._gone_high[-age] += 1
+        if len(self._low) > 2 * self.count + 64:
+            self._compact()
+        _prune(self._low, self._gone_low)
+        _prune(self._high, self._gone_high)
+
+    def _compact(self):
+        """Drop all removed ages at once, so the heaps stay O(count)."""
+        for heap, gone in ((self._low, self._gone_low), (self._high, self._gone_high)):
+            kept = []
+            for age in heap:
+                if gone[age]:
+                    gone[age] -= 1
+                else:
+                    kept.append(age)
+            heapq.heapify(kept)
+            heap[:] = kept
+            gone.clear()
+
+    @property
+    def min(self):
+        return self._low[0] if self.count else None
+
+    @property
+    def max(self):
+        return -self._high[0] if self.count else None
+
+    @property
+    def avg(self):
+        return self.total / self.count if self.count else None
+
+
+def _prune(heap, gone):
+    while heap and gone[heap[0]]:
+        gone[heap[0]] -= 1
+        heapq.heappop(heap)
+
+
+_EMPTY = AgeStats()
+
+
+def _keys(branch_id, species_id, available):
+    for status in ((False, True) if available else (False,)):
+        for branch in (ANY, branch_id):
+            for species in (ANY, species_id):
+                yield status, branch, species
+
+
+class AgeAggregates:
+    """AgeStats per (available only, branch, species) group of pets with an age."""
+
+    def __init__(self):
+        self._groups = {}       # (available only, branch_id or ANY, species_id or ANY) -> AgeStats
+        self._pets = {}         # pet_id -> (age, branch_id, species_id, available)
+
+    def build(self, pets):
+        """Start over from (pet_id, age, branch_id, species_id, available) tuples."""
+        ages = {}
+        self._pets = {}
+        for pet_id, age, branch_id, species_id, available in pets:
+            if age is None:
+                continue
+            self._pets[pet_id] = (age, branch_id, species_id, available)
+            for key in _keys(branch_id, species_id, available):
+                ages.setdefault(key, []).append(age)
+        self._groups = {key: AgeStats(found) for key, found in ages.items()}
+
+    def set_pet(self, pet_id, age, branch_id, species_id, available):
+        """Record a pet's current values (age None: not counted)."""
+        new = (age, branch_id, species_id, available) if age is not None else None
+        old = self._pets.get(pet_id)
+        if old == new:
+            return
+        if old is not None:
+            self.remove(pet_id)
+        if new is None:
+            return
+        self._pets[pet_id] = new
+        for key in _keys(branch_id, species_id, available):
+            stats = self._groups.get(key)
+            if stats is None:
+                stats = self._groups[key] = AgeStats()
+            stats.add(age)
+
+    def remove(self, pet_id):
+        old = self._pets.pop(pet_id, None)
+        if old is None:
+            return
+        age, branch_id, species_id, available = old
+        for key in _keys(branch_id, species_id, available):
+            stats = self._groups[key]
+            stats.discard(age)
+            if not stats.count:
+                del self._groups[key]
+
+    def stats(self, branch_id=ANY, species_id=ANY, available=False):
+        """AgeStats of one group (empty if it has no pets); do not modify it."""
+        return self._groups.get((available, branch_id, species_id), _EMPTY)
+
+    def by_species(self, branch_id=ANY, available=False):
+        """{species_id: AgeStats} within one branch (or all)."""
+        return {species: stats for (status, branch, species), stats in self._groups.items()
+                if status == available and branch == branch_id and species != ANY}
@@ -0,0 +1,194 @@
+# audit_log.py - who changed what, written behind the UI
+#
+# Every data change made from the app is recorded in AUDIT_LOG: the user,
+# the action, the table and key of the row, and the row before / after the
+# change as JSON. Writing those rows must not slow the screens down, so the
+# before / after values are the ones the caller already has (the row as the
+# screen loaded it, the values it wrote) - nothing is read back for the
+# log - and AuditLog is write-behind:
+#   - record() only puts the entry on a bounded in-memory queue,
+#   - a background thread with its own connection drains the queue every
+#     FLUSH_SECONDS in multi-row INSERTs of up to BATCH_SIZE entries,
+#   - stop() (logout / exit) wakes the thread for a last flush and waits
+#     up to STOP_SECONDS for it; what it could not write is reported back
+#     to the caller (and kept in last_error) for the UI to show.
+# While the server is unreachable (offline mode) the thread keeps retrying;
+# if the queue fills up meanwhile, record() waits BLOCK_SECONDS at most and
+# then drops the entry, counting it in `dropped`.
+#
+# Password hashes and SSNs never go into the log (REDACTED_COLUMNS).
+import json
+import queue
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+
+from db_config import DB_CONFIG
+
+REDACTED_COLUMNS = {"password_hash", "ssn"}
+REDACTED = "***"
+
+MAX_QUEUE = 10000
+BATCH_SIZE = 200
+FLUSH_SECONDS = 2
+RETRY_SECONDS = 15
+BLOCK_SECONDS = 0.5
+STOP_SECONDS = 5
+
+
+def ensure_audit_table(connection):
+    """
+    Create AUDIT_LOG if it does not exist.
+    Safe to call every time at startup.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS AUDIT_LOG (
+                audit_id       BIGINT AUTO_INCREMENT PRIMARY KEY,
+                changed_at     DATETIME NOT NULL,
+                user_id        INT NULL,
+                username       VARCHAR(50) NULL,
+                action         VARCHAR(30) NOT NULL,
+                table_name     VARCHAR(64) NOT NULL,
+                row_key        VARCHAR(64) NULL,
+                before_values  TEXT NULL,
+                after_values   TEXT NULL,
+                KEY idx_audit_row (table_name, row_key),
+                KEY idx_audit_time (changed_at)
+            )
+        """)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.hex()
+    return value
+
+
+def _redacted(values):
+    return {column: REDACTED if column in REDACTED_COLUMNS and value is not None
+            else _plain(value) for column, value in values.items()}
+
+
+def _json(values):
+    if values is None:
+        return None
+    return json.dumps(_redacted(values), default=str, sort_keys=True)
+
+
+class AuditLog:
+    """Write-behind audit trail for one logged-in user."""
+
+    def __init__(self, user_id=None, username=None, config=DB_CONFIG, max_queue=MAX_QUEUE):
+        self.user_id = user_id
+        self.username = username
+        self.config = config
+        self.dropped = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._batch = []                # taken off the queue, not written yet
+        self._stopping = threading.Event()
+        self._thread = None
+
+    # ---------- API used by the UI thread ----------
+    def record(self, action, table_name, key, before=None, after=None):
+        """Queue one entry; before / after are dicts of column -> value."""
+        entry = (datetime.now().replace(microsecond=0), action, table_name.upper(),
+                 None if key is None else str(key), before, after)
+        try:
+            self._queue.put(entry, timeout=BLOCK_SECONDS)
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="audit-log", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=STOP_SECONDS):
+        """
+        Flush what is queued and end the thread (waits up to timeout seconds).
+        Returns a message about entries that were not written (None if all
+        were), also kept in last_error.
+        """
+        if self._stopping.is_set() and not (self._thread and self._thread.is_alive()):
+            return None     # already stopped
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        left = self._queue.qsize() + len(self._batch)
+        if not left and not self.dropped:
+            return None
+        message = f"{left} audit entr(ies) not written, {self.dropped} dropped"
+        if self.last_error:
+            message += f" ({self.last_error})"
+        self.last_error = message
+        return message
+
+    # ---------- background thread ----------
+    def _flush(self, connection):
+        """Write everything queued, BATCH_SIZE rows per INSERT."""
+        while True:
+            while len(self._batch) < BATCH_SIZE:
+                try:
+                    self._batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._batch:
+                return
+            rows = [(changed_at, self.user_id, self.username, action, table_name, key,
+                     _json(before), _json(after))
+                    for changed_at, action, table_name, key, before, after in self._batch]
+            cursor = connection.cursor()
+            try:
+                cursor.executemany("""
+                    INSERT INTO AUDIT_LOG
+                    (changed_at, user_id, username, action, table_name, row_key,
+                     before_values, after_values)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                """, rows)
+                connection.commit()
+            finally:
+                cursor.close()
+            self._batch = []
+
+    def _run(self):
+        connection = None
+        while True:
+            stopping = self._stopping.wait(FLUSH_SECONDS)
+            try:
+                if connection is None and (self._batch or not self._queue.empty()):
+                    connection = mysql.connector.connect(**self.config)
+                    ensure_audit_table(connection)
+                if connection is not None:
+                    self._flush(connection)
+                self.last_error = None
+            except mysql.connector.Error as e:
+                self.last_error = e
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except mysql.connector.Error:
+                        pass
+                connection = None
+                if not stopping:
+                    # interrupted by stop() for one last attempt
+                    self._stopping.wait(RETRY_SECONDS)
+                    continue
+            if stopping:
+                break
+        if connection is not None:
+            try:
+                connection.close()
+            except mysql.connector.Error:
+                pass
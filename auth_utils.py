@@ -1,5 +1,7 @@
 import hashlib
 import mysql.connector
+
+from schema_utils import ensure_index
 # Constant salt for project (password hashing)
 _SALT = b"pet_adoption_salt_2025"
 
@@ -47,6 +49,11 @@ def ensure_user_table(connection):
     connection.commit()
     cursor.close()
 
+    # Prefix search and role filtering on the User Management screen
+    ensure_index(connection, "USER_ACCOUNT", "idx_user_email", "email")
+    ensure_index(connection, "USER_ACCOUNT", "idx_user_full_name", "full_name")
+    ensure_index(connection, "USER_ACCOUNT", "idx_user_role", "role, user_id")
+
 
 def create_user(connection, username: str, plain_password: str,
                 full_name: str = None, email: str = None, phone: str = None,
@@ -98,6 +105,26 @@ def authenticate_user(connection, username: str, plain_password: str):
     }
 
 
+def get_user_branch_id(connection, email: str):
+    """
+    Branch of the STAFF row linked to an account (matched on email),
+    or None if the user has no staff record.
+    """
+    if not email:
+        return None
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT shelter_branch_id
+            FROM STAFF
+            WHERE email = %s
+        """, (email,))
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return row[0] if row else None
+
+
 def update_user_role(connection, user_id: int, new_role: str):
     """
     Change a user's role (admin-only operation; enforce in GUI).
@@ -131,32 +158,55 @@ def update_user_password(connection, user_id: int, new_plain_password: str):
         cursor.close()
 
 
-def fetch_all_users(connection):
+# Column order of the tuples returned by fetch_all_users
+USER_COLUMNS = ("user_id", "username", "full_name", "email", "phone", "role", "created_at")
+
+
+def _like_prefix(text: str) -> str:
+    """
+    Escape LIKE wildcards in user input and turn it into a prefix pattern.
+    """
+    text = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return text + "%"
+
+
+def fetch_all_users(connection, search: str = None, role: str = None,
+                    after_id: int = None, limit: int = None):
     """
-    For future Admin User Management page.
-    Returns list of dicts: [{...}, ...]
+    Admin User Management listing.
+    - search: prefix match on username, email or full name
+    - role: only users with this role
+    - after_id / limit: keyset paging on user_id (pass the last user_id
+      of the previous page as after_id)
+    Returns list of tuples in USER_COLUMNS order.
     """
+    where = []
+    params = []
+    if search:
+        pattern = _like_prefix(search)
+        where.append("(username LIKE %s OR email LIKE %s OR full_name LIKE %s)")
+        params.extend((pattern, pattern, pattern))
+    if role:
+        where.append("role = %s")
+        params.append(role)
+    if after_id is not None:
+        where.append("user_id > %s")
+        params.append(after_id)
+
+    sql = """
+        SELECT user_id, username, full_name, email, phone, role, created_at
+        FROM USER_ACCOUNT
+    """
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += " ORDER BY user_id"
+    if limit is not None:
+        sql += " LIMIT %s"
+        params.append(limit)
+
     cursor = connection.cursor()
     try:
-        cursor.execute("""
-            SELECT user_id, username, full_name, email, phone, role, created_at
-            FROM USER_ACCOUNT
-            ORDER BY user_id
-        """)
-        rows = cursor.fetchall()
+        cursor.execute(sql, tuple(params))
+        return cursor.fetchall()
     finally:
         cursor.close()
-
-    users = []
-    for r in rows:
-        user_id, username, full_name, email, phone, role, created_at = r
-        users.append({
-            "user_id": user_id,
-            "username": username,
-            "full_name": full_name,
-            "email": email,
-            "phone": phone,
-            "role": role,
-            "created_at": created_at,
-        })
-    return users
@@ -0,0 +1,87 @@
+# change_tracking.py - append-only log of data changes
+#
+# Write paths call record_change() with the same cursor (and therefore in
+# the same transaction) as the change itself. Readers that keep derived
+# data (caches, replicas, rollups) compare change_id high-water marks
+# instead of re-reading whole tables.
+
+
+def ensure_change_table(connection):
+    """
+    Create DATA_CHANGE table if it does not exist.
+    Safe to call every time at startup.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS DATA_CHANGE (
+            change_id   BIGINT AUTO_INCREMENT PRIMARY KEY,
+            table_name  VARCHAR(64) NOT NULL,
+            row_id      INT NOT NULL,
+            op          ENUM('insert', 'update', 'delete') NOT NULL,
+            changed_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_change_table (table_name, change_id)
+        )
+    """)
+    connection.commit()
+    cursor.close()
+
+
+def record_change(cursor, table_name: str, op: str, row_id):
+    """
+    Log one changed row. Does not commit; the caller commits it together
+    with the change.
+    """
+    cursor.execute("""
+        INSERT INTO DATA_CHANGE (table_name, row_id, op)
+        VALUES (%s, %s, %s)
+    """, (table_name.upper(), row_id, op))
+
+
+def record_changes(cursor, changes):
+    """
+    Log several changed rows in one multi-row INSERT.
+    changes: iterable of (table_name, op, row_id). Does not commit.
+    """
+    rows = [(t.upper(), row_id, op) for t, op, row_id in changes]
+    if rows:
+        cursor.executemany("""
+            INSERT INTO DATA_CHANGE (table_name, row_id, op)
+            VALUES (%s, %s, %s)
+        """, rows)
+
+
+def latest_change_id(connection, table_name: str = None) -> int:
+    """
+    Highest change_id logged (for one table, or overall). 0 if none.
+    """
+    cursor = connection.cursor()
+    try:
+        if table_name:
+            cursor.execute(
+                "SELECT MAX(change_id) FROM DATA_CHANGE WHERE table_name = %s",
+                (table_name.upper(),)
+            )
+        else:
+            cursor.execute("SELECT MAX(change_id) FROM DATA_CHANGE")
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return (row[0] or 0) if row else 0
+
+
+def changed_rows(connection, table_name: str, since: int):
+    """
+    Rows of one table changed after change_id `since`:
+    list of (row_id, last change_id), one entry per row.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT row_id, MAX(change_id)
+            FROM DATA_CHANGE
+            WHERE table_name = %s AND change_id > %s
+            GROUP BY row_id
+        """, (table_name.upper(), since))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
@@ -0,0 +1,49 @@
+import os
+
+# Connection settings for the Pet_Adoption database.
+# Defaults match a local MySQL install; override with environment variables
+# (PET_DB_HOST, PET_DB_PORT, PET_DB_USER, PET_DB_PASSWORD, PET_DB_NAME).
+DB_CONFIG = {
+    "host": os.environ.get("PET_DB_HOST", "localhost"),
+    "port": int(os.environ.get("PET_DB_PORT", "3306")),
+    "user": os.environ.get("PET_DB_USER", "root"),
+    "password": os.environ.get("PET_DB_PASSWORD", ""),
+    "database": os.environ.get("PET_DB_NAME", "Pet_Adoption"),
+    "connection_timeout": int(os.environ.get("PET_DB_CONNECT_TIMEOUT", "10")),
+}
+
+# Optional read replica for reports, dashboard and list views. Set
+# PET_DB_REPLICA_HOST to enable it; the other settings default to the
+# primary's.
+REPLICA_CONFIG = None
+if os.environ.get("PET_DB_REPLICA_HOST"):
+    REPLICA_CONFIG = dict(
+        DB_CONFIG,
+        host=os.environ["PET_DB_REPLICA_HOST"],
+        port=int(os.environ.get("PET_DB_REPLICA_PORT", DB_CONFIG["port"])),
+        user=os.environ.get("PET_DB_REPLICA_USER", DB_CONFIG["user"]),
+        password=os.environ.get("PET_DB_REPLICA_PASSWORD", DB_CONFIG["password"]),
+    )
+
+# Reads go back to the primary when the replica is further behind than this
+REPLICA_MAX_LAG_SECONDS = int(os.environ.get("PET_DB_REPLICA_MAX_LAG", "5"))
+
+# Optional local SQLite replica of the core tables (see local_replica.py).
+# When set, list views read from this file and the app can start offline.
+LOCAL_REPLICA_PATH = os.environ.get("PET_LOCAL_REPLICA") or None
+
+# Reports are precomputed in the background (see report_scheduler.py):
+# at least every PET_REPORT_REFRESH seconds, and once writes have been quiet
+# for PET_REPORT_QUIET seconds.
+REPORT_REFRESH_SECONDS = int(os.environ.get("PET_REPORT_REFRESH", "300"))
+REPORT_QUIET_SECONDS = int(os.environ.get("PET_REPORT_QUIET", "10"))
+
+# Last report snapshots are kept here between runs (see report_cache.py)
+REPORT_CACHE_DIR = os.environ.get("PET_REPORT_CACHE_DIR") or os.path.join(
+    os.path.expanduser("~"), ".pet_adoption", "reports")
+
+# Pet photos (see pet_photos.py): the content-addressed photo store, and the
+# memory budget for thumbnails shown in the pet tables
+PHOTO_STORE_DIR = os.environ.get("PET_PHOTO_DIR") or os.path.join(
+    os.path.expanduser("~"), ".pet_adoption", "photos")
+THUMBNAIL_CACHE_BYTES = int(os.environ.get("PET_THUMB_CACHE_MB", "16")) * 1024 * 1024
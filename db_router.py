@@ -0,0 +1,124 @@
+# db_router.py - primary / read-replica connection routing
+#
+# Writes always use the primary. Reads that can tolerate a little lag
+# (reports, dashboard, list refreshes) use reader(), which returns the
+# replica only when
+#   - it is reachable and replicating,
+#   - its lag (Seconds_Behind_Source) is within max_lag, and
+#   - this session's last write is older than the lag, so the replica
+#     already has it (read-your-own-writes).
+# Otherwise the primary is returned.
+import time
+
+import mysql.connector
+
+LAG_CHECK_SECONDS = 10
+RETRY_REPLICA_SECONDS = 30
+
+
+class DatabaseRouter:
+    def __init__(self, primary_config, replica_config=None, max_lag=5):
+        self.primary = mysql.connector.connect(**primary_config)
+        self.replica_config = replica_config
+        self.max_lag = max_lag
+        self._replica = None
+        self._lag = None
+        self._lag_checked = 0.0
+        self._replica_down_until = 0.0
+        self._last_write = None
+
+    def mark_write(self):
+        """Call after committing on the primary."""
+        self._last_write = time.monotonic()
+
+    def replica_failed(self):
+        """Stop using the replica for a while after an error."""
+        if self._replica is not None:
+            try:
+                self._replica.close()
+            except mysql.connector.Error:
+                pass
+        self._replica = None
+        self._lag = None
+        self._replica_down_until = time.monotonic() + RETRY_REPLICA_SECONDS
+
+    def _replica_connection(self):
+        if self.replica_config is None:
+            return None
+        if time.monotonic() < self._replica_down_until:
+            return None
+        if self._replica is None:
+            try:
+                # Read-only use: autocommit so reads are not pinned to one snapshot
+                self._replica = mysql.connector.connect(**self.replica_config,
+                                                        autocommit=True)
+                self._lag_checked = 0.0
+            except mysql.connector.Error:
+                self.replica_failed()
+                return None
+        return self._replica
+
+    def replica_lag(self):
+        """
+        Seconds the replica is behind the primary, or None if it is not
+        replicating (or unreachable). Cached for LAG_CHECK_SECONDS.
+        """
+        replica = self._replica_connection()
+        if replica is None:
+            return None
+        now = time.monotonic()
+        if now - self._lag_checked < LAG_CHECK_SECONDS:
+            return self._lag
+
+        cur = replica.cursor(dictionary=True)
+        try:
+            try:
+                cur.execute("SHOW REPLICA STATUS")
+            except mysql.connector.Error:
+                # MySQL before 8.0.22
+                cur.execute("SHOW SLAVE STATUS")
+            row = cur.fetchone()
+        except mysql.connector.Error:
+            self.replica_failed()
+            return None
+        finally:
+            cur.close()
+
+        lag = None
+        if row:
+            lag = row.get("Seconds_Behind_Source", row.get("Seconds_Behind_Master"))
+        self._lag = lag
+        self._lag_checked = now
+        return lag
+
+    def reader(self):
+        """Connection to use for lag-tolerant reads."""
+        lag = self.replica_lag()
+        if lag is None or lag > self.max_lag:
+            return self.primary
+        if self._last_write is not None and time.monotonic() - self._last_write <= lag + 1:
+            return self.primary
+        return self._replica
+
+    def fetch_all(self, sql, params=()):
+        """
+        Run a SELECT on reader() and return all rows. Falls back to the
+        primary if the replica fails mid-query.
+        """
+        conn = self.reader()
+        try:
+            return _fetch_all(conn, sql, params)
+        except mysql.connector.Error:
+            if conn is self.primary:
+                raise
+            self.replica_failed()
+            return _fetch_all(self.primary, sql, params)
+
+
+def _fetch_all(connection, sql, params):
+    cur = connection.cursor()
+    try:
+        cur.execute(sql, params)
+        return cur.fetchall()
+    finally:
+        cur.close()
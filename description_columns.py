@@ -0,0 +1,114 @@
+# description_columns.py - age / size / color from PET.description as columns
+#
+# PET.age is whole years and often NULL, while the description carries the
+# real age, size and color ("1 YEAR 2 MONTHS, MED, TORTIE"). Those are kept
+# in indexed columns of their own:
+#   age_months  SMALLINT      14
+#   size        VARCHAR(10)   SMALL / MEDIUM / LARGE / XLARGE
+#   color       VARCHAR(100)  "TORTIE", "BROWN TABBY / WHITE"
+# so filters like "small, under 6 months" are index range scans instead of
+# LIKE scans over TEXT. add_pet / update_pet write them with the row; the
+# backfill below fills existing rows (and rows loaded in bulk) in batches.
+#
+# Run:  python description_columns.py [--batch-size 2000] [--all] [--pause 0.2]
+import argparse
+import time
+
+import mysql.connector
+
+from change_tracking import ensure_change_table, record_changes
+from db_config import DB_CONFIG
+from description_parser import parse_description
+from schema_utils import ensure_column, ensure_index
+
+DESCRIPTION_COLUMNS = ("age_months", "size", "color")
+COLOR_LENGTH = 100
+BATCH_SIZE = 2000
+
+
+def ensure_description_columns(connection):
+    """Add the parsed-description columns and their indexes if needed."""
+    ensure_column(connection, "PET", "age_months", "SMALLINT NULL")
+    ensure_column(connection, "PET", "size", "VARCHAR(10) NULL")
+    ensure_column(connection, "PET", "color", f"VARCHAR({COLOR_LENGTH}) NULL")
+    ensure_index(connection, "PET", "idx_pet_size_age", "size, age_months")
+    ensure_index(connection, "PET", "idx_pet_age_months", "age_months")
+    ensure_index(connection, "PET", "idx_pet_color", "color")
+
+
+def description_values(description):
+    """(age_months, size, color) for a description, in DESCRIPTION_COLUMNS order."""
+    parsed = parse_description(description)
+    color = parsed["color"]
+    if color is not None:
+        color = color[:COLOR_LENGTH]
+    return parsed["age_months"], parsed["size"], color
+
+
+def backfill(connection, batch_size=BATCH_SIZE, only_missing=True, pause=0.0):
+    """
+    Parse descriptions into the columns, batch_size pets per transaction.
+    only_missing: skip pets that already have any of the columns set
+    (pass False after a parser change). Returns the number of pets changed.
+    """
+    missing = ("AND age_months IS NULL AND size IS NULL AND color IS NULL"
+               if only_missing else "")
+    changed = 0
+    after_id = 0
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT pet_id, description, age_months, size, color
+                FROM PET
+                WHERE pet_id > %s AND description IS NOT NULL {missing}
+                ORDER BY pet_id
+                LIMIT %s
+            """, (after_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            after_id = rows[-1][0]
+
+            updates = []
+            for pet_id, description, *current in rows:
+                values = description_values(description)
+                if tuple(current) != values:
+                    updates.append((*values, pet_id))
+            if updates:
+                cursor.executemany("""
+                    UPDATE PET SET age_months = %s, size = %s, color = %s
+                    WHERE pet_id = %s
+                """, updates)
+                record_changes(cursor, [("PET", "update", u[-1]) for u in updates])
+                changed += len(updates)
+            connection.commit()
+            if pause:
+                time.sleep(pause)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill PET age_months / size / color "
+                                                 "from the descriptions")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--all", action="store_true",
+                        help="re-parse every pet, not just those not parsed yet")
+    parser.add_argument("--pause", type=float, default=0.0,
+                        help="seconds to sleep between batches")
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        ensure_change_table(connection)
+        ensure_description_columns(connection)
+        started = time.perf_counter()
+        changed = backfill(connection, args.batch_size, not args.all, args.pause)
+        print(f"Updated {changed} pet(s) in {time.perf_counter() - started:.1f}s")
+    finally:
+        connection.close()
@@ -0,0 +1,79 @@
+# description_parser.py - read age, size and color out of PET.description
+#
+# Intake descriptions follow the shelter's export format:
+#     "1 YEAR 2 MONTHS, MED, TORTIE"
+#     "NO AGE, SMALL, YELLOW / GREEN"
+# i.e. age, size, color separated by commas. Anything that does not fit is
+# left as None rather than guessed.
+import re
+
+# Size words as they appear in descriptions -> canonical size
+SIZES = {
+    "TOY": "SMALL", "SMALL": "SMALL", "SML": "SMALL",
+    "MED": "MEDIUM", "MEDIUM": "MEDIUM",
+    "LARGE": "LARGE", "LRG": "LARGE",
+    "X-LRG": "XLARGE", "XLRG": "XLARGE", "X-LARGE": "XLARGE", "XLARGE": "XLARGE",
+}
+SIZE_ORDER = ("SMALL", "MEDIUM", "LARGE", "XLARGE")
+
+# Abbreviations used in colors -> full word
+COLOR_WORDS = {
+    "BRN": "BROWN", "BLK": "BLACK", "WHT": "WHITE", "GRY": "GRAY", "GREY": "GRAY",
+    "SLVR": "SILVER", "ORG": "ORANGE", "TAB": "TABBY", "DIL": "DILUTE",
+    "CRM": "CREAM", "CHOC": "CHOCOLATE", "TRI": "TRICOLOR",
+}
+
+_AGE_PART = re.compile(r"(\d+)\s*(YEARS?|YRS?|MONTHS?|MOS?|WEEKS?|WKS?)\b")
+_WORD = re.compile(r"[A-Z0-9]+")
+
+
+def parse_age_months(text):
+    """'1 YEAR 2 MONTHS' -> 14, '9 MONTHS' -> 9; None for 'NO AGE' or no age."""
+    months = None
+    for number, unit in _AGE_PART.findall((text or "").upper()):
+        months = months or 0
+        if unit.startswith("Y"):
+            months += int(number) * 12
+        elif unit.startswith("M"):
+            months += int(number)
+        else:
+            months += int(number) // 4
+    return months
+
+
+def normalize_size(text):
+    return SIZES.get((text or "").strip().upper())
+
+
+def normalize_color(text):
+    """'BRN TABBY / WHITE' -> 'BROWN TABBY / WHITE'."""
+    parts = []
+    for part in (text or "").upper().split("/"):
+        words = [COLOR_WORDS.get(w, w) for w in _WORD.findall(part)]
+        if words:
+            parts.append(" ".join(words))
+    return " / ".join(parts) or None
+
+
+def color_tokens(color):
+    """Individual color words of a (normalized) color, e.g. {'BROWN', 'TABBY', 'WHITE'}."""
+    return set(_WORD.findall(normalize_color(color) or ""))
+
+
+def parse_description(description):
+    """
+    Returns {"age_months", "size", "color"} from a description; each value
+    is None when the description does not say.
+    """
+    parts = [p.strip() for p in (description or "").split(",")]
+    age_months = parse_age_months(parts[0]) if parts else None
+    size = None
+    color = None
+    for i, part in enumerate(parts[1:], start=1):
+        if normalize_size(part):
+            size = normalize_size(part)
+            # the color follows the size
+            if i + 1 < len(parts):
+                color = normalize_color(parts[i + 1])
+            break
+    return {"age_months": age_months, "size": size, "color": color}
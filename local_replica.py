@@ -0,0 +1,501 @@
+# local_replica.py - SQLite copy of the core tables for fast / offline reads
+#
+# PET, SPECIES, SHELTER_BRANCH, STAFF and MEDICAL_RECORD are mirrored into a local
+# SQLite file. The first sync copies them in batches; after that only rows
+# named in the DATA_CHANGE log since the last sync are re-read.
+#
+# While the server is unreachable the app keeps running on the local copy:
+# writes are applied locally and appended to a durable journal (in the same
+# SQLite file), which the background thread replays on MySQL in batches
+# once it can connect again. Each replayed batch also records its last
+# journal_id in JOURNAL_APPLIED in the same MySQL transaction, so a crash
+# between the server commit and the local cleanup never applies an entry
+# twice.
+#
+# Rows inserted offline get negative ids (-journal_id) locally and are
+# replaced by the server's copy after replay. Offline writes that refer to
+# such a row (e.g. a medical record for a pet added offline) cannot be
+# replayed and are kept in the journal with status 'failed'.
+import json
+import sqlite3
+import threading
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal
+
+import mysql.connector
+
+from change_tracking import latest_change_id, record_changes
+
+# table -> (primary key, columns)
+REPLICATED_TABLES = {
+    "SPECIES": ("species_id", (
+        "species_id", "name", "category", "aliases")),
+    "SHELTER_BRANCH": ("branch_id", (
+        "branch_id", "branch_name", "address", "phone", "capacity",
+        "manager_name")),
+    "STAFF": ("staff_id", (
+        "staff_id", "first_name", "last_name", "email", "phone", "role",
+        "hire_date", "ssn", "shelter_branch_id")),
+    "PET": ("pet_id", (
+        "pet_id", "name", "gender", "species", "breed", "age", "description",
+        "adoption_status", "arrival_date", "shelter_branch_id", "photo_hash",
+        "age_months", "size", "color", "species_id")),
+    "MEDICAL_RECORD": ("record_id", (
+        "record_id", "type", "date", "medication", "vet_staff_id",
+        "description", "pet_id")),
+}
+
+# Cached accounts of users who logged in on this machine (offline login)
+LOCAL_USER_COLUMNS = ("user_id", "username", "password_hash", "full_name",
+                      "email", "phone", "role", "created_at")
+
+SYNC_INTERVAL_SECONDS = 15
+LOAD_BATCH_SIZE = 2000
+CHANGE_BATCH_SIZE = 5000
+FLUSH_BATCH_SIZE = 200
+IN_CHUNK = 1000
+
+
+class LocalReplicaError(Exception):
+    pass
+
+
+def ensure_journal_table(connection):
+    """
+    Create JOURNAL_APPLIED (replayed offline journals, per client) on MySQL.
+    Safe to call every time at startup.
+    """
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS JOURNAL_APPLIED (
+            client_id   CHAR(36) NOT NULL,
+            journal_id  BIGINT NOT NULL,
+            applied_at  DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (client_id, journal_id)
+        )
+    """)
+    connection.commit()
+    cursor.close()
+
+
+def _to_sqlite(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat(sep=" ") if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+
+def _concat(*args):
+    # MySQL CONCAT: NULL if any argument is NULL
+    if any(a is None for a in args):
+        return None
+    return "".join(str(a) for a in args)
+
+
+def _sqlite_sql(sql):
+    return sql.replace("%s", "?")
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class LocalCursor:
+    """mysql.connector-like cursor over SQLite (%s placeholders, dictionary rows)."""
+
+    def __init__(self, cursor, read_only, dictionary):
+        self._cur = cursor
+        self._read_only = read_only
+        self._dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        if self._read_only and not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+            raise LocalReplicaError("This action needs the server; it is not available offline.")
+        self._cur.execute(_sqlite_sql(sql), tuple(params or ()))
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {d[0]: v for d, v in zip(self._cur.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cur.fetchone())
+
+    def fetchall(self):
+        return [self._row(r) for r in self._cur.fetchall()]
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cur.lastrowid
+
+    def close(self):
+        self._cur.close()
+
+
+class LocalConnection:
+    """Read-only mysql.connector-like wrapper so existing queries run on SQLite."""
+
+    def __init__(self, sconn):
+        self._conn = sconn
+
+    def cursor(self, dictionary=False):
+        return LocalCursor(self._conn.cursor(), True, dictionary)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class LocalReplica:
+    def __init__(self, path):
+        self.path = path
+        self.conn = self._open()        # used by the Tk (main) thread only
+        self._init_schema(self.conn)
+        self._sync_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._worker = None
+        self.online = None
+        self.last_error = None
+
+    # ---------- setup ----------
+    def _open(self):
+        sconn = sqlite3.connect(self.path, timeout=30)
+        sconn.execute("PRAGMA journal_mode=WAL")
+        sconn.create_function("CONCAT", -1, _concat, deterministic=True)
+        return sconn
+
+    def _init_schema(self, sconn):
+        for table, (pk, columns) in REPLICATED_TABLES.items():
+            others = ", ".join(c for c in columns if c != pk)
+            sconn.execute(f"CREATE TABLE IF NOT EXISTS {table} "
+                          f"({pk} INTEGER PRIMARY KEY, {others})")
+            # Columns added to REPLICATED_TABLES after the file was created
+            existing = {r[1] for r in sconn.execute(f"PRAGMA table_info({table})")}
+            for col in columns:
+                if col not in existing:
+                    sconn.execute(f"ALTER TABLE {table} ADD COLUMN {col}")
+        sconn.execute("CREATE INDEX IF NOT EXISTS idx_pet_branch ON PET (shelter_branch_id)")
+        sconn.execute("CREATE INDEX IF NOT EXISTS idx_pet_size_age ON PET (size, age_months)")
+        sconn.execute("CREATE INDEX IF NOT EXISTS idx_med_pet ON MEDICAL_RECORD (pet_id)")
+        sconn.execute(f"""
+            CREATE TABLE IF NOT EXISTS USER_ACCOUNT (
+                user_id INTEGER PRIMARY KEY,
+                {", ".join(LOCAL_USER_COLUMNS[1:])}
+            )
+        """)
+        sconn.execute("CREATE TABLE IF NOT EXISTS replica_meta (key TEXT PRIMARY KEY, value TEXT)")
+        sconn.execute("""
+            CREATE TABLE IF NOT EXISTS write_journal (
+                journal_id  INTEGER PRIMARY KEY AUTOINCREMENT,
+                table_name  TEXT,
+                op          TEXT NOT NULL,
+                sql         TEXT NOT NULL,
+                params      TEXT NOT NULL,
+                row_id      INTEGER,
+                status      TEXT NOT NULL DEFAULT 'pending',
+                error       TEXT,
+                created_at  TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        sconn.execute("INSERT OR IGNORE INTO replica_meta (key, value) "
+                      "VALUES ('client_id', lower(hex(randomblob(16))))")
+        sconn.commit()
+
+    def _meta(self, sconn, key):
+        row = sconn.execute("SELECT value FROM replica_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, sconn, key, value):
+        sconn.execute("INSERT OR REPLACE INTO replica_meta (key, value) VALUES (?, ?)",
+                      (key, str(value)))
+
+    def has_data(self):
+        """True once an initial copy has been loaded."""
+        return self._meta(self.conn, "change_id") is not None
+
+    # ---------- reads (main thread) ----------
+    def connection(self):
+        return LocalConnection(self.conn)
+
+    def fetch_all(self, sql, params=()):
+        return self.conn.execute(_sqlite_sql(sql), tuple(params)).fetchall()
+
+    def pending_writes(self):
+        return self.conn.execute(
+            "SELECT COUNT(*) FROM write_journal WHERE status = 'pending'"
+        ).fetchone()[0]
+
+    def remember_user(self, mysql_conn, user_id):
+        """Cache a logged-in user's account so they can log in offline."""
+        cur = mysql_conn.cursor()
+        try:
+            cur.execute(f"SELECT {', '.join(LOCAL_USER_COLUMNS)} FROM USER_ACCOUNT "
+                        f"WHERE user_id = %s", (user_id,))
+            row = cur.fetchone()
+        finally:
+            cur.close()
+        if row:
+            marks = ", ".join(["?"] * len(LOCAL_USER_COLUMNS))
+            self.conn.execute(f"INSERT OR REPLACE INTO USER_ACCOUNT VALUES ({marks})",
+                              [_to_sqlite(v) for v in row])
+            self.conn.commit()
+
+    # ---------- offline writes (main thread) ----------
+    def queue_write(self, table, op, sql, params, row_id=None):
+        """
+        Journal one INSERT/UPDATE/DELETE for later replay and apply it to
+        the local copy if the table is replicated.
+        Returns (row_id, rowcount); inserts get a negative local id.
+        """
+        params = [_to_sqlite(p) for p in params]
+        cur = self.conn.cursor()
+        try:
+            cur.execute("""
+                INSERT INTO write_journal (table_name, op, sql, params, row_id)
+                VALUES (?, ?, ?, ?, ?)
+            """, (table, op, sql, json.dumps(params), row_id))
+            journal_id = cur.lastrowid
+
+            count = 1
+            if table in REPLICATED_TABLES:
+                cur.execute(_sqlite_sql(sql), params)
+                count = cur.rowcount
+                if op == "insert":
+                    pk = REPLICATED_TABLES[table][0]
+                    row_id = -journal_id
+                    cur.execute(f"UPDATE {table} SET {pk} = ? WHERE rowid = ?",
+                                (row_id, cur.lastrowid))
+                    cur.execute("UPDATE write_journal SET row_id = ? WHERE journal_id = ?",
+                                (row_id, journal_id))
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cur.close()
+        return row_id, count
+
+    # ---------- sync ----------
+    def sync(self, mysql_conn, sconn=None, blocking=True):
+        """
+        Replay the journal, then bring the local copy up to date.
+        Returns False if another sync is already running and blocking=False.
+        """
+        sconn = sconn or self.conn
+        if not self._sync_lock.acquire(blocking=blocking):
+            return False
+        try:
+            self._flush_journal(mysql_conn, sconn)
+            if self._meta(sconn, "change_id") is None:
+                self._initial_load(mysql_conn, sconn)
+            else:
+                self._pull_changes(mysql_conn, sconn)
+            # end the read snapshot so the next sync sees new commits
+            mysql_conn.commit()
+        finally:
+            self._sync_lock.release()
+        return True
+
+    def _initial_load(self, mysql_conn, sconn):
+        # Take the high-water mark first: changes made during the copy are
+        # pulled again afterwards, which is harmless.
+        watermark = latest_change_id(mysql_conn)
+        cur = mysql_conn.cursor()
+        try:
+            for table, (pk, columns) in REPLICATED_TABLES.items():
+                sconn.execute(f"DELETE FROM {table} WHERE {pk} > 0")
+                last = None
+                while True:
+                    where = f"WHERE {pk} > %s" if last is not None else ""
+                    cur.execute(
+                        f"SELECT {', '.join(columns)} FROM {table} {where} "
+                        f"ORDER BY {pk} LIMIT %s",
+                        ((last,) if last is not None else ()) + (LOAD_BATCH_SIZE,)
+                    )
+                    rows = cur.fetchall()
+                    if not rows:
+                        break
+                    self._upsert(sconn, table, rows)
+                    last = rows[-1][0]
+        finally:
+            cur.close()
+        self._set_meta(sconn, "change_id", watermark)
+        sconn.commit()
+
+    def _pull_changes(self, mysql_conn, sconn):
+        watermark = int(self._meta(sconn, "change_id") or 0)
+        tables = tuple(REPLICATED_TABLES)
+        marks = ", ".join(["%s"] * len(tables))
+        cur = mysql_conn.cursor()
+        try:
+            while True:
+                cur.execute(f"""
+                    SELECT change_id, table_name, row_id
+                    FROM DATA_CHANGE
+                    WHERE change_id > %s AND table_name IN ({marks})
+                    ORDER BY change_id
+                    LIMIT %s
+                """, (watermark, *tables, CHANGE_BATCH_SIZE))
+                changes = cur.fetchall()
+                if not changes:
+                    break
+                changed = defaultdict(set)
+                for _, table, row_id in changes:
+                    changed[table].add(row_id)
+                for table, ids in changed.items():
+                    self._refresh_rows(cur, sconn, table, ids)
+                watermark = changes[-1][0]
+                self._set_meta(sconn, "change_id", watermark)
+                sconn.commit()
+        finally:
+            cur.close()
+
+    def _refresh_rows(self, cur, sconn, table, ids):
+        """Re-read changed rows from MySQL; rows no longer there are deleted."""
+        pk, columns = REPLICATED_TABLES[table]
+        for chunk in _chunks(ids, IN_CHUNK):
+            marks = ", ".join(["%s"] * len(chunk))
+            cur.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE {pk} IN ({marks})",
+                        tuple(chunk))
+            rows = cur.fetchall()
+            self._upsert(sconn, table, rows)
+            gone = set(chunk) - {r[0] for r in rows}
+            if gone:
+                sconn.executemany(f"DELETE FROM {table} WHERE {pk} = ?",
+                                  [(i,) for i in gone])
+
+    def _upsert(self, sconn, table, rows):
+        columns = REPLICATED_TABLES[table][1]
+        marks = ", ".join(["?"] * len(columns))
+        sconn.executemany(
+            f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) VALUES ({marks})",
+            [[_to_sqlite(v) for v in r] for r in rows]
+        )
+
+    def _flush_journal(self, mysql_conn, sconn):
+        client_id = self._meta(sconn, "client_id")
+        cur = mysql_conn.cursor()
+        try:
+            cur.execute("SELECT MAX(journal_id) FROM JOURNAL_APPLIED WHERE client_id = %s",
+                        (client_id,))
+            applied = cur.fetchone()[0] or 0
+            # Entries the server committed before we could clear them locally
+            self._forget_entries(sconn, "journal_id <= ? AND status = 'pending'", (applied,))
+
+            while True:
+                entries = sconn.execute("""
+                    SELECT journal_id, table_name, op, sql, params, row_id
+                    FROM write_journal
+                    WHERE status = 'pending'
+                    ORDER BY journal_id
+                    LIMIT ?
+                """, (FLUSH_BATCH_SIZE,)).fetchall()
+                if not entries:
+                    break
+                try:
+                    self._replay(cur, entries, client_id)
+                    mysql_conn.commit()
+                except (mysql.connector.IntegrityError, mysql.connector.DataError,
+                        mysql.connector.ProgrammingError):
+                    # A bad entry; replay one by one so only it is held back
+                    mysql_conn.rollback()
+                    for entry in entries:
+                        try:
+                            self._replay(cur, [entry], client_id)
+                            mysql_conn.commit()
+                        except (mysql.connector.IntegrityError, mysql.connector.DataError,
+                                mysql.connector.ProgrammingError) as e:
+                            mysql_conn.rollback()
+                            sconn.execute("UPDATE write_journal SET status = 'failed', error = ? "
+                                          "WHERE journal_id = ?", (str(e), entry[0]))
+                            sconn.commit()
+                last_id = entries[-1][0]
+                self._forget_entries(sconn, "journal_id <= ? AND status = 'pending'", (last_id,))
+        finally:
+            cur.close()
+
+    def _replay(self, cur, entries, client_id):
+        changes = []
+        for journal_id, table, op, sql, params, row_id in entries:
+            if row_id is not None and row_id < 0 and op != "insert":
+                raise mysql.connector.IntegrityError(
+                    msg=f"refers to a row created offline (local id {row_id})")
+            cur.execute(sql, tuple(json.loads(params)))
+            if table:
+                if op == "insert":
+                    changes.append((table, op, cur.lastrowid))
+                elif cur.rowcount:
+                    changes.append((table, op, row_id))
+        record_changes(cur, changes)
+        cur.execute("INSERT INTO JOURNAL_APPLIED (client_id, journal_id) VALUES (%s, %s)",
+                    (client_id, entries[-1][0]))
+
+    def _forget_entries(self, sconn, where, params):
+        """Delete replayed entries and the local placeholder rows of their inserts."""
+        rows = sconn.execute(
+            f"SELECT table_name, row_id FROM write_journal WHERE op = 'insert' AND {where}",
+            params
+        ).fetchall()
+        for table, row_id in rows:
+            if table in REPLICATED_TABLES and row_id is not None and row_id < 0:
+                pk = REPLICATED_TABLES[table][0]
+                sconn.execute(f"DELETE FROM {table} WHERE {pk} = ?", (row_id,))
+        sconn.execute(f"DELETE FROM write_journal WHERE {where}", params)
+        sconn.commit()
+
+    # ---------- background thread ----------
+    def start_background_sync(self, db_config, interval=SYNC_INTERVAL_SECONDS):
+        if self._worker is not None:
+            return
+        self._worker = threading.Thread(
+            target=self._sync_loop, args=(db_config, interval),
+            name="local-replica-sync", daemon=True
+        )
+        self._worker.start()
+
+    def sync_now(self):
+        self._wake.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+
+    def _sync_loop(self, db_config, interval):
+        sconn = self._open()        # SQLite connections are per-thread
+        mysql_conn = None
+        while not self._stop.is_set():
+            try:
+                if mysql_conn is None:
+                    mysql_conn = mysql.connector.connect(**db_config)
+                    ensure_journal_table(mysql_conn)
+                self.sync(mysql_conn, sconn)
+                self.online = True
+                self.last_error = None
+            except (mysql.connector.Error, sqlite3.Error) as e:
+                self.online = False
+                self.last_error = str(e)
+                if mysql_conn is not None:
+                    try:
+                        mysql_conn.close()
+                    except mysql.connector.Error:
+                        pass
+                mysql_conn = None
+            self._wake.wait(interval)
+            self._wake.clear()
+        if mysql_conn is not None:
+            mysql_conn.close()
+        sconn.close()
@@ -1,31 +1,205 @@
+import os
 import mysql.connector
 from tkinter import *
-from tkinter import ttk, messagebox
-from datetime import datetime
+from tkinter import ttk, messagebox, filedialog
+from datetime import datetime, timedelta
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from db_config import (DB_CONFIG, REPLICA_CONFIG, REPLICA_MAX_LAG_SECONDS,
+                       LOCAL_REPLICA_PATH)
+from db_router import DatabaseRouter
+from local_replica import LocalReplica, ensure_journal_table
+from audit_log import AuditLog
+from change_tracking import ensure_change_table, latest_change_id, record_change
+from schema_utils import ensure_index
+from pet_archive import ensure_archive_tables
+from trend_rollups import ensure_rollup_tables
+from adoption_applications import ensure_application_indexes
+from description_columns import description_values, ensure_description_columns
+from species import SpeciesCatalog, ensure_species_table, map_species
+from similar_pets import SimilarPets
+from pet_duplicates import DuplicateIndex
+from pet_facets import AGE_ORDER, FACETS, FACET_TITLES, FacetIndex
+from pet_photos import (PHOTO_TYPES, THUMB_SIZE, PhotoColumn, ThumbnailCache,
+                        ensure_photo_column, photos_supported, store_photo)
+
 # ---------- DATABASE CONNECTION ----------
-connection = mysql.connector.connect(
-    host='localhost',
-    user='root',
-    password='',
-    database='Pet_Adoption'
-)
-cursor = connection.cursor()
+# Writes use `connection` (the primary). Dashboard, list and report reads go
+# through router.reader() / router.fetch_all(), which use the read replica
+# when one is configured and caught up.
+#
+# With PET_LOCAL_REPLICA set, pet/branch/staff/medical lists read from a
+# local SQLite copy instead, and if MySQL is unreachable at startup the app
+# runs OFFLINE on that copy, journaling writes until the server is back.
+local = LocalReplica(LOCAL_REPLICA_PATH) if LOCAL_REPLICA_PATH else None
+OFFLINE = False
+try:
+    router = DatabaseRouter(DB_CONFIG, REPLICA_CONFIG, max_lag=REPLICA_MAX_LAG_SECONDS)
+    connection = router.primary
+    cursor = connection.cursor()
+except mysql.connector.Error as e:
+    if local is None or not local.has_data():
+        raise
+    print(f"MySQL unreachable ({e}); starting in offline mode")
+    OFFLINE = True
+    router = None
+    connection = local.connection()     # read-only, for login
+    cursor = None
+
+if not OFFLINE:
+    ensure_change_table(connection)
+    # Branch-scoped sessions filter on shelter_branch_id first
+    ensure_index(connection, "PET", "idx_pet_branch_status_age",
+                 "shelter_branch_id, adoption_status, age")
+    ensure_index(connection, "PET", "idx_pet_branch_species",
+                 "shelter_branch_id, species")
+    ensure_index(connection, "STAFF", "idx_staff_branch_role",
+                 "shelter_branch_id, role")
+    ensure_index(connection, "MEDICAL_RECORD", "idx_med_pet_date",
+                 "pet_id, date")
+    ensure_photo_column(connection)
+    ensure_description_columns(connection)
+    ensure_species_table(connection)
+    # Pets added by older clients / other tools (a no-op once all are mapped)
+    map_species(connection)
+    ensure_application_indexes(connection)
+    # History tables + all-time views used by the reports
+    ensure_archive_tables(connection)
+    ensure_rollup_tables(connection)
+    if local is not None:
+        ensure_journal_table(connection)
+        if not local.has_data():
+            print("Copying data into the local replica...")
+        local.sync(connection)
+if local is not None:
+    local.start_background_sync(DB_CONFIG)
+
+
+def commit():
+    try:
+        if not OFFLINE:     # offline, queued writes are committed to the local journal
+            connection.commit()
+            after_commit()
+        # Audit entries of the writes just committed
+        for entry in pending_audit:
+            audit.record(*entry)
+    finally:
+        pending_audit.clear()
+
+
+def rollback():
+    """Drop the writes since the last commit() (and their audit entries) after a failure."""
+    if OFFLINE:
+        commit()        # each queued write is already in the local journal: keep its entry
+        return
+    pending_audit.clear()
+    try:
+        connection.rollback()
+    except mysql.connector.Error:
+        pass            # connection lost: the server drops the transaction anyway
+
+
+def after_commit():
+    """Bookkeeping after a commit on `connection` (also by modules that commit themselves)."""
+    router.mark_write()
+    if local is not None:
+        # pick up our own change now unless the background sync is busy
+        if not local.sync(connection, blocking=False):
+            local.sync_now()
+
+
+# (action, table, key, before, after) of writes not committed yet
+pending_audit = []
+
+# Columns the write paths below set or show, for their audit entries
+PET_INSERT_COLUMNS = ("name", "gender", "species", "breed", "age", "description",
+                      "arrival_date", "shelter_branch_id", "photo_hash",
+                      "age_months", "size", "color", "species_id")
+PET_UPDATE_COLUMNS = ("name", "age", "description", "age_months", "size", "color",
+                      "photo_hash")
+MEDICAL_COLUMNS = ("type", "date", "medication", "vet_staff_id", "description", "pet_id")
+STAFF_COLUMNS = ("first_name", "last_name", "email", "phone", "role", "ssn",
+                 "hire_date", "shelter_branch_id")
+REQUEST_COLUMNS = ("staff_user_id", "action", "record_id", "pet_id", "type",
+                   "medication", "vet_staff_id", "date", "notes")
+
+
+def execute_write(table, op, sql, params, row_id=None, audit_table=None,
+                  before=None, after=None):
+    """
+    Run one INSERT / UPDATE / DELETE and log it in DATA_CHANGE (table=None
+    for tables that are not tracked), or queue it in the local journal
+    while offline. The caller commits with commit().
+    The change also goes to the audit log (under audit_table for untracked
+    tables) once commit() has run. before / after are the values the caller
+    already has (the row as the screen loaded it, the form values written);
+    the row is not read again for the log (see current_row for writes that
+    have not read it).
+    Returns (row_id, rowcount); row_id is the new id for inserts.
+    """
+    audited = table or audit_table
+    if OFFLINE:
+        row_id, count = local.queue_write(table, op, sql, params, row_id)
+    else:
+        cursor.execute(sql, params)
+        count = cursor.rowcount
+        if op == "insert":
+            row_id = cursor.lastrowid
+        if table and count:
+            record_change(cursor, table, op, row_id)
+    if audited and count:
+        pending_audit.append((op, audited, row_id, before, after))
+    return row_id, count
+
+
+def read_rows(sql, params=()):
+    """Pet / branch / staff / medical list reads."""
+    if local is not None:
+        return local.fetch_all(sql, params)
+    return router.fetch_all(sql, params)
+
+
+def read_connection():
+    return local.connection() if local is not None else router.reader()
+
+
+def fetch_one(sql, params=()):
+    """Lookups on the write path: the primary, or the local copy offline."""
+    if OFFLINE:
+        rows = local.fetch_all(sql, params)
+        return rows[0] if rows else None
+    cursor.execute(sql, params)
+    return cursor.fetchone()
+
+
+def current_row(table, key_column, key, columns):
+    """
+    A row as it is now, as a dict over columns; None if there is none.
+    Before-values for the audit log of a write that did not read the row.
+    """
+    row = fetch_one(f"SELECT {', '.join(columns)} FROM {table} WHERE {key_column}=%s", (key,))
+    return dict(zip(columns, row)) if row is not None else None
+
 
-cursor.execute("SELECT branch_id, branch_name FROM SHELTER_BRANCH")
-branches = cursor.fetchall()
+branches = read_rows("SELECT branch_id, branch_name FROM SHELTER_BRANCH")
 branch_options = {f"{name} (ID {bid})": bid for bid, name in branches}
+species_catalog = SpeciesCatalog.load(local.connection() if OFFLINE else connection)
 
-print("Connected successfully to Pet_Adoption database")
+if OFFLINE:
+    print("Running on the local replica (offline)")
+else:
+    print("Connected successfully to Pet_Adoption database")
 
-from auth_utils import ensure_user_table
+from auth_utils import ensure_user_table, get_user_branch_id
+from pet_queries import fetch_species_counts, fetch_branch_counts
 from login_screen import show_login
 from access_control import can_access
 from user_management import init_user_management
 from profile_dialog import open_change_password_dialog
 from reports_view import init_reports
+from adoption_applications import init_applications
+from report_scheduler import ReportScheduler
 
 
 
@@ -56,7 +230,8 @@ INPUT_BG = "#FFFFFF"
 INPUT_BORDER = "#D1D1D6"
 INPUT_FOCUS = "#007AFF"
 
-ensure_user_table(connection)
+if not OFFLINE:
+    ensure_user_table(connection)
 
 # Login/signup before opening main app window
 current_user = show_login(connection)
@@ -67,8 +242,32 @@ if current_user is None:
 CURRENT_USER_ROLE = current_user["role"]
 CURRENT_USERNAME = current_user["username"]
 CURRENT_USER = current_user 
+if local is not None and not OFFLINE:
+    local.remember_user(connection, CURRENT_USER["user_id"])
 print(f"Logged in as {CURRENT_USERNAME} with role {CURRENT_USER_ROLE}")
 
+# Who changed what; written to AUDIT_LOG in the background
+audit = AuditLog(CURRENT_USER["user_id"], CURRENT_USERNAME)
+audit.start()
+
+# ---------- BRANCH SCOPE ----------
+# Lists, searches, dashboard cards and reports only show the user's own
+# branch (their STAFF row, matched on email). Admins can switch to any
+# branch or "All branches"; users without a staff record see everything.
+ALL_BRANCHES = "All branches"
+USER_BRANCH_ID = get_user_branch_id(read_connection(), CURRENT_USER.get("email"))
+branch_scope = {"branch_id": USER_BRANCH_ID}
+
+
+def scope_sql(column, keyword="AND"):
+    """
+    (sql, params) restricting column to the session's branch, e.g.
+    (" AND p.shelter_branch_id = %s", (2,)), or ("", ()) when unscoped.
+    """
+    if branch_scope["branch_id"] is None:
+        return "", ()
+    return f" {keyword} {column} = %s", (branch_scope["branch_id"],)
+
 
 # ---------- ROOT ----------
 root = Tk()
@@ -98,6 +297,9 @@ style.map("Treeview",
           background=[("selected", ACCENT_SOFT)],
           foreground=[("selected", ACCENT)])
 
+# Pet tables: rows tall enough for a photo thumbnail
+style.configure("Pets.Treeview", rowheight=max(32, THUMB_SIZE + 6))
+
 # Combobox styling
 style.configure("TCombobox",
                 fieldbackground=INPUT_BG,
@@ -120,14 +322,13 @@ frames = {}
 
 # ---------- HELPER: SUMMARY QUERIES ----------
 def get_species_counts():
-    cursor.execute("SELECT species, COUNT(*) FROM PET GROUP BY species")
-    rows = cursor.fetchall()
+    rows = fetch_species_counts(read_connection(), branch_id=branch_scope["branch_id"])
     cats = dogs = others = 0
-    for species, count in rows:
-        s = (species or "").strip().upper()
-        if "CAT" in s:
+    for species_id, count in rows:
+        category = species_catalog.category(species_id)
+        if category == "Cat":
             cats += count
-        elif "DOG" in s:
+        elif category == "Dog":
             dogs += count
         else:
             others += count
@@ -135,15 +336,42 @@ def get_species_counts():
     return total, cats, dogs, others
 
 
+# In-memory indexes over PET, built on first use: feature vectors for
+# "Similar pets" in Manage Pets, MinHash buckets for the duplicate check,
+# bitmaps for the Manage Pets filters
+similar_index = SimilarPets()
+duplicate_index = DuplicateIndex()
+facet_index = FacetIndex()
+
+
+def current_index(index):
+    """A PET index, loaded on first use and caught up after that."""
+    if OFFLINE:
+        if not index.loaded:
+            index.load(local.connection())
+        return index
+    reader = router.reader()
+    if not index.loaded:
+        # watermark first: a change landing mid-load is just applied twice
+        index.load(reader, latest_change_id(reader, "PET"))
+    else:
+        index.catch_up(reader)
+    return index
+
+
+def note_pet_changed(pet_id):
+    """Re-read a pet this client just wrote into the loaded PET indexes."""
+    if pet_id is None:
+        return
+    for index in (similar_index, duplicate_index, facet_index):
+        if index.loaded:
+            index.refresh_pets(local.connection() if OFFLINE else connection, [pet_id])
+    report_pets_changed([pet_id])
+
+
 def get_branch_counts():
-    cursor.execute("""
-        SELECT b.branch_name, COUNT(p.pet_id)
-        FROM SHELTER_BRANCH b
-        LEFT JOIN PET p ON p.shelter_branch_id = b.branch_id
-        GROUP BY b.branch_id, b.branch_name
-        ORDER BY b.branch_name
-    """)
-    return cursor.fetchall()
+    """(branch_id, branch_name, pet_count) per branch in the current scope."""
+    return fetch_branch_counts(read_connection(), branch_id=branch_scope["branch_id"])
 
 
 # ---------- CORE FUNCTIONS ----------
@@ -156,6 +384,17 @@ def clear_fields():
     entry_description.delete(0, END)
     entry_arrival.delete(0, END)
     branch_var.set("")
+    add_photo_var.set("")
+
+
+def choose_photo(var):
+    """Let the user pick an image file; its path goes into var."""
+    if not photos_supported():
+        set_status("Error: photo support needs the Pillow package.")
+        return
+    path = filedialog.askopenfilename(title="Choose a photo", filetypes=PHOTO_TYPES)
+    if path:
+        var.set(path)
 
 
 def add_pet():
@@ -169,11 +408,19 @@ def add_pet():
         arrival_date = entry_arrival.get().strip()
         selected_branch = branch_var.get()
         branch_id = branch_options.get(selected_branch)
+        photo_file = add_photo_var.get()
 
         if not name or not species:
             set_status("Error: Name and Species are required.")
             return
 
+        species_id = species_catalog.resolve(species)
+        if species_id is None:
+            known = ", ".join(sorted(species_catalog.names.values()))
+            set_status(f"Error: Unknown species '{species}'. Use one of: {known}.")
+            return
+        species = species_catalog.names[species_id]
+
         if age and not age.isdigit():
             set_status("Error: Age must be numeric.")
             return
@@ -185,21 +432,42 @@ def add_pet():
                 set_status("Error: Invalid date format (YYYY-MM-DD).")
                 return
 
+        # Re-entered animals: same name / breed / description as an existing pet
+        duplicates = current_index(duplicate_index).candidates(name, species, breed, description)
+        if duplicates:
+            listed = "\n".join(
+                f"  ID {pid}: {duplicate_index.info[pid][0]} "
+                f"({duplicate_index.info[pid][1]}, {duplicate_index.info[pid][2]}) - {score:.0%}"
+                for pid, score in duplicates[:5])
+            if not messagebox.askyesno(
+                    "Possible duplicate",
+                    f"This looks like a pet that is already on file:\n{listed}\n\nAdd it anyway?"):
+                set_status("Not added: possible duplicate.")
+                return
+
+        # Copy the photo into the store first; the row only keeps its hash
+        photo_hash = store_photo(photo_file) if photo_file else None
+
         sql = """
         INSERT INTO PET
-        (name, gender, species, breed, age, description, arrival_date, shelter_branch_id)
-        VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+        (name, gender, species, breed, age, description, arrival_date, shelter_branch_id,
+         photo_hash, age_months, size, color, species_id)
+        VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
         """
         values = (name, gender, species, breed, age or None,
-                  description, arrival_date or None, branch_id)
-        cursor.execute(sql, values)
-        connection.commit()
+                  description, arrival_date or None, branch_id, photo_hash,
+                  *description_values(description), species_id)
+        pet_id, _ = execute_write("PET", "insert", sql, values,
+                                  after=dict(zip(PET_INSERT_COLUMNS, values)))
+        commit()
+        note_pet_changed(pet_id)
 
         set_status(f"Added pet '{name}'.")
         clear_fields()
         refresh_dashboard()
         refresh_manage_table()
     except Exception as e:
+        rollback()
         set_status(f"Error: {e}")
 
 
@@ -209,9 +477,20 @@ def delete_pet():
         set_status("Error: Enter Pet ID to delete.")
         return
     try:
-        cursor.execute("DELETE FROM PET WHERE pet_id=%s", (pet_id,))
-        connection.commit()
-        if cursor.rowcount == 0:
+        # No foreign key on the partitioned MEDICAL_RECORD to stop this
+        if fetch_one("SELECT record_id FROM medical_record WHERE pet_id=%s LIMIT 1",
+                     (pet_id,)) is not None:
+            set_status("Error: this pet has medical records and cannot be deleted.")
+            return
+        before = current_row("PET", "pet_id", pet_id, PET_INSERT_COLUMNS)
+        if before is None:
+            set_status("No pet found with that ID.")
+            return
+        _, deleted = execute_write("PET", "delete", "DELETE FROM PET WHERE pet_id=%s",
+                                   (pet_id,), pet_id, before=before)
+        commit()
+        note_pet_changed(pet_id)
+        if deleted == 0:
             set_status("No pet found with that ID.")
         else:
             set_status(f"Deleted Pet ID {pet_id}.")
@@ -219,6 +498,7 @@ def delete_pet():
         refresh_dashboard()
         refresh_manage_table()
     except Exception as e:
+        rollback()
         set_status(f"Error: {e}")
 
 
@@ -231,27 +511,44 @@ def update_pet():
     name = entry_upd_name.get().strip()
     age = entry_upd_age.get().strip()
     description = entry_upd_desc.get().strip()
+    photo_file = upd_photo_var.get()
 
     if age and not age.isdigit():
         set_status("Error: Age must be numeric.")
         return
 
     try:
-        cursor.execute("SELECT * FROM PET WHERE pet_id=%s", (pet_id,))
-        if cursor.fetchone() is None:
+        current = fetch_one(f"SELECT {', '.join(PET_UPDATE_COLUMNS)} FROM PET WHERE pet_id=%s",
+                            (pet_id,))
+        if current is None:
             set_status("No pet found with that ID.")
             return
 
-        cursor.execute(
-            "UPDATE PET SET name=%s, age=%s, description=%s WHERE pet_id=%s",
-            (name or None, age or None, description or None, pet_id)
+        # age_months / size / color follow the description
+        set_columns = PET_UPDATE_COLUMNS[:6]
+        params = [name or None, age or None, description or None,
+                  *description_values(description)]
+        if photo_file:
+            # Leave the current photo alone unless a new one was chosen
+            set_columns = PET_UPDATE_COLUMNS
+            params.append(store_photo(photo_file))
+        sets = ", ".join(f"{column}=%s" for column in set_columns)
+        execute_write(
+            "PET", "update",
+            f"UPDATE PET SET {sets} WHERE pet_id=%s",
+            params + [pet_id],
+            pet_id,
+            before=dict(zip(set_columns, current)),
+            after=dict(zip(set_columns, params))
         )
-        connection.commit()
+        commit()
+        note_pet_changed(pet_id)
         set_status(f"Updated Pet ID {pet_id}.")
         clear_update_fields()
         refresh_dashboard()
         refresh_manage_table()
     except Exception as e:
+        rollback()
         set_status(f"Error: {e}")
 
 
@@ -260,6 +557,7 @@ def clear_update_fields():
     entry_upd_name.delete(0, END)
     entry_upd_age.delete(0, END)
     entry_upd_desc.delete(0, END)
+    upd_photo_var.set("")
 
 def build_bar_chart(parent, title, labels, values):
     fig = Figure(figsize=(5, 2.4), dpi=100)
@@ -280,26 +578,127 @@ def search_pets():
         set_status("Showing all pets.")
         return
 
-    sql = """
-    SELECT pet_id, name, species, breed, age, shelter_branch_id
+    scope, scope_params = scope_sql("shelter_branch_id")
+    sql = f"""
+    SELECT pet_id, name, species, breed, age, shelter_branch_id, photo_hash
     FROM PET
-    WHERE name LIKE %s OR species LIKE %s OR breed LIKE %s
+    WHERE (name LIKE %s OR species LIKE %s OR breed LIKE %s){scope}
     """
     like = f"%{query}%"
-    cursor.execute(sql, (like, like, like))
-    rows = cursor.fetchall()
+    rows = read_rows(sql, (like, like, like) + scope_params)
     update_table(pet_table_manage, rows)
+    manage_photos.refresh()
     set_status(f"Search results for '{query}'.")
 
 
+# Manage Pets filters: facet -> selected values, and what each list shows
+facet_selection = {facet: set() for facet in FACETS}
+facet_lists = {}            # facet -> (Listbox, [value per line], [label per line])
+FACET_TABLE_LIMIT = 500
+branch_names = dict(branches)
+
+
+def facet_label(facet, value):
+    if facet == "branch" and value in branch_names:
+        return branch_names[value]
+    return str(value)
+
+
+def facet_order(facet, values):
+    if facet == "age":
+        return [v for v in AGE_ORDER if v in values]
+    return sorted(values, key=lambda v: facet_label(facet, v).upper())
+
+
+def show_facet(facet, counts):
+    """Update one filter list in place (rebuilt only when its values change)."""
+    listbox, values, labels = facet_lists[facet]
+    new_values = facet_order(facet, counts)
+    new_labels = [f"{facet_label(facet, v)} ({counts[v]})" for v in new_values]
+    if new_values != values:
+        listbox.delete(0, END)
+        for i, (value, label) in enumerate(zip(new_values, new_labels)):
+            listbox.insert(END, label)
+            if value in facet_selection[facet]:
+                listbox.selection_set(i)
+        facet_lists[facet] = (listbox, new_values, new_labels)
+        return
+    for i, (old, new) in enumerate(zip(labels, new_labels)):
+        if old != new:
+            selected = listbox.selection_includes(i)
+            listbox.delete(i)
+            listbox.insert(i, new)
+            if selected:
+                listbox.selection_set(i)
+    labels[:] = new_labels
+
+
+def apply_facets():
+    """
+    Update the filter counts; with any filter picked, also fill the table
+    with the matching pets. Returns True if the table was filled.
+    """
+    index = current_index(facet_index)
+    branch_id = branch_scope["branch_id"]
+    within = {"branch": {branch_id}} if branch_id is not None else None
+    bits, counts = index.filter(facet_selection, within)
+    for facet in FACETS:
+        show_facet(facet, counts[facet])
+    if not any(facet_selection.values()):
+        return False
+    rows = index.rows(bits, FACET_TABLE_LIMIT)
+    update_table(pet_table_manage, rows)
+    manage_photos.refresh()
+    total = bits.bit_count()
+    more = f"; showing the first {len(rows)}" if total > len(rows) else ""
+    set_status(f"{total} pet(s) match the filters{more}.")
+    return True
+
+
+def on_facet_select(facet):
+    listbox, values, _ = facet_lists[facet]
+    facet_selection[facet] = {values[i] for i in listbox.curselection()}
+    if not apply_facets():
+        refresh_manage_table()
+
+
+def clear_facets():
+    for facet in FACETS:
+        facet_selection[facet].clear()
+        facet_lists[facet][0].selection_clear(0, END)
+    refresh_manage_table()
+
+
 def refresh_manage_table():
-    cursor.execute("""
-        SELECT pet_id, name, species, breed, age, shelter_branch_id
-        FROM PET
+    if apply_facets():
+        return
+    scope, scope_params = scope_sql("shelter_branch_id", "WHERE")
+    rows = read_rows(f"""
+        SELECT pet_id, name, species, breed, age, shelter_branch_id, photo_hash
+        FROM PET{scope}
         ORDER BY pet_id
-    """)
-    rows = cursor.fetchall()
+    """, scope_params)
     update_table(pet_table_manage, rows)
+    manage_photos.refresh()
+
+
+# Dashboard branch cards, kept across refreshes: branch_id -> (card, name, count)
+branch_cards = {}
+branch_card_order = []
+
+
+def make_branch_card():
+    card = Frame(branch_cards_frame, bg=CARD_BG, bd=0, highlightthickness=1,
+                 highlightbackground=BORDER)
+    # Add inner padding
+    inner = Frame(card, bg=CARD_BG)
+    inner.pack(fill=BOTH, expand=True, padx=24, ipady=16)
+
+    name_label = Label(inner, bg=CARD_BG, fg=TEXT_SECONDARY, font=("Segoe UI", 10))
+    name_label.pack(anchor=W, pady=(4, 0))
+    count_label = Label(inner, bg=CARD_BG, fg=TEXT_PRIMARY, font=("Segoe UI", 20, "bold"))
+    count_label.pack(anchor=W, pady=(4, 4))
+    return card, name_label, count_label
 
 
 def refresh_dashboard():
@@ -310,42 +709,43 @@ def refresh_dashboard():
     dogs_label_val.config(text=str(dogs))
     others_label_val.config(text=str(others))
 
-    # Branch cards
-    for w in branch_cards_frame.winfo_children():
-        w.destroy()
-    
+    # Branch cards: one pooled card per branch, rebuilt only when branches change
     branch_list = get_branch_counts()
-    for idx, (name, count) in enumerate(branch_list):
+    branch_ids = [branch_id for branch_id, _, _ in branch_list]
+    for branch_id, name, count in branch_list:
+        if branch_id not in branch_cards:
+            branch_cards[branch_id] = make_branch_card()
+        _, name_label, count_label = branch_cards[branch_id]
         # Truncate name to just show county name
         display_name = name
         if "County" in name:
             display_name = name.split("County")[0] + "County"
-        
-        card = Frame(branch_cards_frame, bg=CARD_BG, bd=0, highlightthickness=1,
-                     highlightbackground=BORDER)
-        # First card has no left padding, rest have right padding
-        if idx == len(branch_list) - 1:
-            card.pack(side=LEFT, padx=0, pady=0, fill=BOTH, expand=True)
-        else:
-            card.pack(side=LEFT, padx=(0, 12), pady=0, fill=BOTH, expand=True)
-        
-        # Add inner padding
-        inner = Frame(card, bg=CARD_BG)
-        inner.pack(fill=BOTH, expand=True, padx=24, ipady=16)
-        
-        Label(inner, text=display_name, bg=CARD_BG, fg=TEXT_SECONDARY,
-              font=("Segoe UI", 10)).pack(anchor=W, pady=(4, 0))
-        Label(inner, text=str(count), bg=CARD_BG, fg=TEXT_PRIMARY,
-              font=("Segoe UI", 20, "bold")).pack(anchor=W, pady=(4, 4))
+        name_label.config(text=display_name)
+        count_label.config(text=str(count))
+
+    if branch_ids != branch_card_order:
+        for branch_id in list(branch_cards):
+            branch_cards[branch_id][0].pack_forget()
+            if branch_id not in branch_ids:
+                branch_cards.pop(branch_id)[0].destroy()
+        for idx, branch_id in enumerate(branch_ids):
+            card = branch_cards[branch_id][0]
+            # Last card has no right padding, the rest are spaced apart
+            if idx == len(branch_ids) - 1:
+                card.pack(side=LEFT, padx=0, pady=0, fill=BOTH, expand=True)
+            else:
+                card.pack(side=LEFT, padx=(0, 12), pady=0, fill=BOTH, expand=True)
+        branch_card_order[:] = branch_ids
 
     # Dashboard table
-    cursor.execute("""
-        SELECT pet_id, name, species, breed, age, shelter_branch_id
-        FROM PET
+    scope, scope_params = scope_sql("shelter_branch_id", "WHERE")
+    rows = read_rows(f"""
+        SELECT pet_id, name, species, breed, age, shelter_branch_id, photo_hash
+        FROM PET{scope}
         ORDER BY pet_id
-    """)
-    rows = cursor.fetchall()
+    """, scope_params)
     update_table(pet_table_dashboard, rows)
+    dashboard_photos.refresh()
 
 
 def update_table(tree, rows):
@@ -361,6 +761,8 @@ def set_status(text):
     if status_label is not None:
         status_label.config(text=text)
 
+current_frame = {"name": None}
+
 def show_frame(name):
     frame = frames.get(name)
     if not frame:
@@ -369,6 +771,7 @@ def show_frame(name):
     if not can_access(CURRENT_USER_ROLE, name):
         set_status("You do not have permission to access this section.")
         return
+    current_frame["name"] = name
 
     def _raise_and_status(msg=None):
         frame.tkraise()
@@ -399,6 +802,9 @@ def show_frame(name):
     elif name == "requests":
         refresh_reports()
         _raise_and_status("Requests Inbox")
+    elif name == "applications":
+        refresh_applications()
+        _raise_and_status("Adoption Applications")
 
 
 
@@ -467,7 +873,7 @@ req_scroll.pack(side=RIGHT, fill=Y)
 # ---------- REFRESH REQUESTS ----------
 def refresh_requests():
     try:
-        cursor.execute("""
+        rows = router.fetch_all("""
             SELECT r.request_id,
                    CONCAT(u.full_name, ' (', u.username, ')') AS staff_name,
                    r.action,
@@ -483,7 +889,6 @@ def refresh_requests():
             WHERE r.status = 'pending'
             ORDER BY r.request_id DESC
         """)
-        rows = cursor.fetchall()
         update_table(requests_table, rows)
         set_status(f"Requests: {len(rows)} pending")
     except Exception as e:
@@ -503,37 +908,58 @@ def on_approve_request():
     (req_id, staff_name, action, record_id, pet_id,
      r_type, med, vet, date, notes) = vals
 
+    if date in ("", "None"):
+        date = datetime.now().strftime("%Y-%m-%d")
+    if vet in ("", "None"):
+        vet = None
+
     try:
         # Apply the action
+        if action in ("add", "update"):
+            error = check_medical_refs(pet_id, vet)
+            if error:
+                messagebox.showerror("Cannot approve", error)
+                return
+
+        values = (r_type, date, med, vet, notes, pet_id)
         if action == "add":
-            cursor.execute("""
+            execute_write("MEDICAL_RECORD", "insert", """
                 INSERT INTO medical_record
                 (type, date, medication, vet_staff_id, description, pet_id)
                 VALUES (%s,%s,%s,%s,%s,%s)
-            """, (r_type, date, med, vet, notes, pet_id))
+            """, values, after=dict(zip(MEDICAL_COLUMNS, values)))
 
         elif action == "update":
-            cursor.execute("""
+            execute_write("MEDICAL_RECORD", "update", """
                 UPDATE medical_record
                 SET type=%s, date=%s, medication=%s,
                     vet_staff_id=%s, description=%s, pet_id=%s
                 WHERE record_id=%s
-            """, (r_type, date, med, vet, notes, pet_id, record_id))
+            """, values + (record_id,), record_id,
+                before=current_row("medical_record", "record_id", record_id, MEDICAL_COLUMNS),
+                after=dict(zip(MEDICAL_COLUMNS, values)))
 
         elif action == "delete":
-            cursor.execute("DELETE FROM medical_record WHERE record_id=%s", (record_id,))
-
-        cursor.execute(
+            execute_write("MEDICAL_RECORD", "delete",
+                          "DELETE FROM medical_record WHERE record_id=%s",
+                          (record_id,), record_id,
+                          before=current_row("medical_record", "record_id", record_id,
+                                             MEDICAL_COLUMNS))
+
+        execute_write(
+            None, "update",
             "UPDATE medical_change_request SET status='approved' WHERE request_id=%s",
-            (req_id,)
+            (req_id,), req_id, audit_table="MEDICAL_CHANGE_REQUEST",
+            before={"status": "pending"}, after={"status": "approved"}
         )
 
-        connection.commit()
+        commit()
         set_status(f"Approved request {req_id}.")
         refresh_requests()
         refresh_medical_table()
 
     except Exception as e:
+        rollback()
         messagebox.showerror("Error", f"Approval failed:\n{e}")
 
 def on_deny_request():
@@ -545,14 +971,17 @@ def on_deny_request():
     req_id = requests_table.item(sel, "values")[0]
 
     try:
-        cursor.execute(
+        execute_write(
+            None, "update",
             "UPDATE medical_change_request SET status='denied' WHERE request_id=%s",
-            (req_id,)
+            (req_id,), req_id, audit_table="MEDICAL_CHANGE_REQUEST",
+            before={"status": "pending"}, after={"status": "denied"}
         )
-        connection.commit()
+        commit()
         set_status(f"Denied request {req_id}.")
         refresh_requests()
     except Exception as e:
+        rollback()
         messagebox.showerror("Error", f"Denial failed:\n{e}")
 
 Button(
@@ -629,13 +1058,33 @@ Label(
 med_tbl_section = Frame(med_scrollable, bg=BG)
 med_tbl_section.pack(fill=BOTH, expand=True, padx=40, pady=(0, 30))
 
+med_tbl_header = Frame(med_tbl_section, bg=BG)
+med_tbl_header.pack(fill=X, pady=(0, 12))
+
 Label(
-    med_tbl_section,
+    med_tbl_header,
     text="Records",
     bg=BG,
     fg=TEXT_SECONDARY,
     font=("Segoe UI", 11, "bold")
-).pack(anchor="w", pady=(0, 12))
+).pack(side=LEFT)
+
+# Date window for the list. MEDICAL_RECORD is partitioned by month, so a
+# bounded window only reads the matching partitions.
+MEDICAL_WINDOWS = {
+    "Last 30 days": 30,
+    "Last 90 days": 90,
+    "Last 12 months": 365,
+    "All time": None,
+}
+med_window_var = StringVar(value="Last 12 months")
+med_window_box = ttk.Combobox(med_tbl_header, textvariable=med_window_var,
+                              values=list(MEDICAL_WINDOWS), state="readonly",
+                              width=16, font=("Segoe UI", 10))
+med_window_box.pack(side=RIGHT)
+med_window_box.bind("<<ComboboxSelected>>", lambda e: refresh_medical_table())
+Label(med_tbl_header, text="Show", bg=BG, fg=TEXT_SECONDARY,
+      font=("Segoe UI", 10)).pack(side=RIGHT, padx=(0, 8))
 
 med_tbl_container = Frame(
     med_tbl_section,
@@ -698,16 +1147,28 @@ medical_table.pack(side=LEFT, fill=BOTH, expand=True, padx=2, pady=2)
 med_scroll.pack(side=RIGHT, fill=Y)
 
 
+# vet_staff_id per record, keyed by str(record_id). The table only shows the
+# vet's name, so the edit form reads the id from here on selection.
+medical_details = {}
+
 def refresh_medical_table():
     """
     Loads medical records with joined pet + staff info.
 
     Columns returned (in order):
       record_id, pet_id, pet_name, type, medication, vet_name, date, description
-    This matches med_columns above.
+    This matches med_columns above. vet_staff_id is fetched as an extra
+    column and kept in medical_details.
     """
+    days = MEDICAL_WINDOWS.get(med_window_var.get())
+    if days is None:
+        window, window_params = "", ()
+    else:
+        since = (datetime.now() - timedelta(days=days)).date()
+        window, window_params = " WHERE mr.date >= %s", (since,)
+    scope, scope_params = scope_sql("p.shelter_branch_id", "AND" if window else "WHERE")
     try:
-        cursor.execute("""
+        rows = read_rows(f"""
             SELECT
                 mr.record_id,
                 mr.pet_id,
@@ -716,13 +1177,17 @@ def refresh_medical_table():
                 mr.medication,
                 CONCAT(s.first_name, ' ', s.last_name) AS vet_name,
                 mr.date,
-                mr.description
+                mr.description,
+                mr.vet_staff_id
             FROM medical_record mr
             LEFT JOIN pet   p ON p.pet_id   = mr.pet_id
-            LEFT JOIN staff s ON s.staff_id = mr.vet_staff_id
+            LEFT JOIN staff s ON s.staff_id = mr.vet_staff_id{window}{scope}
             ORDER BY mr.record_id DESC
-        """)
-        rows = cursor.fetchall()
+        """, window_params + scope_params)
+        medical_details.clear()
+        for r in rows:
+            medical_details[str(r[0])] = r[8]
+        rows = [r[:8] for r in rows]
         update_table(medical_table, rows)
         set_status(f"Medical Records: {len(rows)} row(s)")
     except mysql.connector.Error as e:
@@ -787,15 +1252,24 @@ def clear_med_form():
               entry_med_vet, entry_med_date, entry_med_notes):
         e.delete(0, END)
 
+def check_medical_refs(pet_id, vet_id):
+    """
+    MEDICAL_RECORD has no foreign keys once it is partitioned by date
+    (medical_partitions.py), so check the pet and vet exist before writing.
+    Returns an error message or None.
+    """
+    if pet_id and fetch_one("SELECT pet_id FROM PET WHERE pet_id=%s", (pet_id,)) is None:
+        return f"No pet found with ID {pet_id}."
+    if vet_id and fetch_one("SELECT staff_id FROM STAFF WHERE staff_id=%s", (vet_id,)) is None:
+        return f"No staff member found with ID {vet_id}."
+    return None
+
+
 def submit_medical_change_request(action, record_id=None, pet_id=None,
                                   r_type=None, medication=None, vet=None,
                                   date=None, notes=None):
     try:
-        cursor.execute("""
-            INSERT INTO medical_change_request
-            (staff_user_id, action, record_id, pet_id, type, medication, vet_staff_id, date, notes)
-            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
-        """, (
+        values = (
             CURRENT_USER["user_id"],
             action,
             record_id,
@@ -805,10 +1279,17 @@ def submit_medical_change_request(action, record_id=None, pet_id=None,
             vet,
             date,
             notes
-        ))
-        connection.commit()
+        )
+        execute_write(None, "insert", """
+            INSERT INTO medical_change_request
+            (staff_user_id, action, record_id, pet_id, type, medication, vet_staff_id, date, notes)
+            VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s)
+        """, values, audit_table="MEDICAL_CHANGE_REQUEST",
+            after=dict(zip(REQUEST_COLUMNS, values)))
+        commit()
         set_status(f"Request submitted for manager approval.")
     except Exception as e:
+        rollback()
         messagebox.showerror("Error", f"Could not submit request:\n{e}")
 
 def add_med_record():
@@ -820,7 +1301,8 @@ def add_med_record():
     r_type = entry_med_type.get().strip() or None
     med    = entry_med_med.get().strip() or None
     vet_id = entry_med_vet.get().strip() or None
-    date   = entry_med_date.get().strip() or None
+    # date is required (the partitioning key); default to today
+    date   = entry_med_date.get().strip() or datetime.now().strftime("%Y-%m-%d")
     notes  = entry_med_notes.get().strip() or None
 
     if CURRENT_USER_ROLE == "staff":
@@ -837,18 +1319,25 @@ def add_med_record():
         return
 
     try:
+        error = check_medical_refs(pet_id, vet_id)
+        if error:
+            set_status(f"Error: {error}")
+            return
+
         sql = """
             INSERT INTO medical_record
             (type, date, medication, vet_staff_id, description, pet_id)
             VALUES (%s,%s,%s,%s,%s,%s)
         """
         vals = (r_type, date, med, vet_id, notes, pet_id)
-        cursor.execute(sql, vals)
-        connection.commit()
+        execute_write("MEDICAL_RECORD", "insert", sql, vals,
+                      after=dict(zip(MEDICAL_COLUMNS, vals)))
+        commit()
         set_status("Added medical record.")
         clear_med_form()
         refresh_medical_table()
     except Exception as e:
+        rollback()
         set_status(f"Medical add error: {e}")
 
 def update_med_record():
@@ -861,7 +1350,8 @@ def update_med_record():
     r_type = entry_med_type.get().strip() or None
     med    = entry_med_med.get().strip() or None
     vet_id = entry_med_vet.get().strip() or None
-    date   = entry_med_date.get().strip() or None
+    # date is required (the partitioning key); default to today
+    date   = entry_med_date.get().strip() or datetime.now().strftime("%Y-%m-%d")
     notes  = entry_med_notes.get().strip() or None
 
     if CURRENT_USER_ROLE == "staff":
@@ -879,10 +1369,15 @@ def update_med_record():
         return
 
     try:
-        cursor.execute("SELECT record_id FROM medical_record WHERE record_id=%s", (rid,))
-        if cursor.fetchone() is None:
+        current = fetch_one(f"SELECT {', '.join(MEDICAL_COLUMNS)} FROM medical_record "
+                            "WHERE record_id=%s", (rid,))
+        if current is None:
             set_status("No record found with that ID.")
             return
+        error = check_medical_refs(pet_id, vet_id)
+        if error:
+            set_status(f"Error: {error}")
+            return
 
         sql = """
             UPDATE medical_record
@@ -891,12 +1386,15 @@ def update_med_record():
             WHERE record_id=%s
         """
         vals = (r_type, date, med, vet_id, notes, pet_id, rid)
-        cursor.execute(sql, vals)
-        connection.commit()
+        execute_write("MEDICAL_RECORD", "update", sql, vals, rid,
+                      before=dict(zip(MEDICAL_COLUMNS, current)),
+                      after=dict(zip(MEDICAL_COLUMNS, vals)))
+        commit()
         set_status(f"Updated medical record {rid}.")
         clear_med_form()
         refresh_medical_table()
     except Exception as e:
+        rollback()
         set_status(f"Medical update error: {e}")
 
 
@@ -915,15 +1413,22 @@ def delete_med_record():
         return
 
     try:
-        cursor.execute("DELETE FROM medical_record WHERE record_id=%s", (rid,))
-        connection.commit()
-        if cursor.rowcount == 0:
+        before = current_row("medical_record", "record_id", rid, MEDICAL_COLUMNS)
+        if before is None:
+            set_status("No record found with that ID.")
+            return
+        _, deleted = execute_write("MEDICAL_RECORD", "delete",
+                                   "DELETE FROM medical_record WHERE record_id=%s",
+                                   (rid,), rid, before=before)
+        commit()
+        if deleted == 0:
             set_status("No record found with that ID.")
         else:
             set_status(f"Deleted medical record {rid}.")
         clear_med_form()
         refresh_medical_table()
     except Exception as e:
+        rollback()
         set_status(f"Medical delete error: {e}")
 
 def on_med_select(event):
@@ -939,6 +1444,9 @@ def on_med_select(event):
     entry_med_type.insert(0, vals[3] or "")
     entry_med_med.delete(0, END)
     entry_med_med.insert(0, vals[4] or "")
+    vet_id = medical_details.get(str(vals[0]))
+    entry_med_vet.delete(0, END)
+    entry_med_vet.insert(0, str(vet_id) if vet_id is not None else "")
     entry_med_date.delete(0, END)
     entry_med_date.insert(0, vals[6] or "")
     entry_med_notes.delete(0, END)
@@ -1034,28 +1542,39 @@ st_scrollbar.pack(side=RIGHT, fill=Y)
 
 # --- STAFF EDITING HELPERS ---
 
+# Detail columns for the edit form, keyed by str(staff_id). Filled by the
+# list query so selecting a row does not need another round trip.
+staff_details = {}
+
 def refresh_staff_table():
+    scope, scope_params = scope_sql("s.shelter_branch_id", "WHERE")
     try:
-        cursor.execute("""
+        rows = read_rows(f"""
             SELECT s.staff_id,
                    CONCAT(s.first_name, ' ', s.last_name) AS name,
                    s.role,
                    b.branch_name AS branch,
                    s.phone,
-                   s.email
+                   s.email,
+                   s.first_name,
+                   s.last_name,
+                   s.ssn,
+                   s.hire_date,
+                   s.shelter_branch_id
             FROM staff s
-            LEFT JOIN shelter_branch b ON b.branch_id = s.shelter_branch_id
+            LEFT JOIN shelter_branch b ON b.branch_id = s.shelter_branch_id{scope}
             ORDER BY s.staff_id
-        """)
-        rows = cursor.fetchall()
+        """, scope_params)
 
+        staff_details.clear()
         cleaned = []
         for r in rows:
-            r = list(r)
+            (sid, name, role, branch, phone, email,
+             first_name, last_name, ssn, hire_date, branch_id) = r
+            staff_details[str(sid)] = (first_name, last_name, email, phone,
+                                       role, ssn, hire_date, branch_id)
             # branch at index 3
-            if r[3] is None:
-                r[3] = ""
-            cleaned.append(tuple(r))
+            cleaned.append((sid, name, role, branch or "", phone, email))
 
         update_table(staff_table, cleaned)
         set_status(f"Staff: {len(cleaned)} row(s)")
@@ -1157,12 +1676,15 @@ def add_staff():
         """
         vals = (first, last, email, phone or None, role or None,
                 hire or None, ssn, branch_id or None)
-        cursor.execute(sql, vals)
-        connection.commit()
+        execute_write("STAFF", "insert", sql, vals, after=dict(zip(STAFF_COLUMNS, (
+            first, last, email, phone or None, role or None, ssn, hire or None,
+            branch_id or None))))
+        commit()
         set_status(f"Added staff '{first} {last}'.")
         clear_staff_form()
         refresh_staff_table()
     except Exception as e:
+        rollback()
         set_status(f"Staff add error: {e}")
 
 def update_staff():
@@ -1171,8 +1693,8 @@ def update_staff():
         set_status("Error: enter Staff ID to update.")
         return
     try:
-        cursor.execute("SELECT staff_id FROM staff WHERE staff_id=%s", (sid,))
-        if cursor.fetchone() is None:
+        before = current_row("staff", "staff_id", sid, STAFF_COLUMNS)
+        if before is None:
             set_status("No staff found with that ID.")
             return
 
@@ -1192,12 +1714,15 @@ def update_staff():
             WHERE staff_id=%s
         """
         vals = (first, last, email, phone, role, hire, ssn, branch_id, sid)
-        cursor.execute(sql, vals)
-        connection.commit()
+        after = dict(zip(STAFF_COLUMNS, (first, last, email, phone, role, ssn, hire, branch_id)))
+        execute_write("STAFF", "update", sql, vals, sid,
+                      before=before, after=after)
+        commit()
         set_status(f"Updated staff ID {sid}.")
         clear_staff_form()
         refresh_staff_table()
     except Exception as e:
+        rollback()
         set_status(f"Staff update error: {e}")
 
 def delete_staff():
@@ -1206,15 +1731,22 @@ def delete_staff():
         set_status("Error: enter Staff ID to delete.")
         return
     try:
-        cursor.execute("DELETE FROM staff WHERE staff_id=%s", (sid,))
-        connection.commit()
-        if cursor.rowcount == 0:
+        before = current_row("staff", "staff_id", sid, STAFF_COLUMNS)
+        if before is None:
+            set_status("No staff found with that ID.")
+            return
+        _, deleted = execute_write("STAFF", "delete",
+                                   "DELETE FROM staff WHERE staff_id=%s", (sid,), sid,
+                                   before=before)
+        commit()
+        if deleted == 0:
             set_status("No staff found with that ID.")
         else:
             set_status(f"Deleted staff ID {sid}.")
         clear_staff_form()
         refresh_staff_table()
     except Exception as e:
+        rollback()
         set_status(f"Staff delete error: {e}")
 
 btn_row = Frame(staff_edit_inner, bg=CARD_BG)
@@ -1258,13 +1790,17 @@ def on_staff_select(event):
     staff_id = vals[0]
     staff_id_var.set(str(staff_id))
     
-    # Fetch full record from database (including SSN, hire_date, branch_id)
+    # Full record (including SSN, hire_date, branch_id) comes from the cache
+    # filled by refresh_staff_table; only fall back to the database on a miss.
     try:
-        cursor.execute("""
-            SELECT first_name, last_name, email, phone, role, ssn, hire_date, shelter_branch_id
-            FROM STAFF WHERE staff_id = %s
-        """, (staff_id,))
-        row = cursor.fetchone()
+        row = staff_details.get(str(staff_id))
+        if row is None:
+            row = fetch_one("""
+                SELECT first_name, last_name, email, phone, role, ssn, hire_date, shelter_branch_id
+                FROM STAFF WHERE staff_id = %s
+            """, (staff_id,))
+            if row:
+                staff_details[str(staff_id)] = row
         if row:
             first_name, last_name, email, phone, role, ssn, hire_date, branch_id = row
             
@@ -1386,9 +1922,17 @@ table_container_dash = Frame(table_section, bg=CARD_BG,
 table_container_dash.pack(fill=BOTH, expand=True)
 
 columns = ("ID", "Name", "Species", "Breed", "Age", "BranchID")
+# Pet rows also carry the photo hash in a hidden column; the thumbnail
+# goes in the tree column (#0)
+pet_columns = columns + ("PhotoHash",)
+pet_table_show = "tree headings" if photos_supported() else "headings"
+thumbnail_cache = ThumbnailCache()
+
 pet_table_dashboard = ttk.Treeview(table_container_dash,
-                                   columns=columns,
-                                   show="headings")
+                                   columns=pet_columns,
+                                   displaycolumns=columns,
+                                   show=pet_table_show,
+                                   style="Pets.Treeview")
 
 for col in columns:
     pet_table_dashboard.heading(col, text=col)
@@ -1401,6 +1945,7 @@ pet_table_dashboard.configure(yscrollcommand=scroll_dash.set)
 
 pet_table_dashboard.pack(side=LEFT, fill=BOTH, expand=True, padx=2, pady=2)
 scroll_dash.pack(side=RIGHT, fill=Y)
+dashboard_photos = PhotoColumn(pet_table_dashboard, "PhotoHash", thumbnail_cache)
 
 
 # ---------- ADD PET FRAME ----------
@@ -1521,6 +2066,35 @@ entry_arrival.pack(fill=X, ipady=10)
 
 entry_description = labeled_entry(form, "Description")
 
+
+def photo_picker(parent, var, bg=CARD_BG):
+    """'Choose Photo...' button with the chosen file name next to it."""
+    wrap = Frame(parent, bg=bg)
+    wrap.pack(fill=X, pady=(0, 12))
+    Button(wrap, text="Choose Photo...",
+           command=lambda: choose_photo(var),
+           bg=CARD_BG, fg=TEXT_PRIMARY,
+           activebackground=BG,
+           activeforeground=TEXT_PRIMARY,
+           relief="solid", bd=1,
+           padx=16, pady=6,
+           font=("Segoe UI", 10),
+           cursor="hand2").pack(side=LEFT)
+    name_label = Label(wrap, text="No photo", bg=bg, fg=TEXT_SECONDARY,
+                       font=("Segoe UI", 10))
+    name_label.pack(side=LEFT, padx=(10, 0))
+    var.trace_add("write", lambda *_: name_label.config(
+        text=os.path.basename(var.get()) or "No photo"))
+
+
+photo_wrap = Frame(form, bg=CARD_BG)
+photo_wrap.pack(fill=X, pady=10)
+Label(photo_wrap, text="Photo",
+      bg=CARD_BG, fg=TEXT_SECONDARY,
+      font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(0, 6))
+add_photo_var = StringVar()
+photo_picker(photo_wrap, add_photo_var)
+
 # Branch combobox
 branch_wrap = Frame(form, bg=CARD_BG)
 branch_wrap.pack(fill=X, pady=10)
@@ -1638,6 +2212,40 @@ Button(search_row, text="Refresh",
        font=("Segoe UI", 10),
        cursor="hand2").pack(side=LEFT)
 
+# Filter section - one multi-select list per facet, with live counts
+filter_card = Frame(scrollable_frame, bg=CARD_BG, highlightthickness=1,
+                    highlightbackground=BORDER)
+filter_card.pack(fill=X, padx=40, pady=(0, 20))
+
+filter_inner = Frame(filter_card, bg=CARD_BG)
+filter_inner.pack(fill=X, padx=24, pady=20)
+
+filter_head = Frame(filter_inner, bg=CARD_BG)
+filter_head.pack(fill=X, pady=(0, 10))
+Label(filter_head, text="Filter Pets", bg=CARD_BG, fg=TEXT_SECONDARY,
+      font=("Segoe UI", 10, "bold")).pack(side=LEFT)
+Button(filter_head, text="Clear filters",
+       command=clear_facets,
+       bg=CARD_BG, fg=TEXT_PRIMARY,
+       relief="solid", bd=1,
+       padx=12, pady=2,
+       font=("Segoe UI", 9),
+       cursor="hand2").pack(side=RIGHT)
+
+filter_row = Frame(filter_inner, bg=CARD_BG)
+filter_row.pack(fill=X)
+for facet in FACETS:
+    column = Frame(filter_row, bg=CARD_BG)
+    column.pack(side=LEFT, fill=BOTH, expand=True, padx=(0, 8))
+    Label(column, text=FACET_TITLES[facet], bg=CARD_BG, fg=TEXT_SECONDARY,
+          font=("Segoe UI", 9, "bold")).pack(anchor="w", pady=(0, 4))
+    facet_listbox = Listbox(column, selectmode=MULTIPLE, exportselection=False,
+                            height=6, relief="solid", bd=1,
+                            font=("Segoe UI", 9))
+    facet_listbox.pack(fill=BOTH, expand=True)
+    facet_listbox.bind("<<ListboxSelect>>", lambda _e, f=facet: on_facet_select(f))
+    facet_lists[facet] = (facet_listbox, [], [])
+
 # Table section
 table_section = Frame(scrollable_frame, bg=BG)
 table_section.pack(fill=BOTH, expand=True, padx=40, pady=(0, 20))
@@ -1650,8 +2258,10 @@ table_container = Frame(table_section, bg=CARD_BG,
 table_container.pack(fill=BOTH, expand=True)
 
 pet_table_manage = ttk.Treeview(table_container,
-                                columns=columns,
-                                show="headings",
+                                columns=pet_columns,
+                                displaycolumns=columns,
+                                show=pet_table_show,
+                                style="Pets.Treeview",
                                 height=12)
 for col in columns:
     pet_table_manage.heading(col, text=col)
@@ -1664,6 +2274,46 @@ pet_table_manage.configure(yscrollcommand=scroll_manage.set)
 
 pet_table_manage.pack(side=LEFT, fill=BOTH, expand=True, padx=2, pady=2)
 scroll_manage.pack(side=RIGHT, fill=Y)
+manage_photos = PhotoColumn(pet_table_manage, "PhotoHash", thumbnail_cache)
+
+# Similar pets - filled from the similar-pets index when a pet is selected
+similar_section = Frame(scrollable_frame, bg=BG)
+similar_section.pack(fill=X, padx=40, pady=(0, 20))
+
+similar_title = Label(similar_section, text="Similar Pets (select a pet above)",
+                      bg=BG, fg=TEXT_SECONDARY, font=("Segoe UI", 11, "bold"))
+similar_title.pack(anchor="w", pady=(0, 12))
+
+similar_container = Frame(similar_section, bg=CARD_BG,
+                          highlightthickness=1, highlightbackground=BORDER)
+similar_container.pack(fill=X)
+
+similar_columns = ("ID", "Name", "Species", "Breed", "Age", "Match")
+similar_table = ttk.Treeview(similar_container, columns=similar_columns,
+                             show="headings", height=6)
+for col in similar_columns:
+    similar_table.heading(col, text=col)
+    similar_table.column(col, anchor="w", width=120)
+similar_table.pack(fill=X, padx=2, pady=2)
+
+
+def on_manage_select(_event):
+    selected = pet_table_manage.selection()
+    if not selected:
+        return
+    values = pet_table_manage.item(selected[0], "values")
+    try:
+        index = current_index(similar_index)
+        rows = [(pid, *index.info[pid], f"{score:.0%}")
+                for pid, score in index.similar(int(values[0]))]
+    except Exception as e:
+        set_status(f"Error: {e}")
+        return
+    similar_title.config(text=f"Similar Pets to {values[1]} (ID {values[0]})")
+    update_table(similar_table, rows)
+
+
+pet_table_manage.bind("<<TreeviewSelect>>", on_manage_select)
 
 # Actions section - 2 columns
 actions_row = Frame(scrollable_frame, bg=BG)
@@ -1739,6 +2389,12 @@ entry_upd_name = upd_field("Name")
 entry_upd_age = upd_field("Age")
 entry_upd_desc = upd_field("Description")
 
+Label(update_inner, text="Photo",
+      bg=CARD_BG, fg=TEXT_SECONDARY,
+      font=("Segoe UI", 10, "bold")).pack(anchor="w", pady=(0, 6))
+upd_photo_var = StringVar()
+photo_picker(update_inner, upd_photo_var)
+
 Button(update_inner, text="Update Pet",
        command=update_pet,
        bg=SUCCESS, fg="#000000",
@@ -1799,19 +2455,51 @@ pet_table_manage.bind("<Leave>", unbind_table_mousewheel)
 add_scrollable_frame.bind("<Enter>", bind_add_mousewheel)
 add_scrollable_frame.bind("<Leave>", unbind_add_mousewheel)
 
-# --- USER MANAGEMENT FRAME (ADMIN ONLY SECTION) ---
-user_admin = init_user_management(content, connection)
-frames["user_admin"] = user_admin["frame"]
-refresh_user_admin = user_admin["refresh"]
+# Sections that need the MySQL server (hidden while offline)
+ONLINE_ONLY_SECTIONS = {"user_admin", "reports", "requests", "applications"}
+
+report_scheduler = None
+if OFFLINE:
+    refresh_user_admin = refresh_reports = refresh_applications = lambda: None
+    report_pets_changed = lambda pet_ids: None
+else:
+    # --- USER MANAGEMENT FRAME (ADMIN ONLY SECTION) ---
+    user_admin = init_user_management(content, connection, audit=audit,
+                                      on_commit=after_commit)
+    frames["user_admin"] = user_admin["frame"]
+    refresh_user_admin = user_admin["refresh"]
+
+    # --- REPORTS FRAME (MANAGER / ADMIN) ---
+    # Report datasets are precomputed on a background thread; the page
+    # renders the latest snapshot.
+    if can_access(CURRENT_USER_ROLE, "reports"):
+        report_scheduler = ReportScheduler(CURRENT_USER_ROLE,
+                                           branch_scope=lambda: branch_scope["branch_id"])
+        report_scheduler.start()
+    reports = init_reports(content, connection, CURRENT_USER_ROLE, reader=router.reader,
+                           branch_scope=lambda: branch_scope["branch_id"],
+                           scheduler=report_scheduler)
+    frames["reports"] = reports["frame"]
+    refresh_reports = reports["refresh"]
+    report_pets_changed = reports["pets_changed"]
+
+    # --- ADOPTION APPLICATIONS FRAME (MANAGER / ADMIN) ---
+    def on_applications_changed():
+        after_commit()
+        refresh_dashboard()
+        refresh_manage_table()
 
-# --- REPORTS FRAME (MANAGER / ADMIN) ---
-reports = init_reports(content, connection, CURRENT_USER_ROLE)
-frames["reports"] = reports["frame"]
-refresh_reports = reports["refresh"]
+    applications = init_applications(content, connection, reader=router.reader,
+                                     branch_scope=lambda: branch_scope["branch_id"],
+                                     on_change=on_applications_changed, audit=audit)
+    frames["applications"] = applications["frame"]
+    refresh_applications = applications["refresh"]
 
 
 # ---------- NAV BUTTONS ----------
 def add_nav_if_allowed(key, label, callback):
+    if OFFLINE and key in ONLINE_ONLY_SECTIONS:
+        return
     if can_access(CURRENT_USER_ROLE, key):
         sidebar_buttons[key] = create_nav_button(label, callback)
 
@@ -1831,12 +2519,35 @@ add_nav_if_allowed("reports", "📈  Reports",
                    lambda: show_frame("reports"))
 add_nav_if_allowed("requests", "📥  Requests Inbox",
                    lambda: (refresh_requests(), show_frame("requests")))
+add_nav_if_allowed("applications", "📝  Applications",
+                   lambda: show_frame("applications"))
 
 
 # --- PROFILE & LOGOUT BUTTONS AT BOTTOM ---
+def stop_audit():
+    """Last flush of the audit log; warn if some entries could not be written."""
+    lost = audit.stop()
+    if lost:
+        messagebox.showwarning("Audit log", f"Some changes are missing from the audit log:\n{lost}")
+
+
 def logout():
+    if local is not None:
+        local.stop()
+    if report_scheduler is not None:
+        report_scheduler.stop()
+    stop_audit()
+    root.destroy()
+
+
+def close_window():
+    # Window closed without logging out: still write the queued audit entries
+    stop_audit()
     root.destroy()
 
+
+root.protocol("WM_DELETE_WINDOW", close_window)
+
 profile_btn = Button(
     sidebar,
     text=f"👤  {CURRENT_USERNAME}",
@@ -1874,6 +2585,26 @@ logout_btn = Button(
 logout_btn.pack(side=BOTTOM, fill=X, padx=8, pady=(0, 16))                   
 
 
+# --- BRANCH SCOPE PICKER (ADMIN) ---
+def on_branch_scope_change(event=None):
+    choice = branch_scope_var.get()
+    branch_scope["branch_id"] = branch_options.get(choice)   # None = all
+    if current_frame["name"]:
+        show_frame(current_frame["name"])
+    set_status(f"Showing {choice}")
+
+if CURRENT_USER_ROLE == "admin":
+    scope_names = {bid: label for label, bid in branch_options.items()}
+    branch_scope_var = StringVar(value=scope_names.get(USER_BRANCH_ID, ALL_BRANCHES))
+    branch_scope_box = ttk.Combobox(sidebar, textvariable=branch_scope_var,
+                                    values=[ALL_BRANCHES] + list(branch_options),
+                                    state="readonly", font=("Segoe UI", 10))
+    branch_scope_box.bind("<<ComboboxSelected>>", on_branch_scope_change)
+    branch_scope_box.pack(side=BOTTOM, fill=X, padx=16, pady=(0, 12))
+    Label(sidebar, text="Branch", bg=SIDEBAR_BG, fg=SIDEBAR_TEXT_INACTIVE,
+          anchor="w", font=("Segoe UI", 9)).pack(side=BOTTOM, fill=X, padx=16)
+
+
 # ---------- STATUS BAR ----------
 status_bar = Frame(root, bg=CARD_BG, highlightthickness=1,
                    highlightbackground=BORDER, highlightcolor=BORDER)
@@ -1889,6 +2620,19 @@ status_label.pack(side=LEFT, padx=40, pady=10)
 
 set_status(f"Logged in as {CURRENT_USERNAME} ({CURRENT_USER_ROLE})")
 
+if OFFLINE:
+    offline_label = Label(status_bar, text="", bg=CARD_BG, fg=WARNING,
+                          anchor="e", font=("Segoe UI", 10, "bold"))
+    offline_label.pack(side=RIGHT, padx=40, pady=10)
+
+    def update_offline_label():
+        pending = local.pending_writes()
+        server = "server reachable, syncing" if local.online else "server unreachable"
+        offline_label.config(text=f"Offline ({server}) - {pending} change(s) queued")
+        root.after(5000, update_offline_label)
+
+    update_offline_label()
+
 # ---------- INITIAL VIEW ----------
 show_frame("dashboard")
 refresh_dashboard()
@@ -0,0 +1,190 @@
+# medical_partitions.py - monthly date partitions for MEDICAL_RECORD
+#
+# MEDICAL_RECORD only grows, and the medical list and reports read recent
+# history. Range-partitioning it by month on `date` lets MySQL prune every
+# partition outside a query's date range instead of scanning the whole
+# table.
+#
+# MySQL does not allow foreign keys on partitioned tables and requires the
+# partition column in the primary key, so the migration:
+#   - drops the pet_id / vet_staff_id foreign keys (main.py checks both
+#     references before writing, and refuses to delete pets that still
+#     have medical records),
+#   - sets undated records to UNKNOWN_DATE and makes `date` NOT NULL,
+#   - changes the primary key to (record_id, date).
+#
+# Partitions: p_start (everything before the first month), one pYYYYMM per
+# month, and p_future (MAXVALUE). `roll` splits p_future so there are always
+# MONTHS_AHEAD empty months ready; run it from cron / Task Scheduler monthly.
+#
+# Run:  python medical_partitions.py migrate [--history-months 12]
+#       python medical_partitions.py roll [--months-ahead 3]
+#       python medical_partitions.py status
+import argparse
+from datetime import date
+
+import mysql.connector
+
+from db_config import DB_CONFIG
+
+TABLE = "medical_record"
+MONTHS_AHEAD = 3
+HISTORY_MONTHS = 12
+UNKNOWN_DATE = date(1970, 1, 1)
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _partition_def(month: date) -> str:
+    upper = _add_months(month, 1)
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{upper:%Y-%m-%d}')"
+
+
+def list_partitions(connection):
+    """
+    Returns [(partition_name, upper_bound, table_rows)] in order; the bound
+    is a date, or None for the MAXVALUE partition. Empty if unpartitioned.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT partition_name, partition_description, table_rows
+            FROM information_schema.partitions
+            WHERE table_schema = DATABASE()
+              AND LOWER(table_name) = %s
+              AND partition_name IS NOT NULL
+            ORDER BY partition_ordinal_position
+        """, (TABLE,))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    result = []
+    for name, description, table_rows in rows:
+        bound = None
+        if description and description.upper() != "MAXVALUE":
+            bound = date.fromisoformat(description.strip("'"))
+        result.append((name, bound, table_rows))
+    return result
+
+
+def is_partitioned(connection) -> bool:
+    return bool(list_partitions(connection))
+
+
+def partition_medical_records(connection, history_months: int = HISTORY_MONTHS,
+                              months_ahead: int = MONTHS_AHEAD):
+    """
+    One-time migration of MEDICAL_RECORD to monthly RANGE COLUMNS(date)
+    partitions covering history_months back and months_ahead forward.
+    Does nothing if the table is already partitioned.
+    """
+    if is_partitioned(connection):
+        return False
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT constraint_name
+            FROM information_schema.referential_constraints
+            WHERE constraint_schema = DATABASE()
+              AND LOWER(table_name) = %s
+        """, (TABLE,))
+        foreign_keys = [r[0] for r in cursor.fetchall()]
+        for fk in foreign_keys:
+            cursor.execute(f"ALTER TABLE {TABLE} DROP FOREIGN KEY `{fk}`")
+
+        cursor.execute(f"UPDATE {TABLE} SET `date` = %s WHERE `date` IS NULL",
+                       (UNKNOWN_DATE,))
+        connection.commit()
+
+        cursor.execute(f"""
+            ALTER TABLE {TABLE}
+                MODIFY `date` DATE NOT NULL,
+                DROP PRIMARY KEY,
+                ADD PRIMARY KEY (record_id, `date`)
+        """)
+
+        this_month = _month_start(date.today())
+        first = _add_months(this_month, -history_months)
+        months = [_add_months(first, i) for i in range(history_months + months_ahead + 1)]
+        parts = [f"PARTITION p_start VALUES LESS THAN ('{first:%Y-%m-%d}')"]
+        parts += [_partition_def(m) for m in months]
+        parts.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+        cursor.execute(f"""
+            ALTER TABLE {TABLE}
+            PARTITION BY RANGE COLUMNS(`date`) (
+                {", ".join(parts)}
+            )
+        """)
+    finally:
+        cursor.close()
+    return True
+
+
+def roll_partitions(connection, months_ahead: int = MONTHS_AHEAD):
+    """
+    Split p_future so monthly partitions exist through months_ahead months
+    from now. Returns the names of the partitions added.
+    """
+    partitions = list_partitions(connection)
+    if not partitions:
+        raise RuntimeError(f"{TABLE} is not partitioned; run 'migrate' first")
+
+    bounds = [bound for _, bound, _ in partitions if bound is not None]
+    next_month = bounds[-1]          # upper bound of the last monthly partition
+    target = _add_months(_month_start(date.today()), months_ahead + 1)
+
+    new_months = []
+    while next_month < target:
+        new_months.append(next_month)
+        next_month = _add_months(next_month, 1)
+    if not new_months:
+        return []
+
+    parts = [_partition_def(m) for m in new_months]
+    parts.append("PARTITION p_future VALUES LESS THAN (MAXVALUE)")
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+            ALTER TABLE {TABLE}
+            REORGANIZE PARTITION p_future INTO ({", ".join(parts)})
+        """)
+    finally:
+        cursor.close()
+    return [f"p{m:%Y%m}" for m in new_months]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage MEDICAL_RECORD date partitions")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="partition the table (one time)")
+    migrate.add_argument("--history-months", type=int, default=HISTORY_MONTHS)
+    migrate.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    roll = commands.add_parser("roll", help="add upcoming monthly partitions")
+    roll.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    commands.add_parser("status", help="list partitions and row estimates")
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if args.command == "migrate":
+            if partition_medical_records(connection, args.history_months, args.months_ahead):
+                print(f"{TABLE} partitioned by month")
+            else:
+                print(f"{TABLE} is already partitioned")
+        elif args.command == "roll":
+            added = roll_partitions(connection, args.months_ahead)
+            print(f"Added {', '.join(added)}" if added else "Partitions already up to date")
+        else:
+            for name, bound, table_rows in list_partitions(connection):
+                print(f"{name:<10} < {bound or 'MAXVALUE'}  ~{table_rows} rows")
+    finally:
+        connection.close()
@@ -0,0 +1,233 @@
+# pet_api.py - optional read-only HTTP API for adoptable pets
+#
+# Headless service for the lobby kiosks and the website widget. It uses the
+# same queries as the desktop app (pet_queries.py) and serves JSON:
+#
+#   GET /pets?after_id=&limit=&branch_id=   available pets, keyset-paged
+#            &size=&max_age_months=         (optional filters)
+#   GET /pets/<pet_id>                      one available pet
+#   GET /branches/counts                    available pets per branch
+#
+# Responses are cached in memory and carry an ETag; clients that send
+# If-None-Match get 304 Not Modified. The cache is dropped whenever the
+# PET change log (DATA_CHANGE) moves, which is checked at most once every
+# VERSION_CHECK_SECONDS, so any number of kiosk polls costs a handful of
+# queries. The cache keeps the CACHE_SIZE most recently used responses, and
+# keys only include the query parameters the routes read.
+#
+# Run:  python pet_api.py --host 0.0.0.0 --port 8080
+import argparse
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import mysql.connector
+
+from change_tracking import ensure_change_table, latest_change_id
+from db_config import DB_CONFIG
+from description_columns import ensure_description_columns
+from description_parser import normalize_size
+from pet_queries import (PET_COLUMNS, fetch_available_pets, fetch_branch_counts,
+                         fetch_pet)
+
+VERSION_CHECK_SECONDS = 2.0
+DEFAULT_PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+CACHE_SIZE = 256
+QUERY_PARAMS = ("after_id", "limit", "branch_id", "size", "max_age_months")
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _pet_dict(row):
+    return dict(zip(PET_COLUMNS, row))
+
+
+class PetApi:
+    """
+    Query + cache layer behind the HTTP handler. One MySQL connection,
+    used under a lock (connections are not thread-safe).
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._db_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()     # key -> (etag, body), least recently used first
+        self._version = None
+        self._version_checked = 0.0
+
+    # ---------- cache ----------
+    def invalidate(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _check_version(self):
+        """Drop the cache if PET changed since the last check."""
+        now = time.monotonic()
+        if now - self._version_checked < VERSION_CHECK_SECONDS:
+            return
+        with self._db_lock:
+            self.connection.ping(reconnect=True, attempts=2, delay=1)
+            version = latest_change_id(self.connection, "PET")
+        self._version_checked = now
+        with self._cache_lock:
+            if version != self._version:
+                self._version = version
+                self._cache.clear()
+
+    def get(self, path, query):
+        """
+        Returns (status, etag, body) for a GET request.
+        """
+        self._check_version()
+        # unknown parameters do not change the response, so they are not in the key
+        key = (path, tuple((k, tuple(query[k])) for k in QUERY_PARAMS if k in query))
+        with self._cache_lock:
+            version = self._version     # the PET version this response is built from
+            hit = self._cache.get(key)
+            if hit:
+                self._cache.move_to_end(key)
+        if hit:
+            return 200, hit[0], hit[1]
+
+        status, payload = self._route(path, query)
+        body = json.dumps(payload, default=_json_default).encode("utf-8")
+        etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+        if status == 200:
+            with self._cache_lock:
+                if version != self._version:
+                    # PET changed while this was being built: the body may be
+                    # stale, so serve it this once but do not cache it
+                    return status, etag, body
+                self._cache[key] = (etag, body)
+                self._cache.move_to_end(key)
+                while len(self._cache) > CACHE_SIZE:
+                    self._cache.popitem(last=False)
+        return status, etag, body
+
+    # ---------- routes ----------
+    def _route(self, path, query):
+        parts = [p for p in path.split("/") if p]
+        try:
+            if parts == ["pets"]:
+                return 200, self._pets_page(query)
+            if len(parts) == 2 and parts[0] == "pets":
+                return self._pet_detail(int(parts[1]))
+            if parts == ["branches", "counts"]:
+                return 200, self._branch_counts()
+        except ValueError:
+            return 400, {"error": "bad request"}
+        return 404, {"error": "not found"}
+
+    def _pets_page(self, query):
+        def int_param(name):
+            vals = query.get(name)
+            return int(vals[0]) if vals and vals[0] else None
+
+        size_text = (query.get("size") or [""])[0]
+        size = normalize_size(size_text)
+        if size_text.strip() and size is None:
+            raise ValueError(f"unknown size: {size_text}")
+        limit = int_param("limit") or DEFAULT_PAGE_SIZE
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        with self._db_lock:
+            rows = fetch_available_pets(
+                self.connection,
+                after_id=int_param("after_id"),
+                limit=limit + 1,
+                branch_id=int_param("branch_id"),
+                size=size,
+                max_age_months=int_param("max_age_months"),
+            )
+        has_next = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            "pets": [_pet_dict(r) for r in rows],
+            "next_after_id": rows[-1][0] if has_next else None,
+        }
+
+    def _pet_detail(self, pet_id):
+        with self._db_lock:
+            row = fetch_pet(self.connection, pet_id)
+        # Only adoptable animals are public
+        if not row or row[PET_COLUMNS.index("adoption_status")] != "Available":
+            return 404, {"error": "not found"}
+        return 200, _pet_dict(row)
+
+    def _branch_counts(self):
+        with self._db_lock:
+            rows = fetch_branch_counts(self.connection, available_only=True)
+        return {
+            "branches": [
+                {"branch_id": bid, "branch_name": name, "available": count}
+                for bid, name, count in rows
+            ]
+        }
+
+
+class PetApiHandler(BaseHTTPRequestHandler):
+    server_version = "PetAdoptionAPI/1.0"
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        try:
+            status, etag, body = self.server.api.get(url.path, parse_qs(url.query))
+        except mysql.connector.Error as e:
+            self.log_error("database error: %s", e)
+            status, etag, body = 503, None, b'{"error": "database unavailable"}'
+
+        if status == 200 and etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        if etag:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def serve(host="127.0.0.1", port=8080):
+    # autocommit so every query sees the latest committed data instead of
+    # the snapshot of one long-running transaction
+    connection = mysql.connector.connect(**DB_CONFIG, autocommit=True)
+    ensure_change_table(connection)
+    ensure_description_columns(connection)
+
+    httpd = ThreadingHTTPServer((host, port), PetApiHandler)
+    httpd.api = PetApi(connection)
+    print(f"Pet API listening on http://{host}:{port}")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only JSON API for adoptable pets")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    serve(args.host, args.port)
@@ -0,0 +1,261 @@
+# pet_archive.py - move adopted pets and closed applications to history tables
+#
+# PET, MEDICAL_RECORD and ADOPTION_APPLICATION keep every animal the shelter
+# ever had. This job moves pets adopted before a cutoff (together with their
+# medical records and applications), and closed applications older than the
+# cutoff, into *_archive tables so the live tables stay sized to the animals
+# still in our care.
+#
+# Rows are moved in batches, one transaction per batch, so the job can run
+# during opening hours without long locks; deletes are logged in DATA_CHANGE
+# so caches and the local replica drop the archived rows.
+#
+# Reports that need all-time numbers read the *_all views, which UNION ALL
+# the live and archive tables.
+#
+# Run:  python pet_archive.py [--older-than-days 365] [--batch-size 500]
+#                             [--pause 0.5] [--dry-run]
+import argparse
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+from change_tracking import ensure_change_table, record_changes
+from db_config import DB_CONFIG
+
+# live table -> (archive table, all-time view, primary key)
+ARCHIVED_TABLES = {
+    "pet": ("pet_archive", "pet_all", "pet_id"),
+    "medical_record": ("medical_record_archive", "medical_record_all", "record_id"),
+    "adoption_application": ("adoption_application_archive",
+                             "adoption_application_all", "application_id"),
+}
+
+# Applications in these states are finished and can be archived on their own
+CLOSED_APPLICATION_STATUSES = ("Denied", "Rejected", "Withdrawn", "Cancelled")
+
+OLDER_THAN_DAYS = 365
+BATCH_SIZE = 500
+
+
+def _columns(cursor, table):
+    cursor.execute("""
+        SELECT column_name, column_type
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+          AND LOWER(table_name) = %s
+        ORDER BY ordinal_position
+    """, (table,))
+    return cursor.fetchall()
+
+
+def _shared_columns(cursor, live, archive):
+    """
+    Columns of the live table, adding any the archive table is missing
+    (columns added to the live table after the archive was created).
+    """
+    live_cols = _columns(cursor, live)
+    archive_names = {name.lower() for name, _ in _columns(cursor, archive)}
+    for name, column_type in live_cols:
+        if name.lower() not in archive_names:
+            cursor.execute(f"ALTER TABLE {archive} ADD COLUMN `{name}` {column_type} NULL")
+    return [name for name, _ in live_cols]
+
+
+def ensure_archive_tables(connection):
+    """
+    Create the archive tables and the live+archive views if needed, and
+    keep both in step with columns added to the live tables.
+    Safe to call every time at startup.
+    """
+    cursor = connection.cursor()
+    try:
+        for live, (archive, view, _) in ARCHIVED_TABLES.items():
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {archive} LIKE {live}")
+            if not any(name.lower() == "archived_at" for name, _ in _columns(cursor, archive)):
+                cursor.execute(f"""
+                    ALTER TABLE {archive}
+                    ADD COLUMN archived_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+                """)
+            # history does not need the live table's date partitions
+            cursor.execute("""
+                SELECT 1 FROM information_schema.partitions
+                WHERE table_schema = DATABASE()
+                  AND LOWER(table_name) = %s
+                  AND partition_name IS NOT NULL
+                LIMIT 1
+            """, (archive,))
+            if cursor.fetchone():
+                cursor.execute(f"ALTER TABLE {archive} REMOVE PARTITIONING")
+
+            cols = ", ".join(f"`{c}`" for c in _shared_columns(cursor, live, archive))
+            cursor.execute(f"""
+                CREATE OR REPLACE VIEW {view} AS
+                SELECT {cols}, 0 AS archived FROM {live}
+                UNION ALL
+                SELECT {cols}, 1 AS archived FROM {archive}
+            """)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def _adopted_pet_ids(cursor, cutoff, after_id, limit):
+    """
+    Adopted pets whose adoption (latest application decision, or arrival
+    if there is none) is before cutoff, in pet_id order after after_id.
+    """
+    cursor.execute("""
+        SELECT p.pet_id
+        FROM pet p
+        LEFT JOIN (
+            SELECT pet_id, MAX(decision_date) AS decided
+            FROM adoption_application
+            GROUP BY pet_id
+        ) a ON a.pet_id = p.pet_id
+        WHERE p.adoption_status = 'Adopted'
+          AND COALESCE(a.decided, p.arrival_date) < %s
+          AND p.pet_id > %s
+        ORDER BY p.pet_id
+        LIMIT %s
+    """, (cutoff, after_id, limit))
+    return [r[0] for r in cursor.fetchall()]
+
+
+def _archive_columns(cursor):
+    """
+    Column list per live table. Resolved before any batch starts: adding a
+    missing archive column is DDL, which would commit a half-moved batch.
+    """
+    return {
+        live: ", ".join(f"`{c}`" for c in _shared_columns(cursor, live, archive))
+        for live, (archive, _, _) in ARCHIVED_TABLES.items()
+    }
+
+
+def _move(cursor, live, cols, where, params):
+    """Copy matching rows to the archive table and delete them. Returns ids."""
+    archive, _, pk = ARCHIVED_TABLES[live]
+    cursor.execute(f"SELECT {pk} FROM {live} WHERE {where}", params)
+    ids = [r[0] for r in cursor.fetchall()]
+    if not ids:
+        return ids
+    cursor.execute(f"INSERT INTO {archive} ({cols}) SELECT {cols} FROM {live} WHERE {where}",
+                   params)
+    cursor.execute(f"DELETE FROM {live} WHERE {where}", params)
+    return ids
+
+
+def archive_adopted_pets(connection, cutoff, batch_size=BATCH_SIZE, pause=0.0,
+                         dry_run=False):
+    """
+    Move adopted pets (see _adopted_pet_ids) with their medical records and
+    applications to the archive tables, batch_size pets per transaction.
+    Returns the number of pets archived (or that would be, for dry_run).
+    """
+    total = 0
+    after_id = 0
+    cursor = connection.cursor()
+    try:
+        cols = _archive_columns(cursor)
+        while True:
+            pet_ids = _adopted_pet_ids(cursor, cutoff, after_id, batch_size)
+            if not pet_ids:
+                break
+            after_id = pet_ids[-1]
+            total += len(pet_ids)
+            if dry_run:
+                continue
+
+            marks = ", ".join(["%s"] * len(pet_ids))
+            where = f"pet_id IN ({marks})"
+            try:
+                record_ids = _move(cursor, "medical_record", cols["medical_record"],
+                                   where, pet_ids)
+                _move(cursor, "adoption_application", cols["adoption_application"],
+                      where, pet_ids)
+                _move(cursor, "pet", cols["pet"], where, pet_ids)
+                record_changes(cursor,
+                               [("PET", "delete", pid) for pid in pet_ids]
+                               + [("MEDICAL_RECORD", "delete", rid) for rid in record_ids])
+                connection.commit()
+            except mysql.connector.Error:
+                connection.rollback()
+                raise
+            if pause:
+                time.sleep(pause)
+    finally:
+        cursor.close()
+    return total
+
+
+def archive_closed_applications(connection, cutoff, batch_size=BATCH_SIZE, pause=0.0,
+                                dry_run=False):
+    """
+    Move closed applications decided before cutoff, batch_size per
+    transaction. Returns the number of applications archived.
+    """
+    marks = ", ".join(["%s"] * len(CLOSED_APPLICATION_STATUSES))
+    total = 0
+    after_id = 0
+    cursor = connection.cursor()
+    try:
+        cols = _archive_columns(cursor)["adoption_application"]
+        while True:
+            cursor.execute(f"""
+                SELECT application_id
+                FROM adoption_application
+                WHERE status IN ({marks})
+                  AND decision_date < %s
+                  AND application_id > %s
+                ORDER BY application_id
+                LIMIT %s
+            """, CLOSED_APPLICATION_STATUSES + (cutoff, after_id, batch_size))
+            app_ids = [r[0] for r in cursor.fetchall()]
+            if not app_ids:
+                break
+            after_id = app_ids[-1]
+            total += len(app_ids)
+            if dry_run:
+                continue
+
+            where = f"application_id IN ({', '.join(['%s'] * len(app_ids))})"
+            try:
+                _move(cursor, "adoption_application", cols, where, app_ids)
+                connection.commit()
+            except mysql.connector.Error:
+                connection.rollback()
+                raise
+            if pause:
+                time.sleep(pause)
+    finally:
+        cursor.close()
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive adopted pets and closed applications")
+    parser.add_argument("--older-than-days", type=int, default=OLDER_THAN_DAYS,
+                        help="archive adoptions/decisions older than this")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=0.0,
+                        help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only count what would be archived")
+    args = parser.parse_args()
+
+    cutoff = date.today() - timedelta(days=args.older_than_days)
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        ensure_change_table(connection)
+        ensure_archive_tables(connection)
+        pets = archive_adopted_pets(connection, cutoff, args.batch_size, args.pause,
+                                    args.dry_run)
+        apps = archive_closed_applications(connection, cutoff, args.batch_size,
+                                           args.pause, args.dry_run)
+        verb = "Would archive" if args.dry_run else "Archived"
+        print(f"{verb} {pets} adopted pet(s) and {apps} closed application(s) "
+              f"from before {cutoff}")
+    finally:
+        connection.close()
@@ -0,0 +1,223 @@
+# pet_columns.py - columnar in-memory snapshot of PET for the reports
+#
+# The pet-based report sections (KPIs, species counts, age statistics,
+# per-branch age ranges, capacity utilization, longest stays) used to run
+# one SQL aggregate each. PetColumns holds PET once as NumPy columns:
+#   age          float64, NaN where NULL (whole years, like PET.age)
+#   branch       shelter_branch_id, -1 where NULL
+#   species      species_id, -1 where NULL
+#   status       small code per adoption_status text
+#   arrival      date ordinal of arrival_date, -1 where NULL
+# and summary() computes the counts those sections need in one vectorized
+# pass (bincounts per branch and species). The age statistics are not
+# recomputed at all: age_aggregates.AgeAggregates keeps count / sum / min /
+# max per branch and species and is updated with every pet change here.
+#
+# Like the PET indexes in main.py it is a pet_index.PetIndex: loaded once
+# and then kept current from DATA_CHANGE (catch_up) and from this client's
+# writes (refresh_pets), re-reading only the pets that changed.
+from datetime import date
+
+import numpy as np
+
+from age_aggregates import ANY, AgeAggregates
+from pet_index import PetIndex
+
+COLUMN_SQL = """
+    SELECT pet_id, name, species, species_id, shelter_branch_id,
+           adoption_status, age, arrival_date
+    FROM PET
+"""
+AVAILABLE = "Available"
+LONGEST_STAYS = 10
+
+
+def _ordinal(value):
+    if value is None:
+        return -1
+    if isinstance(value, str):          # SQLite hands dates back as text
+        value = date.fromisoformat(value[:10])
+    return value.toordinal()
+
+
+def _number(value):
+    """Aggregate -> report value: None for NaN, ROUND(x, 1), int when whole."""
+    if value is None or np.isnan(value):
+        return None
+    value = round(float(value), 1)
+    return int(value) if value.is_integer() else value
+
+
+def _age_range(stats):
+    """(min, max, avg, count) of an AgeStats."""
+    return _number(stats.min), _number(stats.max), _number(stats.avg), stats.count
+
+
+class PetColumns(PetIndex):
+    """PET as NumPy columns, for the report aggregates."""
+
+    SQL = COLUMN_SQL
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.size = 0
+        self.pet_ids = np.zeros(0, dtype=np.int64)
+        self.age = np.zeros(0)
+        self.branch = np.zeros(0, dtype=np.int64)
+        self.species = np.zeros(0, dtype=np.int64)
+        self.status = np.zeros(0, dtype=np.int16)
+        self.arrival = np.zeros(0, dtype=np.int64)
+        self.names = []                 # position -> (name, species text)
+        self._position = {}             # pet_id -> position
+        self._status_code = {}          # adoption_status -> code
+        self.ages = AgeAggregates()
+        self.change_id = None
+        self.loaded = False
+
+    # ---------- building ----------
+    def load(self, connection, change_id=None):
+        """Read all of PET. change_id: the log position it reflects."""
+        rows = self.read_all(connection)
+        self._clear()
+        self._grow(len(rows))
+        for row in rows:
+            self._put(row)
+        n = self.size
+        available = self.status[:n] == self._status_code.get(AVAILABLE, -1)
+        self.ages.build((row[0], row[6], row[4], row[3], bool(avail))
+                        for row, avail in zip(rows, available.tolist()))
+        self.change_id = change_id
+        self.loaded = True
+
+    def _grow(self, needed):
+        if needed <= len(self.pet_ids):
+            return
+        capacity = max(needed, 2 * len(self.pet_ids), 64)
+        for column in ("pet_ids", "age", "branch", "species", "status", "arrival"):
+            old = getattr(self, column)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+
+    def _code(self, status):
+        code = self._status_code.get(status)
+        if code is None:
+            code = self._status_code[status] = len(self._status_code)
+        return code
+
+    def upsert(self, row):
+        """Add or replace one pet; row is a COLUMN_SQL row."""
+        self._put(row)
+        pet_id, _, _, species_id, branch_id, status, age, _ = row
+        self.ages.set_pet(pet_id, age, branch_id, species_id, status == AVAILABLE)
+
+    def _put(self, row):
+        pet_id, name, species, species_id, branch_id, status, age, arrival = row
+        i = self._position.get(pet_id)
+        if i is None:
+            i = self.size
+            self._grow(i + 1)
+            self.size += 1
+            self._position[pet_id] = i
+            self.names.append(None)
+        self.pet_ids[i] = pet_id
+        self.age[i] = np.nan if age is None else float(age)
+        self.branch[i] = -1 if branch_id is None else branch_id
+        self.species[i] = -1 if species_id is None else species_id
+        self.status[i] = self._code(status)
+        self.arrival[i] = _ordinal(arrival)
+        self.names[i] = (name, species)
+
+    def remove(self, pet_id):
+        i = self._position.pop(pet_id, None)
+        if i is None:
+            return
+        self.ages.remove(pet_id)
+        # move the last pet into the hole
+        last = self.size - 1
+        if i != last:
+            for column in (self.pet_ids, self.age, self.branch, self.species,
+                           self.status, self.arrival):
+                column[i] = column[last]
+            self.names[i] = self.names[last]
+            self._position[int(self.pet_ids[i])] = i
+        self.names.pop()
+        self.size = last
+
+    # ---------- aggregates ----------
+    def summary(self, branch_id=None, today=None):
+        """
+        Every pet aggregate the reports use, for all pets or one branch:
+            total, available                    pet counts
+            available_age                       (min, max, avg, count), available pets with an age
+            age                                 (count, min, max, avg, sum), pets with an age
+            available_by_species                {species_id or None: count}
+            avg_age_by_species                  {species_id or None: avg age}
+            by_branch                           {branch_id: {"pets", "available",
+                                                 "age": (min, max, avg, count)}}
+            longest_stays                       [(name, species, arrival date, days)],
+                                                available pets waiting longest
+        """
+        n = self.size
+        branch = self.branch[:n]
+        species = self.species[:n]
+        status = self.status[:n]
+        arrival = self.arrival[:n]
+        keep = np.flatnonzero(branch == branch_id) if branch_id is not None else np.arange(n)
+        branch, species, status, arrival = (branch[keep], species[keep], status[keep],
+                                            arrival[keep])
+        available = status == self._status_code.get(AVAILABLE, -1)
+
+        # per branch, all in one go: ids are small, so the id (+1 for NULL) is the group
+        branch_groups = branch + 1
+        branch_size = int(branch_groups.max()) + 1 if len(branch_groups) else 1
+        pets = np.bincount(branch_groups, minlength=branch_size)
+        available_pets = np.bincount(branch_groups[available], minlength=branch_size)
+        by_branch = {}
+        for g in np.flatnonzero(pets).tolist():
+            group = g - 1 if g else None
+            by_branch[group] = {
+                "pets": int(pets[g]),
+                "available": int(available_pets[g]),
+                "age": _age_range(self.ages.stats(group)),
+            }
+
+        species_groups = species + 1
+        species_size = int(species_groups.max()) + 1 if len(species_groups) else 1
+        available_species = np.bincount(species_groups[available], minlength=species_size)
+        available_by_species = {g - 1 if g else None: int(available_species[g])
+                                for g in np.flatnonzero(available_species).tolist()}
+
+        # age statistics: read from the maintained aggregates
+        scope = ANY if branch_id is None else branch_id
+        avg_age_by_species = {species_id: _number(stats.avg) for species_id, stats
+                              in self.ages.by_species(scope).items()}
+        available_age = _age_range(self.ages.stats(scope, available=True))
+        stats = self.ages.stats(scope)
+        age_stats = (stats.count, _number(stats.min), _number(stats.max),
+                     _number(stats.avg), _number(stats.total) if stats.count else None)
+
+        # longest stays: the available pets with the earliest arrival
+        waiting = np.flatnonzero(available & (arrival >= 0))
+        if len(waiting) > LONGEST_STAYS:
+            waiting = waiting[np.argpartition(arrival[waiting], LONGEST_STAYS - 1)[:LONGEST_STAYS]]
+        waiting = waiting[np.argsort(arrival[waiting], kind="stable")]
+        today = (today or date.today()).toordinal()
+        longest = []
+        for i in waiting.tolist():
+            name, species_text = self.names[keep[i]]
+            day = int(arrival[i])
+            longest.append((name, species_text, date.fromordinal(day).isoformat(), today - day))
+
+        return {
+            "total": int(len(keep)),
+            "available": int(available.sum()),
+            "available_age": available_age,
+            "age": age_stats,
+            "available_by_species": available_by_species,
+            "avg_age_by_species": avg_age_by_species,
+            "by_branch": by_branch,
+            "longest_stays": longest,
+        }
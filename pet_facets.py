@@ -0,0 +1,241 @@
+# pet_facets.py - bitmap index for faceted filtering in Manage Pets
+#
+# Every pet gets a slot number; for every value of every facet (species,
+# breed, branch, status, gender, age bucket) there is one bitset - a Python
+# int - with the slots of the pets having that value. Then:
+#   - the pets matching a selection are the AND of, per facet, the OR of the
+#     selected values' bitsets
+#   - the count shown next to a value is popcount(bitset & the selection on
+#     the *other* facets), so picking a value never hides its alternatives
+# Filtering is a handful of big-int operations. For the counts each facet
+# also keeps a NumPy array of value codes per slot, so counting all values
+# of a facet is one bincount over the pets of the other facets' selection
+# instead of one AND per value (breeds alone run into the hundreds). Both
+# stay fast for several hundred thousand pets; freed slots are reused so
+# the bitsets stay dense.
+#
+# Like the other PET indexes (pet_index.PetIndex) it is loaded
+# once and then kept current from this client's writes and DATA_CHANGE.
+import numpy as np
+
+from pet_index import PetIndex
+
+FACETS = ("species", "breed", "branch", "status", "gender", "age")
+FACET_TITLES = {"species": "Species", "breed": "Breed", "branch": "Branch",
+                "status": "Status", "gender": "Gender", "age": "Age"}
+UNKNOWN = "Unknown"
+
+# (upper bound in months, label); the last bucket is open-ended
+AGE_BUCKETS = ((6, "Under 6 months"), (12, "6-12 months"), (36, "1-3 years"),
+               (84, "3-7 years"), (None, "7+ years"))
+AGE_ORDER = tuple(label for _, label in AGE_BUCKETS) + (UNKNOWN,)
+
+# Display columns first (the Manage Pets table row), then the facet inputs
+FACET_SQL = """
+    SELECT p.pet_id, p.name, COALESCE(s.name, p.species), p.breed, p.age,
+           p.shelter_branch_id, p.photo_hash,
+           p.adoption_status, p.gender, p.age_months
+    FROM PET p
+    LEFT JOIN SPECIES s ON s.species_id = p.species_id
+"""
+DISPLAY_WIDTH = 7
+
+
+def age_bucket(age_months, age_years):
+    if age_months is None and age_years is not None:
+        age_months = int(age_years) * 12
+    if age_months is None:
+        return UNKNOWN
+    for bound, label in AGE_BUCKETS:
+        if bound is None or age_months < bound:
+            return label
+
+
+def _text(value):
+    value = " ".join(str(value).split()) if value is not None else ""
+    return value.upper() or UNKNOWN
+
+
+def facet_values(row):
+    """{facet: value} for a FACET_SQL row."""
+    _, _, species, breed, age, branch_id, _, status, gender, age_months = row
+    return {
+        "species": (species or "").strip() or UNKNOWN,
+        "breed": _text(breed),
+        "branch": branch_id if branch_id is not None else UNKNOWN,
+        "status": (status or "").strip() or UNKNOWN,
+        "gender": _text(gender),
+        "age": age_bucket(age_months, age),
+    }
+
+
+class FacetIndex(PetIndex):
+    """Bitsets per facet value over all pets."""
+
+    SQL = FACET_SQL
+    ID_COLUMN = "p.pet_id"
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.bits = {facet: {} for facet in FACETS}    # facet -> value -> bitset
+        self.alive = 0                  # bitset of used slots
+        self._slot = {}                 # pet_id -> slot
+        self._free = []                 # slots of removed pets
+        self._next = 0
+        self._rows = {}                 # slot -> display row
+        self._values = {}               # slot -> {facet: value}
+        self._codes = {facet: np.zeros(0, dtype=np.int32) for facet in FACETS}
+        self._code_of = {facet: {} for facet in FACETS}     # value -> code
+        self._value_of = {facet: [] for facet in FACETS}    # code -> value
+        self._pet_ids = np.zeros(0, dtype=np.int64)         # slot -> pet_id
+        self.change_id = None
+        self.loaded = False
+
+    # ---------- building ----------
+    def load(self, connection, change_id=None):
+        """Build the index from PET. change_id: the log position it reflects."""
+        rows = self.read_all(connection)
+        self._clear()
+        # collect the slots per value first, then build each bitset once
+        slots = {facet: {} for facet in FACETS}
+        self._grow(len(rows))
+        for slot, row in enumerate(rows):
+            values = facet_values(row)
+            self._pet_ids[slot] = row[0]
+            self._slot[row[0]] = slot
+            self._rows[slot] = row[:DISPLAY_WIDTH]
+            self._values[slot] = values
+            for facet, value in values.items():
+                slots[facet].setdefault(value, []).append(slot)
+        for facet, by_value in slots.items():
+            self.bits[facet] = {value: _bitset(found) for value, found in by_value.items()}
+            for value, found in by_value.items():
+                self._codes[facet][found] = self._code(facet, value)
+        self._next = len(rows)
+        self.alive = (1 << self._next) - 1
+        self.change_id = change_id
+        self.loaded = True
+
+    def upsert(self, row):
+        """Add or replace one pet; row is a FACET_SQL row."""
+        pet_id = row[0]
+        slot = self._slot.get(pet_id)
+        if slot is None:
+            slot = self._free.pop() if self._free else self._next
+            if slot == self._next:
+                self._next += 1
+                self._grow(self._next)
+            self._slot[pet_id] = slot
+            self._pet_ids[slot] = pet_id
+            self.alive |= 1 << slot
+        else:
+            self._unset(slot)
+        values = facet_values(row)
+        bit = 1 << slot
+        for facet, value in values.items():
+            self.bits[facet][value] = self.bits[facet].get(value, 0) | bit
+            self._codes[facet][slot] = self._code(facet, value)
+        self._rows[slot] = row[:DISPLAY_WIDTH]
+        self._values[slot] = values
+
+    def _code(self, facet, value):
+        code = self._code_of[facet].get(value)
+        if code is None:
+            code = self._code_of[facet][value] = len(self._value_of[facet])
+            self._value_of[facet].append(value)
+        return code
+
+    def _grow(self, needed):
+        if needed <= len(self._pet_ids):
+            return
+        capacity = max(needed, 2 * len(self._pet_ids), 64)
+        for facet, codes in self._codes.items():
+            self._codes[facet] = np.zeros(capacity, dtype=np.int32)
+            self._codes[facet][:len(codes)] = codes
+        pet_ids = self._pet_ids
+        self._pet_ids = np.zeros(capacity, dtype=np.int64)
+        self._pet_ids[:len(pet_ids)] = pet_ids
+
+    def _unset(self, slot):
+        mask = ~(1 << slot)
+        for facet, value in self._values.pop(slot).items():
+            left = self.bits[facet][value] & mask
+            if left:
+                self.bits[facet][value] = left
+            else:
+                del self.bits[facet][value]
+
+    def remove(self, pet_id):
+        slot = self._slot.pop(pet_id, None)
+        if slot is None:
+            return
+        self._unset(slot)
+        del self._rows[slot]
+        self.alive &= ~(1 << slot)
+        self._free.append(slot)
+
+    # ---------- queries ----------
+    def _any_of(self, facet, values):
+        bits = 0
+        for value in values:
+            bits |= self.bits[facet].get(value, 0)
+        return bits
+
+    def filter(self, selection, within=None):
+        """
+        selection / within: {facet: set of values}; within restricts
+        everything (e.g. the session's branch), selection is what the user
+        picked. Returns (bitset of matching pets, {facet: {value: count}}).
+        """
+        base = self.alive
+        for facet, values in (within or {}).items():
+            base &= self._any_of(facet, values)
+        picked = {facet: self._any_of(facet, values)
+                  for facet, values in selection.items() if values}
+
+        counts = {}
+        slots_of = {}           # facets without a selection share one mask
+        for facet in FACETS:
+            # everything selected except this facet
+            others = base
+            for other, bits in picked.items():
+                if other != facet:
+                    others &= bits
+            if others not in slots_of:
+                slots_of[others] = _slots(others)
+            values = self._value_of[facet]
+            found = np.bincount(self._codes[facet][slots_of[others]], minlength=len(values))
+            counts[facet] = {value: int(found[code]) for value, code in
+                             self._code_of[facet].items() if value in self.bits[facet]}
+        result = base
+        for bits in picked.values():
+            result &= bits
+        return result, counts
+
+    def rows(self, bits, limit=None):
+        """Display rows of the pets in a bitset, in pet_id order (at most limit)."""
+        slots = _slots(bits)
+        pet_ids = self._pet_ids[slots]
+        if limit is not None and limit < len(slots):
+            # only the first `limit` pet_ids need sorting
+            first = np.argpartition(pet_ids, limit - 1)[:limit]
+            slots, pet_ids = slots[first], pet_ids[first]
+        return [self._rows[s] for s in slots[np.argsort(pet_ids)].tolist()]
+
+
+def _slots(bits):
+    """Positions of the set bits of a bitset, ascending."""
+    if not bits:
+        return np.zeros(0, dtype=np.int64)
+    raw = np.frombuffer(bits.to_bytes((bits.bit_length() + 7) // 8, "little"),
+                        dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(raw, bitorder="little"))
+
+
+def _bitset(slots):
+    """Bitset (int) with the given bit positions set."""
+    bits = np.zeros(max(slots) + 1, dtype=np.uint8)
+    bits[slots] = 1
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
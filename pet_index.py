@@ -0,0 +1,68 @@
+# pet_index.py - loading and catch-up shared by the in-memory PET indexes
+#
+# similar_pets.SimilarPets, pet_duplicates.DuplicateIndex, pet_facets.FacetIndex
+# and pet_columns.PetColumns each hold something derived from every PET row.
+# They are loaded once, remembering the DATA_CHANGE position the read
+# reflects, and then kept current by re-reading only the pets that changed:
+# the ones this client wrote (refresh_pets) and the ones other clients
+# logged in DATA_CHANGE (catch_up).
+#
+# PetIndex does that reading. A subclass sets SQL (and ID_COLUMN if the
+# query aliases PET), builds itself in load() from read_all(), and
+# implements upsert(row) and remove(pet_id); everything else is here.
+from abc import ABC, abstractmethod
+
+from change_tracking import changed_rows
+
+IN_CHUNK = 1000         # pet ids per "WHERE pet_id IN (...)"
+
+
+class PetIndex(ABC):
+    """Base class of the PET indexes: SQL rows in, upsert / remove out."""
+
+    SQL = None              # SELECT over PET, pet_id first; a WHERE is appended to it
+    ID_COLUMN = "pet_id"    # pet_id as SQL names it, for that WHERE
+
+    def read_all(self, connection):
+        """Every SQL row, for load()."""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(self.SQL)
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+
+    @abstractmethod
+    def upsert(self, row):
+        """Add or replace the pet of one SQL row."""
+
+    @abstractmethod
+    def remove(self, pet_id):
+        """Drop a pet; a pet not in the index is ignored."""
+
+    def refresh_pets(self, connection, pet_ids):
+        """Re-read the given pets (e.g. after this client changed them); drops deleted ones."""
+        pet_ids = [int(p) for p in pet_ids]
+        found = set()
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(pet_ids), IN_CHUNK):
+                chunk = pet_ids[start:start + IN_CHUNK]
+                marks = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"{self.SQL} WHERE {self.ID_COLUMN} IN ({marks})", chunk)
+                for row in cursor.fetchall():
+                    self.upsert(row)
+                    found.add(row[0])
+        finally:
+            cursor.close()
+        for pet_id in set(pet_ids) - found:
+            self.remove(pet_id)
+
+    def catch_up(self, connection):
+        """Apply PET changes logged in DATA_CHANGE since the last load / catch-up."""
+        if self.change_id is None:
+            return
+        changed = changed_rows(connection, "PET", self.change_id)
+        if changed:
+            self.refresh_pets(connection, [row_id for row_id, _ in changed])
+            self.change_id = max(change_id for _, change_id in changed)
@@ -0,0 +1,437 @@
+# pet_matching.py - match adopters to available pets
+#
+# ADOPTER.preferences is free text ("small female cat under 2 years, black
+# or gray"). parse_preferences() turns it into criteria: species, gender,
+# size, an age range in months, and breed / color words.
+#
+# MatchEngine encodes the available pets once as NumPy arrays (a combined
+# species/gender/size code, age in months, and a word matrix of breed and
+# color words) and scores adopters against all pets a batch at a time: per
+# adopter, small score tables over the codes and ages are built and looked
+# up for every pet, so a full adopter x pet pass is a handful of array
+# operations per batch rather than a Python loop per pair. Pets (and
+# adopters) that look identical to the scoring are scored once. Top-K
+# selection uses argpartition.
+#
+# Scoring (higher is better):
+#   species    asked for and different          -> excluded
+#   age        inside the wanted range          +W_AGE, outside: up to -W_AGE
+#   gender     / size match or mismatch         +/- W_GENDER / W_SIZE
+#   words      breed / color words in common    up to +W_WORDS
+# A criterion the adopter did not state, or the pet record lacks, scores 0.
+#
+# Run:  python pet_matching.py --adopter 12 [--top 10]
+#       python pet_matching.py --pet 27 [--top 10]
+import argparse
+import re
+import time
+
+import numpy as np
+import mysql.connector
+
+from db_config import DB_CONFIG
+from description_parser import (SIZE_ORDER, color_tokens, normalize_size,
+                                parse_description)
+
+TOP_K = 10
+BATCH_SIZE = 512        # adopters scored per array pass
+
+W_AGE = 2.0
+W_GENDER = 1.0
+W_SIZE = 1.5
+W_WORDS = 2.0
+
+# Preference words (and PET.species spellings) -> SPECIES name, upper-cased;
+# the names and aliases follow species.SPECIES_SEED
+SPECIES_WORDS = {
+    "CAT": "CAT", "CATS": "CAT", "KITTEN": "CAT", "KITTENS": "CAT", "KITTY": "CAT",
+    "FELINE": "CAT",
+    "DOG": "DOG", "DOGS": "DOG", "PUPPY": "DOG", "PUPPIES": "DOG", "PUP": "DOG",
+    "CANINE": "DOG",
+    "BIRD": "BIRD", "BIRDS": "BIRD", "PARAKEET": "BIRD", "PARROT": "BIRD",
+    "BUDGIE": "BIRD", "COCKATIEL": "BIRD",
+    "RABBIT": "RABBIT", "RABBITS": "RABBIT", "BUNNY": "RABBIT", "BUNNIES": "RABBIT",
+    "SMALL ANIMAL": "SMALL ANIMAL", "GUINEA PIG": "SMALL ANIMAL", "GUINEA": "SMALL ANIMAL",
+    "HAMSTER": "SMALL ANIMAL", "HAMSTERS": "SMALL ANIMAL", "GERBIL": "SMALL ANIMAL",
+    "FERRET": "SMALL ANIMAL", "MOUSE": "SMALL ANIMAL", "MICE": "SMALL ANIMAL",
+    "REPTILE": "REPTILE", "SNAKE": "REPTILE", "PYTHON": "REPTILE", "LIZARD": "REPTILE",
+    "TURTLE": "REPTILE", "TORTOISE": "REPTILE",
+    "OTHER": "OTHER",
+}
+GENDERS = ("M", "F")
+GENDER_WORDS = {"MALE": "M", "BOY": "M", "FEMALE": "F", "GIRL": "F"}
+SIZE_WORDS = {"SMALL": "SMALL", "LITTLE": "SMALL", "TINY": "SMALL",
+              "MEDIUM": "MEDIUM", "MID": "MEDIUM", "LARGE": "LARGE", "BIG": "LARGE"}
+# Age words -> (min months, max months)
+AGE_WORDS = {
+    "KITTEN": (0, 12), "KITTENS": (0, 12), "PUPPY": (0, 12), "PUPPIES": (0, 12),
+    "BABY": (0, 12), "YOUNG": (0, 24), "ADULT": (12, None), "SENIOR": (84, None),
+}
+# Spelled-out words -> the abbreviations used in PET.breed
+BREED_WORDS = {
+    "AMERICAN": "AM", "TERRIER": "TER", "SHORTHAIR": "SH", "LONGHAIR": "LH",
+    "MEDIUMHAIR": "MH", "RETRIEVER": "RETR", "SHEPHERD": "SHEPHERD",
+    "MIXED": "MIX", "GREY": "GRAY",
+}
+
+_WORD = re.compile(r"[A-Z0-9]+")
+_AGE_LIMIT = re.compile(
+    r"\b(UNDER|BELOW|YOUNGER THAN|LESS THAN|OVER|ABOVE|OLDER THAN|AT LEAST)\s+"
+    r"(\d+)\s*(YEARS?|YRS?|MONTHS?|MOS?)")
+_AGE_SPAN = re.compile(r"\b(\d+)\s*(?:-|TO)\s*(\d+)\s*(YEARS?|YRS?|MONTHS?|MOS?)")
+
+
+def _months(number, unit):
+    return int(number) * (12 if unit.startswith("Y") else 1)
+
+
+def parse_preferences(text):
+    """
+    Criteria from an adopter's free-text preferences:
+    {"species": set, "gender": "M"/"F"/None, "size": str/None,
+     "age_min": months/None, "age_max": months/None, "words": set}
+    """
+    text = (text or "").upper()
+    words = _WORD.findall(text)
+    criteria = {"species": set(), "gender": None, "size": None,
+                "age_min": None, "age_max": None, "words": set()}
+    for pair in zip(words, words[1:]):
+        if " ".join(pair) in SPECIES_WORDS:      # "guinea pig", "small animal"
+            criteria["species"].add(SPECIES_WORDS[" ".join(pair)])
+    for word in words:
+        if word in SPECIES_WORDS and word != "OTHER":
+            criteria["species"].add(SPECIES_WORDS[word])
+        if word in GENDER_WORDS:
+            criteria["gender"] = GENDER_WORDS[word]
+        if word in SIZE_WORDS:
+            criteria["size"] = SIZE_WORDS[word]
+        if word in AGE_WORDS:
+            criteria["age_min"], criteria["age_max"] = AGE_WORDS[word]
+        criteria["words"].add(BREED_WORDS.get(word, word))
+
+    span = _AGE_SPAN.search(text)
+    if span:
+        criteria["age_min"] = _months(span.group(1), span.group(3))
+        criteria["age_max"] = _months(span.group(2), span.group(3))
+    for bound, number, unit in _AGE_LIMIT.findall(text):
+        if bound in ("UNDER", "BELOW", "YOUNGER THAN", "LESS THAN"):
+            criteria["age_max"] = _months(number, unit)
+        else:
+            criteria["age_min"] = _months(number, unit)
+    return criteria
+
+
+def species_name(text):
+    """
+    SPECIES name (upper-cased) for a PET.species value, mapped like the
+    preference words; unknown spellings are kept as they are.
+    """
+    key = " ".join((text or "").upper().split())
+    if not key:
+        return None
+    if key in SPECIES_WORDS:
+        return SPECIES_WORDS[key]
+    for word in _WORD.findall(key):
+        if word in SPECIES_WORDS:
+            return SPECIES_WORDS[word]
+    return key
+
+
+def pet_words(breed, color):
+    """Breed and color words a pet can be matched on."""
+    return set(_WORD.findall((breed or "").upper())) | color_tokens(color)
+
+
+def _code(values, vocabulary):
+    """Index of each value in vocabulary, -1 for None / unknown."""
+    lookup = {v: i for i, v in enumerate(vocabulary)}
+    return np.array([lookup.get(v, -1) for v in values], dtype=np.int16)
+
+
+class MatchEngine:
+    """
+    Available pets and adopters encoded as arrays; scores them against
+    each other.
+
+    pets:     [(pet_id, species, breed, gender, age, description)], species
+              being the SPECIES name or the free PET.species text
+    adopters: [(adopter_id, preferences)]
+
+    Pets with the same species, gender, size, age and words always score
+    the same, and so do adopters with the same parsed criteria, so scoring
+    runs over distinct pet and adopter *profiles* and results are expanded
+    back to ids at the end.
+    """
+
+    def __init__(self, pets, adopters):
+        self.pet_ids = np.array([p[0] for p in pets], dtype=np.int64)
+        self.adopter_ids = np.array([a[0] for a in adopters], dtype=np.int64)
+        self._pet_index = {pid: i for i, pid in enumerate(self.pet_ids.tolist())}
+        self._adopter_index = {aid: i for i, aid in enumerate(self.adopter_ids.tolist())}
+        self._encode_pets(pets)
+        self._encode_adopters([parse_preferences(a[1]) for a in adopters])
+
+    # ---------- encoding ----------
+    def _encode_pets(self, pets):
+        species, genders, sizes, ages, words = [], [], [], [], []
+        for _, pet_species, breed, gender, age, description in pets:
+            parsed = parse_description(description)
+            species.append(species_name(pet_species))
+            genders.append((gender or "").strip().upper()[:1] or None)
+            sizes.append(parsed["size"])
+            # the description has months; PET.age only whole years
+            months = parsed["age_months"]
+            if months is None and age is not None:
+                months = int(age) * 12
+            ages.append(-1 if months is None else months)
+            words.append(frozenset(pet_words(breed, parsed["color"])))
+
+        # species x gender x size combined into one small "category" code;
+        # each part is shifted by one so unknown (-1) becomes 0
+        self.species_vocab = sorted({s for s in species if s})
+        n_species = len(self.species_vocab) + 1
+        n_genders = len(GENDERS) + 1
+        n_sizes = len(SIZE_ORDER) + 1
+        category = ((_code(species, self.species_vocab) + 1) * n_genders * n_sizes
+                    + (_code(genders, GENDERS) + 1) * n_sizes
+                    + (_code(sizes, SIZE_ORDER) + 1))
+        combos = np.arange(n_species * n_genders * n_sizes)
+        self._cat_species = combos // (n_genders * n_sizes) - 1
+        self._cat_gender = combos // n_sizes % n_genders - 1
+        self._cat_size = combos % n_sizes - 1
+
+        # ages 0..max, with unknown as the extra last column
+        ages = np.array(ages, dtype=np.int32)
+        self.max_age = int(ages.max(initial=0))
+        age_index = np.where(ages >= 0, ages, self.max_age + 1)
+
+        word_sets = {ws: i for i, ws in enumerate(dict.fromkeys(words))}
+        keys = np.stack([category.astype(np.int32), age_index,
+                         np.array([word_sets[ws] for ws in words], dtype=np.int32)],
+                        axis=1) if pets else np.empty((0, 3), dtype=np.int32)
+        profiles, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        self.prof_category = profiles[:, 0]
+        self.prof_age = profiles[:, 1]
+        self._profile_pets = _group(inverse, len(profiles))
+
+        # word x profile matrix: row w is 1 for profiles having word w,
+        # plus an all-zero last row that -1 padding indexes
+        vocab = sorted(set().union(*word_sets))
+        self.word_vocab = {w: i for i, w in enumerate(vocab)}
+        set_words = np.zeros((len(vocab) + 1, len(word_sets)), dtype=np.float32)
+        for ws, col in word_sets.items():
+            for w in ws:
+                set_words[self.word_vocab[w], col] = 1.0
+        self.prof_words = set_words[:, profiles[:, 2]]
+
+    def _encode_adopters(self, criteria):
+        species_index = {s: i for i, s in enumerate(self.species_vocab)}
+        profiles = {}
+        inverse = np.empty(len(criteria), dtype=np.int64)
+        for row, c in enumerate(criteria):
+            key = (tuple(sorted(c["species"])), c["gender"], normalize_size(c["size"]),
+                   c["age_min"], c["age_max"],
+                   tuple(sorted(self.word_vocab[w] for w in c["words"] if w in self.word_vocab)))
+            inverse[row] = profiles.setdefault(key, len(profiles))
+        self._profile_adopters = _group(inverse, len(profiles))
+        keys = list(profiles)
+
+        n = len(keys)
+        # species wanted; the extra last column is "unknown species"
+        self.want_species = np.zeros((n, len(self.species_vocab) + 1), dtype=bool)
+        self.any_species = np.array([not k[0] for k in keys], dtype=bool)
+        for row, key in enumerate(keys):
+            for s in key[0]:
+                if s in species_index:
+                    self.want_species[row, species_index[s]] = True
+        self.want_gender = _code([k[1] for k in keys], GENDERS)
+        self.want_size = _code([k[2] for k in keys], SIZE_ORDER)
+        self.age_min = np.array([-np.inf if k[3] is None else k[3] for k in keys],
+                                dtype=np.float32)
+        self.age_max = np.array([np.inf if k[4] is None else k[4] for k in keys],
+                                dtype=np.float32)
+
+        # words as a padded index matrix (-1 = none)
+        width = max((len(k[5]) for k in keys), default=0)
+        self.want_words = np.full((n, max(width, 1)), -1, dtype=np.int32)
+        for row, key in enumerate(keys):
+            self.want_words[row, :len(key[5])] = key[5]
+        self.word_count = np.array([len(k[5]) for k in keys], dtype=np.float32)
+
+    # ---------- scoring ----------
+    @staticmethod
+    def _match(wanted, have, weight):
+        """+weight on a match, -weight on a mismatch, 0 if either side is unknown."""
+        known = (wanted[:, None] >= 0) & (have[None, :] >= 0)
+        same = wanted[:, None] == have[None, :]
+        return np.where(known, np.where(same, weight, -weight), 0.0).astype(np.float32)
+
+    def score(self, rows, cols=None):
+        """
+        Scores (len(rows) x len(cols)) of adopter profiles rows against pet
+        profiles cols (default: all pet profiles).
+        """
+        if cols is None:
+            cols = np.arange(len(self._profile_pets))
+        # Per adopter, a small table over the category codes and ages ...
+        species = np.where(self._cat_species >= 0, self._cat_species, len(self.species_vocab))
+        ok = self.any_species[rows, None] | self.want_species[rows][:, species]
+        categories = (self._match(self.want_gender[rows], self._cat_gender, W_GENDER)
+                      + self._match(self.want_size[rows], self._cat_size, W_SIZE))
+        categories[~ok] = -np.inf
+
+        # age: full marks inside the range, falling off a year at a time outside
+        age = np.arange(self.max_age + 1, dtype=np.float32)[None, :]
+        distance = np.maximum(np.maximum(self.age_min[rows, None] - age,
+                                         age - self.age_max[rows, None]), 0.0)
+        ages = np.where(distance == 0, W_AGE, -np.minimum(distance / 12.0, W_AGE))
+        has_age = np.isfinite(self.age_min[rows]) | np.isfinite(self.age_max[rows])
+        ages = np.where(has_age[:, None], ages, 0.0).astype(np.float32)
+        ages = np.hstack([ages, np.zeros((len(rows), 1), dtype=np.float32)])   # unknown age
+
+        # ... looked up for every pet profile
+        scores = categories[:, self.prof_category[cols]]
+        scores += ages[:, self.prof_age[cols]]
+
+        # words in common, as a share of the adopter's words: adopter x word
+        # times word x profile (padding -1 hits the all-zero last row)
+        wanted = np.zeros((len(rows), self.prof_words.shape[0]), dtype=np.float32)
+        wanted[np.arange(len(rows))[:, None], self.want_words[rows]] = 1.0
+        wanted *= (W_WORDS / np.maximum(self.word_count[rows], 1.0))[:, None]
+        scores += wanted @ self.prof_words[:, cols]
+        return scores
+
+    @staticmethod
+    def _top(scores, k, axis):
+        """Indexes of the k best scores along axis, best first."""
+        k = min(k, scores.shape[axis])
+        part = np.argpartition(-scores, k - 1, axis=axis).take(range(k), axis=axis)
+        order = np.argsort(-np.take_along_axis(scores, part, axis=axis), axis=axis, kind="stable")
+        return np.take_along_axis(part, order, axis=axis)
+
+    @staticmethod
+    def _expand(members, ids, profiles, scores, k):
+        """[(id, score)] for the first k members of the given best profiles."""
+        found = []
+        for profile, score in zip(profiles, scores):
+            if not np.isfinite(score) or len(found) >= k:
+                break
+            for i in members[profile][:k - len(found)]:
+                found.append((int(ids[i]), float(score)))
+        return found
+
+    def matches_for_adopters(self, adopter_ids=None, k=TOP_K):
+        """{adopter_id: [(pet_id, score)]} best pets first."""
+        if adopter_ids is None:
+            rows = np.arange(len(self.adopter_ids))
+        else:
+            rows = np.array([self._adopter_index[a] for a in adopter_ids
+                             if a in self._adopter_index], dtype=np.int64)
+        profile_of = np.empty(len(self.adopter_ids), dtype=np.int64)
+        for profile, members in enumerate(self._profile_adopters):
+            profile_of[members] = profile
+        wanted = np.unique(profile_of[rows])
+
+        found = {}
+        for start in range(0, len(wanted) if len(self.pet_ids) else 0, BATCH_SIZE):
+            batch = wanted[start:start + BATCH_SIZE]
+            scores = self.score(batch)
+            top = self._top(scores, k, axis=1)
+            best = np.take_along_axis(scores, top, axis=1)
+            for i, profile in enumerate(batch):
+                found[profile] = self._expand(self._profile_pets, self.pet_ids,
+                                              top[i], best[i], k)
+        return {int(self.adopter_ids[r]): found.get(profile_of[r], []) for r in rows}
+
+    def matches_for_pets(self, pet_ids=None, k=TOP_K):
+        """{pet_id: [(adopter_id, score)]} best adopters first."""
+        if pet_ids is None:
+            cols = np.arange(len(self.pet_ids))
+        else:
+            cols = np.array([self._pet_index[p] for p in pet_ids if p in self._pet_index],
+                            dtype=np.int64)
+        profile_of = np.empty(len(self.pet_ids), dtype=np.int64)
+        for profile, members in enumerate(self._profile_pets):
+            profile_of[members] = profile
+        wanted = np.unique(profile_of[cols])
+
+        found = {}
+        rows = np.arange(len(self._profile_adopters))
+        for start in range(0, len(wanted) if len(rows) else 0, BATCH_SIZE):
+            batch = wanted[start:start + BATCH_SIZE]
+            # pet profiles x adopter profiles, so each pet's row is contiguous
+            scores = np.ascontiguousarray(self.score(rows, batch).T)
+            top = self._top(scores, k, axis=1)
+            best = np.take_along_axis(scores, top, axis=1)
+            for j, profile in enumerate(batch):
+                found[profile] = self._expand(self._profile_adopters, self.adopter_ids,
+                                              top[j], best[j], k)
+        return {int(self.pet_ids[c]): found.get(profile_of[c], []) for c in cols}
+
+
+def _group(inverse, count):
+    """Indexes grouped by their value in inverse: list of count arrays."""
+    if count == 0:
+        return []
+    order = np.argsort(inverse, kind="stable")
+    return np.split(order, np.cumsum(np.bincount(inverse, minlength=count))[:-1])
+
+
+def load_engine(connection):
+    """MatchEngine over the Available pets and all adopters with preferences."""
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT P.pet_id, COALESCE(S.name, P.species), P.breed, P.gender,
+                   P.age, P.description
+            FROM PET P
+            LEFT JOIN SPECIES S ON S.species_id = P.species_id
+            WHERE P.adoption_status = 'Available'
+        """)
+        pets = cursor.fetchall()
+        cursor.execute("""
+            SELECT adopter_id, preferences
+            FROM ADOPTER
+            WHERE preferences IS NOT NULL AND preferences <> ''
+        """)
+        adopters = cursor.fetchall()
+    finally:
+        cursor.close()
+    return MatchEngine(pets, adopters)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match adopters and available pets")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--adopter", type=int, help="best pets for this adopter")
+    group.add_argument("--pet", type=int, help="best adopters for this pet")
+    parser.add_argument("--top", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        started = time.perf_counter()
+        engine = load_engine(connection)
+        loaded = time.perf_counter()
+        if args.pet is not None:
+            matches = engine.matches_for_pets([args.pet], args.top)
+            label = "adopter"
+        else:
+            ids = None if args.adopter is None else [args.adopter]
+            matches = engine.matches_for_adopters(ids, args.top)
+            label = "pet"
+        done = time.perf_counter()
+    finally:
+        connection.close()
+
+    if args.adopter is None and args.pet is None:
+        print(f"Matched {len(engine.adopter_ids)} adopter(s) against "
+              f"{len(engine.pet_ids)} pet(s): load {loaded - started:.2f}s, "
+              f"scoring {done - loaded:.2f}s")
+    else:
+        for key, found in matches.items():
+            for rank, (other_id, score) in enumerate(found, start=1):
+                print(f"{rank:3}. {label} {other_id:<8} score {score:.2f}")
+        if not any(matches.values()):
+            print("No matches.")
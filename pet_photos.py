@@ -0,0 +1,237 @@
+# pet_photos.py - pet photos: content-addressed store and table thumbnails
+#
+# Photos live on disk, not in MySQL. store_photo() copies an image into
+# PHOTO_STORE_DIR under the SHA-256 of its bytes (so the same photo is
+# stored once) and PET.photo_hash references it.
+#
+# Thumbnails are generated once per photo into PHOTO_STORE_DIR/thumbs on a
+# worker thread. ThumbnailCache keeps the Tk images in memory, least
+# recently used first out once a byte budget is exceeded, and PhotoColumn
+# shows them in a pet Treeview for the rows currently on screen only.
+#
+# Needs Pillow; without it pets can still be listed and edited, photos are
+# just not shown or accepted.
+import hashlib
+import math
+import os
+import queue
+import shutil
+import threading
+from collections import OrderedDict
+
+from db_config import PHOTO_STORE_DIR, THUMBNAIL_CACHE_BYTES
+from schema_utils import ensure_column
+
+try:
+    from PIL import Image, ImageTk
+except ImportError:
+    Image = ImageTk = None
+
+PHOTO_TYPES = [("Images", "*.jpg *.jpeg *.png *.gif *.bmp *.webp")]
+THUMB_SIZE = 40
+THUMB_POLL_MS = 50
+
+
+def photos_supported():
+    return Image is not None
+
+
+def ensure_photo_column(connection):
+    """PET.photo_hash: SHA-256 of the pet's photo in the store, or NULL."""
+    ensure_column(connection, "PET", "photo_hash", "CHAR(64) NULL")
+
+
+def _blob_path(digest, root=PHOTO_STORE_DIR):
+    # two-level fan-out keeps directories small
+    return os.path.join(root, digest[:2], digest)
+
+
+def _thumb_path(digest, size, root=PHOTO_STORE_DIR):
+    return os.path.join(root, "thumbs", digest[:2], f"{digest}_{size}.png")
+
+
+def store_photo(src_path, root=PHOTO_STORE_DIR):
+    """
+    Copy an image file into the store and return its hash.
+    Raises ValueError if the file is not an image Pillow can read.
+    """
+    if Image is None:
+        raise ValueError("Photo support needs the Pillow package.")
+    try:
+        with Image.open(src_path) as img:
+            img.verify()
+    except (OSError, SyntaxError) as e:
+        raise ValueError(f"Not a readable image: {e}")
+
+    sha = hashlib.sha256()
+    with open(src_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    dest = _blob_path(digest, root)
+    if not os.path.exists(dest):
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        shutil.copyfile(src_path, tmp)
+        os.replace(tmp, dest)
+    return digest
+
+
+def make_thumbnail(digest, size=THUMB_SIZE, root=PHOTO_STORE_DIR):
+    """Path of the size x size thumbnail PNG, generating it on first use."""
+    path = _thumb_path(digest, size, root)
+    if os.path.exists(path):
+        return path
+    with Image.open(_blob_path(digest, root)) as img:
+        img.thumbnail((size, size))
+        thumb = img.convert("RGBA")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    thumb.save(tmp, "PNG")
+    os.replace(tmp, path)
+    return path
+
+
+class ThumbnailCache:
+    """
+    Tk thumbnail images by photo hash, evicting the least recently used
+    once their decoded size (width * height * 4 bytes) exceeds max_bytes.
+    """
+
+    def __init__(self, max_bytes=THUMBNAIL_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._images = OrderedDict()    # digest -> (PhotoImage, bytes)
+
+    def get(self, digest):
+        entry = self._images.get(digest)
+        if entry is None:
+            return None
+        self._images.move_to_end(digest)
+        return entry[0]
+
+    def put(self, digest, image):
+        size = image.width() * image.height() * 4
+        old = self._images.pop(digest, None)
+        if old is not None:
+            self.used_bytes -= old[1]
+        self._images[digest] = (image, size)
+        self.used_bytes += size
+        # keep at least the newest image, whatever the budget
+        while self.used_bytes > self.max_bytes and len(self._images) > 1:
+            _, (_, evicted) = self._images.popitem(last=False)
+            self.used_bytes -= evicted
+
+
+class PhotoColumn:
+    """
+    Thumbnails in the tree column (#0) of a pet Treeview whose rows carry
+    the photo hash in hash_column. Only rows on screen get an image; rows
+    scrolled away drop theirs so the cache is free to evict them.
+    Call refresh() after the rows change; scrolling is tracked here.
+    """
+
+    def __init__(self, tree, hash_column, cache, size=THUMB_SIZE):
+        self.tree = tree
+        self.hash_column = hash_column
+        self.cache = cache
+        self.size = size
+        # items that currently have an image -> (digest, PhotoImage); holding
+        # the image here keeps it alive even if the cache evicts it (Tk blanks
+        # an image once its last Python reference is gone)
+        self._shown = {}
+        self._pending = set()           # digests queued for the worker
+        self._failed = set()            # digests with no usable photo
+        self._jobs = queue.Queue()
+        self._done = queue.Queue()
+        self._scheduled = False
+        self._collecting = False
+        if Image is None:
+            return
+        tree.column("#0", width=size + 16, minwidth=size + 16, stretch=False, anchor="center")
+        tree.heading("#0", text="")
+        # wrap the scrollbar callback to hear about scrolling
+        scroll = tree.cget("yscrollcommand")
+
+        def on_scroll(first, last):
+            if scroll:
+                tree.tk.call(scroll, first, last)
+            self.refresh()
+
+        tree.configure(yscrollcommand=on_scroll)
+        threading.Thread(target=self._work, name="thumbnails", daemon=True).start()
+
+    def refresh(self):
+        """Update the images of the visible rows (coalesced to idle time)."""
+        if Image is None or self._scheduled:
+            return
+        self._scheduled = True
+        self.tree.after_idle(self._update)
+
+    def _visible_items(self):
+        # pet tables are flat lists, so the scroll fractions map to row indexes
+        items = self.tree.get_children()
+        first, last = self.tree.yview()
+        return items[int(first * len(items)):math.ceil(last * len(items))]
+
+    def _update(self):
+        self._scheduled = False
+        tree = self.tree
+        if not tree.winfo_exists():
+            return
+        visible = set()
+        for item in self._visible_items():
+            visible.add(item)
+            digest = tree.set(item, self.hash_column)
+            if not digest or digest == "None" or digest in self._failed:
+                continue
+            pinned = self._shown.get(item)
+            image = pinned[1] if pinned and pinned[0] == digest else self.cache.get(digest)
+            if image is not None:
+                tree.item(item, image=image)
+                self._shown[item] = (digest, image)
+            elif digest not in self._pending:
+                self._pending.add(digest)
+                self._jobs.put(digest)
+        for item in set(self._shown) - visible:
+            if tree.exists(item):
+                tree.item(item, image="")
+            del self._shown[item]
+        if self._pending and not self._collecting:
+            self._collecting = True
+            tree.after(THUMB_POLL_MS, self._collect)
+
+    def _collect(self):
+        """Turn finished thumbnails into Tk images (Tk calls stay on this thread)."""
+        self._collecting = False
+        got = False
+        while True:
+            try:
+                digest, path = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self._pending.discard(digest)
+            got = True
+            if path is None:
+                self._failed.add(digest)
+                continue
+            try:
+                self.cache.put(digest, ImageTk.PhotoImage(file=path))
+            except OSError:
+                self._failed.add(digest)
+        if got:
+            self.refresh()
+        elif self._pending:
+            self._collecting = True
+            self.tree.after(THUMB_POLL_MS, self._collect)
+
+    def _work(self):
+        while True:
+            digest = self._jobs.get()
+            try:
+                path = make_thumbnail(digest, self.size)
+            except Exception as e:     # unreadable / oversized image: skip it
+                print(f"No thumbnail for photo {digest}: {e}")
+                path = None
+            self._done.put((digest, path))
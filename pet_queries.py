@@ -0,0 +1,110 @@
+# pet_queries.py - read queries on PET shared by the app and pet_api.py
+
+PET_COLUMNS = ("pet_id", "name", "gender", "species", "breed", "age",
+               "description", "adoption_status", "arrival_date",
+               "shelter_branch_id", "branch_name")
+
+
+def fetch_species_counts(connection, branch_id: int = None):
+    """
+    Returns list of (species_id, count) over all pets, or one branch's pets.
+    species_id is None for pets not mapped to SPECIES yet.
+    """
+    sql = "SELECT species_id, COUNT(*) FROM PET"
+    params = ()
+    if branch_id is not None:
+        sql += " WHERE shelter_branch_id = %s"
+        params = (branch_id,)
+    sql += " GROUP BY species_id"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def fetch_branch_counts(connection, available_only: bool = False,
+                        branch_id: int = None):
+    """
+    Returns list of (branch_id, branch_name, pet_count) for every branch
+    (or just branch_id), ordered by branch name. available_only counts
+    only 'Available' pets.
+    """
+    status_filter = "AND p.adoption_status = 'Available'" if available_only else ""
+    branch_filter = "WHERE b.branch_id = %s" if branch_id is not None else ""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT b.branch_id, b.branch_name, COUNT(p.pet_id)
+            FROM SHELTER_BRANCH b
+            LEFT JOIN PET p ON p.shelter_branch_id = b.branch_id
+                            {status_filter}
+            {branch_filter}
+            GROUP BY b.branch_id, b.branch_name
+            ORDER BY b.branch_name
+        """, (branch_id,) if branch_id is not None else ())
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def fetch_available_pets(connection, after_id: int = None, limit: int = 50,
+                         branch_id: int = None, size: str = None,
+                         max_age_months: int = None):
+    """
+    One page of adoptable pets, keyset-paged on pet_id, optionally only
+    one size (SMALL / MEDIUM / LARGE / XLARGE) and / or at most
+    max_age_months old (both parsed from the description).
+    Returns list of tuples in PET_COLUMNS order.
+    """
+    where = ["p.adoption_status = 'Available'"]
+    params = []
+    if size is not None:
+        where.append("p.size = %s")
+        params.append(size)
+    if max_age_months is not None:
+        where.append("p.age_months <= %s")
+        params.append(max_age_months)
+    if after_id is not None:
+        where.append("p.pet_id > %s")
+        params.append(after_id)
+    if branch_id is not None:
+        where.append("p.shelter_branch_id = %s")
+        params.append(branch_id)
+    params.append(limit)
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT p.pet_id, p.name, p.gender, p.species, p.breed, p.age,
+                   p.description, p.adoption_status, p.arrival_date,
+                   p.shelter_branch_id, b.branch_name
+            FROM PET p
+            LEFT JOIN SHELTER_BRANCH b ON b.branch_id = p.shelter_branch_id
+            WHERE {" AND ".join(where)}
+            ORDER BY p.pet_id
+            LIMIT %s
+        """, tuple(params))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def fetch_pet(connection, pet_id: int):
+    """
+    Single pet in PET_COLUMNS order, or None.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT p.pet_id, p.name, p.gender, p.species, p.breed, p.age,
+                   p.description, p.adoption_status, p.arrival_date,
+                   p.shelter_branch_id, b.branch_name
+            FROM PET p
+            LEFT JOIN SHELTER_BRANCH b ON b.branch_id = p.shelter_branch_id
+            WHERE p.pet_id = %s
+        """, (pet_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
@@ -0,0 +1,67 @@
+# report_cache.py - last report snapshot on disk, per role and branch scope
+#
+# The scheduler saves every snapshot it computes; on the next launch the
+# Reports page renders the saved one immediately and the scheduler
+# revalidates it in the background (see report_scheduler.py).
+#
+# Files are gzipped JSON in REPORT_CACHE_DIR, readable only by the current
+# user. A file is ignored if it was written for a different dataset layout
+# (CACHE_SCHEMA_VERSION), a different database, role or branch.
+import gzip
+import json
+import os
+
+from db_config import DB_CONFIG, REPORT_CACHE_DIR
+
+# Bump when the report_data dataset layout changes
+CACHE_SCHEMA_VERSION = 1
+
+
+def _database_id():
+    return f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}"
+
+
+def _path(role, branch_id):
+    scope = "all" if branch_id is None else f"branch{branch_id}"
+    return os.path.join(REPORT_CACHE_DIR, f"reports_{role}_{scope}.json.gz")
+
+
+def save_snapshot(snapshot):
+    """Write a snapshot atomically (temp file + rename)."""
+    os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+    path = _path(snapshot["role"], snapshot["branch_id"])
+    payload = {
+        "schema_version": CACHE_SCHEMA_VERSION,
+        "database": _database_id(),
+        "role": snapshot["role"],
+        "branch_id": snapshot["branch_id"],
+        "computed_at": snapshot["computed_at"],
+        "change_id": snapshot["change_id"],
+        "data": snapshot["data"],
+    }
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"))
+    os.chmod(tmp, 0o600)
+    os.replace(tmp, path)
+
+
+def load_snapshot(role, branch_id):
+    """The saved snapshot for role / branch_id, or None."""
+    try:
+        with gzip.open(_path(role, branch_id), "rt", encoding="utf-8") as f:
+            payload = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (payload.get("schema_version") != CACHE_SCHEMA_VERSION
+            or payload.get("database") != _database_id()
+            or payload.get("role") != role
+            or payload.get("branch_id") != branch_id):
+        return None
+    return {
+        "role": role,
+        "branch_id": branch_id,
+        "computed_at": payload["computed_at"],
+        "change_id": payload["change_id"],
+        "data": payload["data"],
+    }
@@ -0,0 +1,523 @@
+# report_data.py - query side of the Reports & Analytics screen
+#
+# compute_reports() runs every report query for a role / branch scope and
+# returns a plain dataset (lists, strings and numbers only, so it can be
+# cached and written to disk). reports_view.py renders a dataset; it never
+# queries the database itself.
+#
+# Dataset layout:
+#   {"kpis": [(title, value), ...],
+#    "sections": [{"key", "title", "subtitle", "parts": [part, ...]}, ...],
+#    "message": None or (title, text) for roles without reports}
+#
+# Parts:
+#   {"kind": "bar",   "title", "labels", "values"}
+#   {"kind": "line",  "title", "labels", "series": {name: values}}
+#   {"kind": "table", "columns", "rows", "height"}
+#   {"kind": "stats", "stats": [(label, value, aggregate or None)], "empty"}
+#   {"kind": "note",  "text", "style": "muted" | "accent"}
+#
+# The pet-based sections read one pet_columns.PetColumns summary (a single
+# vectorized pass over PET held in memory) instead of an aggregate query each.
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import mysql.connector
+
+from change_tracking import latest_change_id
+from pet_columns import PetColumns
+from trend_rollups import fetch_trend
+
+# Medical reports only look this far back, so MySQL can prune the older
+# monthly partitions of MEDICAL_RECORD (see medical_partitions.py)
+MEDICAL_WINDOW_DAYS = 365
+
+# Trend charts (from TREND_ROLLUP, see trend_rollups.py)
+TREND_MONTHS = 12
+TREND_WEEKS = 26
+
+NO_REPORTS_MESSAGE = (
+    "Limited access",
+    "Your account does not have a staff, manager, or admin role, "
+    "so detailed reports are hidden.\n"
+    "Please contact an administrator if you believe this is an error.",
+)
+
+
+def _plain(value):
+    """Database value -> JSON-friendly value."""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _rows(cur):
+    return [tuple(_plain(v) for v in row) for row in cur.fetchall()]
+
+
+def _bar(title, labels, values):
+    return {"kind": "bar", "title": title, "labels": labels, "values": values}
+
+
+def _table(columns, rows, height=6):
+    return {"kind": "table", "columns": list(columns), "rows": rows, "height": height}
+
+
+def _section(key, title, subtitle, *parts):
+    return {"key": key, "title": title, "subtitle": subtitle, "parts": list(parts)}
+
+
+def _percent(part, whole):
+    """ROUND(part * 100 / NULLIF(whole, 0), 1)"""
+    if not whole:
+        return None
+    value = round(part * 100.0 / whole, 1)
+    return int(value) if value.is_integer() else value
+
+
+class _Queries:
+    """Report queries for one branch scope, sharing one cursor."""
+
+    def __init__(self, connection, branch_id=None, pets=None):
+        self.connection = connection
+        self.cur = connection.cursor()
+        self.branch_id = branch_id
+        # pet aggregates for the scope, from the in-memory columns
+        self.pets = pets.summary(branch_id)
+        self._branches = None
+        self._species = None
+
+    def branches(self):
+        """[(branch_id, branch_name, capacity)] in the scope."""
+        if self._branches is None:
+            where, params = self.scope("branch_id", "WHERE")
+            self._branches = self.all(
+                f"SELECT branch_id, branch_name, capacity FROM SHELTER_BRANCH{where}", params)
+        return self._branches
+
+    def species_name(self, species_id):
+        if self._species is None:
+            self._species = dict(self.all("SELECT species_id, name FROM SPECIES"))
+        return self._species.get(species_id, "Unknown")
+
+    def branch_pets(self, branch_id):
+        return self.pets["by_branch"].get(branch_id, {"pets": 0, "available": 0,
+                                                      "age": (None, None, None, 0)})
+
+    def scope(self, column, keyword="AND"):
+        """(sql, params) restricting *column* to the scoped branch."""
+        if self.branch_id is None:
+            return "", ()
+        return f" {keyword} {column} = %s", (self.branch_id,)
+
+    def medical_scope(self, days=MEDICAL_WINDOW_DAYS):
+        """
+        (join, where, params) restricting MEDICAL_RECORD m to the last *days*
+        days and the scoped branch's pets.
+        """
+        since = date.today() - timedelta(days=days)
+        branch, params = self.scope("mp.shelter_branch_id")
+        join = " JOIN PET mp ON mp.pet_id = m.pet_id" if params else ""
+        return join, f" WHERE m.date >= %s{branch}", (since,) + params
+
+    def one(self, sql, params=()):
+        self.cur.execute(sql, params)
+        return tuple(_plain(v) for v in self.cur.fetchone())
+
+    def all(self, sql, params=()):
+        self.cur.execute(sql, params)
+        return _rows(self.cur)
+
+    # ---------- KPI row (same for all roles) ----------
+    def kpis(self):
+        # Pets in our care (total / available)
+        total_pets, available_pets = self.pets["total"], self.pets["available"]
+
+        # Adopted pets, all time (archived adoptions included)
+        where, params = self.scope("shelter_branch_id")
+        adopted_pets = self.one(
+            f"SELECT COUNT(*) FROM pet_all WHERE adoption_status = 'Adopted'{where}",
+            params,
+        )[0]
+
+        join, where, params = self.medical_scope()
+        total_med = self.one(f"SELECT COUNT(*) FROM MEDICAL_RECORD m{join}{where}", params)[0]
+
+        where, params = self.scope("shelter_branch_id", "WHERE")
+        total_staff = self.one(f"SELECT COUNT(*) FROM STAFF{where}", params)[0]
+
+        total_branches = len(self.branches())
+
+        return [
+            ("Total Pets", total_pets or 0),
+            ("Available", available_pets or 0),
+            ("Adopted", adopted_pets or 0),
+            ("Medical Records (12 mo)", total_med or 0),
+            ("Staff", total_staff or 0),
+            ("Branches", total_branches or 0),
+        ]
+
+    # ---------- Staff reports ----------
+    def staff_sections(self):
+        sections = []
+
+        # --- 1. Pets by species (available only) ---
+        rows = sorted(((self.species_name(species_id), total) for species_id, total
+                       in self.pets["available_by_species"].items()),
+                      key=lambda r: -r[1])
+        sections.append(_section(
+            "staff_species",
+            "Staff Report 1: Available Pets by Species",
+            "Distribution of currently available pets, grouped by species.",
+            _bar("Available pets by species", [r[0] for r in rows], [r[1] for r in rows]),
+        ))
+
+        # --- 2. Available pets by branch ---
+        rows = sorted(((name, self.branch_pets(branch_id)["available"])
+                       for branch_id, name, _ in self.branches()),
+                      key=lambda r: (-r[1], r[0]))
+        sections.append(_section(
+            "staff_branches",
+            "Staff Report 2: Available Pets by Branch",
+            "Helps staff see which branches have more animals to care for.",
+            _bar("Available pets per branch",
+                 [r[0].split()[0] for r in rows],  # Just the first word
+                 [r[1] for r in rows]),
+        ))
+
+        # --- 3. Recent medical records (last 30 days) ---
+        join, where, params = self.medical_scope(days=30)
+        rows = self.all(f"""
+            SELECT COALESCE(m.type, 'Unknown') AS type, COUNT(*) AS total
+            FROM MEDICAL_RECORD m{join}{where}
+            GROUP BY COALESCE(m.type, 'Unknown')
+            ORDER BY total DESC
+        """, params)
+        sections.append(_section(
+            "staff_medical",
+            "Staff Report 3: Recent Medical Activity (Last 30 Days)",
+            "Counts of medical records created in the last 30 days, grouped by type.",
+            _bar("Medical records (last 30 days)", [r[0] for r in rows], [r[1] for r in rows]),
+        ))
+
+        # --- 4. Pet Age Statistics (MIN, MAX, AVG, COUNT) ---
+        row = self.pets["available_age"]       # youngest, oldest, average, count
+        stats = []
+        if row and row[3] > 0:
+            stats = [
+                ("Youngest", f"{row[0]} yrs", None),
+                ("Oldest", f"{row[1]} yrs", None),
+                ("Average", f"{row[2]} yrs", None),
+                ("Total Pets", str(row[3]), None),
+            ]
+        sections.append(_section(
+            "staff_ages",
+            "Staff Report 4: Pet Age Statistics",
+            "Age analysis of available pets - youngest, oldest, average",
+            {"kind": "stats", "stats": stats, "empty": "No age data available."},
+        ))
+
+        # --- 5. Medical Records per Pet (COUNT, MAX) ---
+        since = date.today() - timedelta(days=MEDICAL_WINDOW_DAYS)
+        where, params = self.scope("p.shelter_branch_id", "WHERE")
+        rows = self.all(f"""
+            SELECT p.name, p.species, COUNT(m.record_id) AS record_count
+            FROM PET p
+            LEFT JOIN MEDICAL_RECORD m ON p.pet_id = m.pet_id
+                                       AND m.date >= %s{where}
+            GROUP BY p.pet_id, p.name, p.species
+            HAVING COUNT(m.record_id) > 0
+            ORDER BY record_count DESC
+            LIMIT 10
+        """, (since,) + params)
+        sections.append(_section(
+            "staff_most_medical",
+            "Staff Report 5: Pets with Most Medical Records",
+            "Identifies high-care animals needing attention (last 12 months).",
+            _table(("Pet Name", "Species", "# Records"), rows, height=6),
+        ))
+        return sections
+
+    # ---------- Manager reports ----------
+    def manager_sections(self):
+        sections = []
+
+        # --- 1. Adoption applications by status ---
+        # All-time: includes applications moved out by pet_archive.py
+        where, params = self.scope("ap.shelter_branch_id", "WHERE")
+        join = " JOIN pet_all ap ON ap.pet_id = a.pet_id" if params else ""
+        rows = self.all(f"""
+            SELECT COALESCE(a.status, 'Unknown') AS status, COUNT(*) AS total
+            FROM adoption_application_all a{join}{where}
+            GROUP BY COALESCE(a.status, 'Unknown')
+            ORDER BY total DESC
+        """, params)
+        sections.append(_section(
+            "manager_pipeline",
+            "Manager Report 1: Adoption Pipeline",
+            "Overview of adoption applications grouped by status. ",
+            _bar("Applications by status", [r[0] for r in rows], [r[1] for r in rows]),
+        ))
+
+        # --- 2. Average pet age by species ---
+        rows = sorted(((self.species_name(species_id), avg_age) for species_id, avg_age
+                       in self.pets["avg_age_by_species"].items()),
+                      key=lambda r: -r[1])
+        sections.append(_section(
+            "manager_avg_age",
+            "Manager Report 2: Average Pet Age by Species",
+            "Helps plan long-term care and adoption strategies. ",
+            _bar("Average age (years)", [r[0] for r in rows], [r[1] for r in rows]),
+        ))
+
+        # --- 3. Staff Distribution by Branch (COUNT, SUM) ---
+        where, params = self.scope("b.branch_id", "WHERE")
+        rows = self.all(f"""
+            SELECT b.branch_name, COUNT(s.staff_id) AS staff_count
+            FROM SHELTER_BRANCH b
+            LEFT JOIN STAFF s ON s.shelter_branch_id = b.branch_id{where}
+            GROUP BY b.branch_id, b.branch_name
+            ORDER BY staff_count DESC
+        """, params)
+        where, params = self.scope("shelter_branch_id", "WHERE")
+        total = self.one(f"SELECT COUNT(*) FROM STAFF{where}", params)[0] or 0
+        sections.append(_section(
+            "manager_staff",
+            "Manager Report 3: Staff Distribution by Branch",
+            "Number of staff members at each branch for resource planning. ",
+            _bar("Staff per branch", [r[0].split()[0] for r in rows], [r[1] for r in rows]),
+            {"kind": "note", "text": f"Total Staff (SUM): {total}", "style": "muted"},
+        ))
+
+        # --- 4. Pet Age Range by Branch (MIN, MAX, AVG, COUNT) ---
+        rows = sorted(((name, *self.branch_pets(branch_id)["age"])
+                       for branch_id, name, _ in self.branches()),
+                      key=lambda r: r[0])
+        sections.append(_section(
+            "manager_age_range",
+            "Manager Report 4: Pet Age Range by Branch",
+            "Age statistics per branch for capacity and care planning. ",
+            _table(("Branch", "Min Age", "Max Age", "Avg Age", "Pet Count"), rows, height=5),
+        ))
+
+        # --- 5. Longest Shelter Stays (MIN arrival_date, DATEDIFF) ---
+        rows = self.pets["longest_stays"]
+        sections.append(_section(
+            "manager_longest_stays",
+            "Manager Report 5: Longest Shelter Stays",
+            "Available pets waiting longest for adoption - prioritize outreach.",
+            _table(("Pet Name", "Species", "Arrival Date", "Days in Shelter"), rows, height=6),
+        ))
+        return sections
+
+    # ---------- Trends (TREND_ROLLUP) ----------
+    def _trend_series(self, period_type, count):
+        """
+        (labels, intake, adoptions) for the last *count* weeks / months,
+        with empty periods filled in as zero.
+        """
+        today = date.today()
+        if period_type == "month":
+            index = today.year * 12 + today.month - 1 - (count - 1)
+            starts = []
+            for i in range(count):
+                y, m = divmod(index + i, 12)
+                starts.append(date(y, m + 1, 1))
+            label_fmt = "%b %Y"
+        else:
+            this_week = today - timedelta(days=today.weekday())
+            starts = [this_week - timedelta(weeks=count - 1 - i) for i in range(count)]
+            label_fmt = "%d %b"
+
+        rows = fetch_trend(self.connection, period_type, starts[0], self.branch_id)
+        by_start = {start: (intake, adoptions) for start, intake, adoptions in rows}
+        labels = [s.strftime(label_fmt) for s in starts]
+        intake = [by_start.get(s, (0, 0))[0] for s in starts]
+        adoptions = [by_start.get(s, (0, 0))[1] for s in starts]
+        return labels, intake, adoptions
+
+    def trend_sections(self):
+        sections = []
+        labels, intake, adoptions = self._trend_series("month", TREND_MONTHS)
+        sections.append(_section(
+            "trend_monthly",
+            "Trends: Monthly Intake vs Adoptions",
+            f"Pets arriving and adopted per month, last {TREND_MONTHS} months.",
+            {"kind": "line", "title": "Per month", "labels": labels,
+             "series": {"Intake": intake, "Adoptions": adoptions}},
+        ))
+        labels, intake, adoptions = self._trend_series("week", TREND_WEEKS)
+        sections.append(_section(
+            "trend_weekly",
+            "Trends: Weekly Intake vs Adoptions",
+            f"Week-by-week view (weeks start Monday), last {TREND_WEEKS} weeks.",
+            {"kind": "line", "title": "Per week", "labels": labels,
+             "series": {"Intake": intake, "Adoptions": adoptions}},
+        ))
+        return sections
+
+    # ---------- Admin reports ----------
+    def admin_sections(self):
+        sections = []
+
+        # --- 1. Users by role ---
+        try:
+            rows = self.all("""
+                SELECT role, COUNT(*) AS total
+                FROM USER_ACCOUNT
+                GROUP BY role
+                ORDER BY role
+            """)
+        except mysql.connector.Error:
+            rows = []
+        sections.append(_section(
+            "admin_roles",
+            "Admin Report 1: User Accounts by Role",
+            "Counts of login accounts in USER_ACCOUNT, grouped by role.",
+            _bar("User accounts by role", [r[0] for r in rows], [r[1] for r in rows]),
+        ))
+
+        # --- 2. Most recent users ---
+        try:
+            rows = self.all("""
+                SELECT username, role, created_at
+                FROM USER_ACCOUNT
+                ORDER BY created_at DESC
+                LIMIT 5
+            """)
+        except mysql.connector.Error:
+            rows = []
+        sections.append(_section(
+            "admin_recent_users",
+            "Admin Report 2: Recently Created Users",
+            "Most recent user accounts in the system.",
+            _table(("Username", "Role", "Created"), rows, height=5),
+        ))
+
+        # --- 3. System-wide Pet Statistics (MIN, MAX, AVG, SUM, COUNT) ---
+        row = self.pets["age"]                 # count, min, max, avg, sum
+        stats = []
+        if row and row[0] > 0:
+            stats = [
+                ("Total Pets", str(row[0]), "COUNT"),
+                ("Youngest", f"{row[1]} yrs", "MIN"),
+                ("Oldest", f"{row[2]} yrs", "MAX"),
+                ("Average Age", f"{row[3]} yrs", "AVG"),
+                ("Sum of Ages", f"{row[4]} yrs", "SUM"),
+            ]
+        sections.append(_section(
+            "admin_pet_stats",
+            "Admin Report 3: System-wide Pet Statistics",
+            "Comprehensive age analysis across all pets.",
+            {"kind": "stats", "stats": stats, "empty": "No pet age data available."},
+        ))
+
+        # --- 4. Medical Records Overview (COUNT, SUM, AVG) ---
+        join, where, params = self.medical_scope()
+        row = self.one(f"""
+            SELECT COUNT(*) AS total_records,
+                   COUNT(DISTINCT m.pet_id) AS pets_with_records,
+                   ROUND(COUNT(*) / NULLIF(COUNT(DISTINCT m.pet_id), 0), 1) AS avg_records_per_pet
+            FROM MEDICAL_RECORD m{join}{where}
+        """, params)
+        # Get busiest vet staff
+        vet_rows = self.all(f"""
+            SELECT CONCAT(s.first_name, ' ', s.last_name) AS vet_name,
+                   COUNT(m.record_id) AS record_count
+            FROM MEDICAL_RECORD m
+            JOIN STAFF s ON m.vet_staff_id = s.staff_id{join}{where}
+            GROUP BY m.vet_staff_id, s.first_name, s.last_name
+            ORDER BY record_count DESC
+            LIMIT 5
+        """, params)
+        parts = [{"kind": "stats", "empty": None, "stats": [
+            ("Total Records", str(row[0] or 0), "COUNT"),
+            ("Pets with Records", str(row[1] or 0), "COUNT"),
+            ("Avg per Pet", str(row[2] or 0), "AVG"),
+        ]}]
+        if vet_rows:
+            parts.append({"kind": "note", "style": "muted",
+                          "text": "Busiest Veterinary Staff (by record count):"})
+            parts.append(_table(("Staff Name", "Records Handled"), vet_rows, height=4))
+        sections.append(_section(
+            "admin_medical",
+            "Admin Report 4: Medical Records Overview",
+            "Medical activity over the last 12 months.",
+            *parts,
+        ))
+
+        # --- 5. Branch Capacity Utilization (COUNT, SUM, AVG) ---
+        branch_rows = []
+        for branch_id, name, capacity in self.branches():
+            current = self.branch_pets(branch_id)["pets"]
+            branch_rows.append((name, current, capacity, _percent(current, capacity)))
+        # highest utilization first, branches without a capacity last
+        branch_rows.sort(key=lambda r: (r[3] is None, -(r[3] or 0)))
+        # System-wide summary
+        total_pets = sum(r[1] for r in branch_rows)
+        total_capacity = sum(r[2] or 0 for r in branch_rows)
+        summary = (total_pets, total_capacity, _percent(total_pets, total_capacity))
+        parts = [_table(("Branch", "Current Pets", "Capacity", "Utilization %"),
+                        branch_rows, height=5)]
+        if summary and summary[1]:
+            parts.append({
+                "kind": "note", "style": "accent",
+                "text": f"System Total: {summary[0] or 0} pets / {summary[1]} capacity = "
+                        f"{summary[2] or 0}% utilization (SUM, AVG)",
+            })
+        sections.append(_section(
+            "admin_capacity",
+            "Admin Report 5: Branch Capacity Utilization",
+            "System-wide capacity analysis across all branches.",
+            *parts,
+        ))
+        return sections
+
+    def close(self):
+        try:
+            self.cur.close()
+        except mysql.connector.Error:
+            pass
+
+
+def current_pets(connection, pets=None):
+    """
+    A PetColumns for *connection*: *pets* caught up if it is already
+    loaded, otherwise (re)loaded. Keep the result to reuse it next time.
+    """
+    pets = pets or PetColumns()
+    if pets.loaded:
+        pets.catch_up(connection)
+    else:
+        # watermark first: a change landing mid-load is just applied twice
+        pets.load(connection, latest_change_id(connection, "PET"))
+    return pets
+
+
+def compute_reports(connection, role, branch_id=None, pets=None):
+    """
+    Run the reports for *role* (admin / manager / staff; anything else gets
+    only the KPI row and a message), optionally restricted to one branch.
+    pets: a PetColumns kept between runs (see current_pets); without one
+    PET is read once for this run.
+    """
+    role = (role or "").lower()
+    q = _Queries(connection, branch_id, current_pets(connection, pets))
+    try:
+        data = {"kpis": q.kpis(), "sections": [], "message": None}
+        if role == "admin":
+            # Admin gets everything
+            data["sections"] = (q.staff_sections() + q.manager_sections()
+                                + q.trend_sections() + q.admin_sections())
+        elif role == "manager":
+            data["sections"] = (q.manager_sections() + q.trend_sections()
+                                + q.staff_sections())
+        elif role == "staff":
+            data["sections"] = q.staff_sections()
+        else:
+            data["message"] = NO_REPORTS_MESSAGE
+        return data
+    finally:
+        q.close()
@@ -0,0 +1,200 @@
+# report_scheduler.py - precompute report datasets in the background
+#
+# The Reports page used to run every report query while the user waited.
+# ReportScheduler keeps a finished snapshot per branch scope instead, so the
+# page can render immediately:
+#   - a background thread with its own connections (primary + optional
+#     replica, via DatabaseRouter) recomputes the dataset for the current
+#     scope every `interval` seconds,
+#   - it polls the DATA_CHANGE high-water mark and recomputes once a burst
+#     of writes has been quiet for `quiet` seconds,
+#   - request_refresh() (the Refresh button, a branch switch) recomputes now.
+#
+# Snapshots are saved to disk (report_cache.py). The saved one for a scope
+# is shown until the thread has revalidated it: it is recomputed right away
+# if data changed since, otherwise once it is `interval` seconds old.
+import threading
+import time
+import traceback
+from datetime import datetime
+
+import mysql.connector
+
+from change_tracking import latest_change_id
+from db_config import (DB_CONFIG, REPLICA_CONFIG, REPLICA_MAX_LAG_SECONDS,
+                       REPORT_QUIET_SECONDS, REPORT_REFRESH_SECONDS)
+from db_router import DatabaseRouter
+from pet_columns import PetColumns
+from report_cache import load_snapshot, save_snapshot
+from report_data import compute_reports
+from trend_rollups import update_trend_rollups
+
+POLL_SECONDS = 2
+RETRY_SECONDS = 15
+
+
+class ReportScheduler:
+    """
+    Background producer of report snapshots for one role.
+
+    A snapshot is a dict:
+        {"role", "branch_id", "computed_at" (ISO timestamp),
+         "change_id" (DATA_CHANGE high-water mark it reflects), "data"}
+    where data is a report_data.compute_reports() dataset.
+    """
+
+    def __init__(self, role, branch_scope=None, interval=REPORT_REFRESH_SECONDS,
+                 quiet=REPORT_QUIET_SECONDS):
+        self.role = role
+        self.branch_scope = branch_scope or (lambda: None)
+        self.interval = interval
+        self.quiet = quiet
+        self.last_error = None
+        self.save_failed = False        # last_error came from saving, not computing
+        self.busy = False
+        self._snapshots = {}            # branch_id -> snapshot
+        self._disk_checked = set()      # branch_ids already looked up on disk
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._refresh = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._seen_change = None        # last change_id observed ...
+        self._seen_at = 0.0             # ... and when it moved
+        self._pets = PetColumns()       # PET in memory, caught up before each run
+        self._changed_pets = set()      # pet_ids written by this client since
+
+    # ---------- API used by the UI thread ----------
+    def snapshot(self, branch_id=None):
+        with self._lock:
+            snapshot = self._snapshots.get(branch_id)
+            if snapshot is not None or branch_id in self._disk_checked:
+                return snapshot
+            self._disk_checked.add(branch_id)
+        snapshot = load_snapshot(self.role, branch_id)
+        if snapshot is None:
+            return None
+        # Age it by its timestamp so the interval check treats it as such
+        age = (datetime.now() - datetime.fromisoformat(snapshot["computed_at"])).total_seconds()
+        snapshot["_computed_mono"] = time.monotonic() - max(age, 0.0)
+        with self._lock:
+            # the thread may have computed a fresh one meanwhile
+            return self._snapshots.setdefault(branch_id, snapshot)
+
+    def put_snapshot(self, snapshot):
+        with self._lock:
+            self._snapshots[snapshot["branch_id"]] = snapshot
+
+    def note_pets_changed(self, pet_ids):
+        """Pets this client just wrote; re-read before the next run."""
+        with self._lock:
+            self._changed_pets.update(pet_ids)
+
+    def request_refresh(self):
+        self._refresh.set()
+        self._wake.set()
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="report-scheduler",
+                                            daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
+
+    # ---------- background thread ----------
+    def _due(self, snapshot, change_id):
+        now = time.monotonic()
+        if change_id != self._seen_change:
+            # the first observation (startup) counts as already settled
+            self._seen_at = now if self._seen_change is not None else 0.0
+            self._seen_change = change_id
+        if snapshot is None or self._refresh.is_set():
+            return True
+        if now - snapshot.get("_computed_mono", 0.0) >= self.interval:
+            return True
+        # writes since the snapshot, and the burst has settled
+        return change_id != snapshot["change_id"] and now - self._seen_at >= self.quiet
+
+    def _compute(self, router, branch_id, change_id):
+        if self.role in ("admin", "manager"):
+            update_trend_rollups(router.primary)
+        with self._lock:
+            changed, self._changed_pets = self._changed_pets, set()
+        if changed and self._pets.loaded:
+            # from the primary: a replica may not have the write yet
+            self._pets.refresh_pets(router.primary, changed)
+        reader = router.reader()
+        try:
+            data = compute_reports(reader, self.role, branch_id, self._pets)
+        except mysql.connector.Error:
+            if reader is router.primary:
+                raise
+            router.replica_failed()
+            data = compute_reports(router.primary, self.role, branch_id, self._pets)
+        return {
+            "role": self.role,
+            "branch_id": branch_id,
+            "computed_at": datetime.now().isoformat(timespec="seconds"),
+            "change_id": change_id,
+            "data": data,
+            "_computed_mono": time.monotonic(),
+        }
+
+    def _run(self):
+        router = None
+        while not self._stopping.is_set():
+            try:
+                if router is None:
+                    # autocommit: each poll / report query sees fresh data
+                    router = DatabaseRouter(dict(DB_CONFIG, autocommit=True),
+                                            REPLICA_CONFIG, max_lag=REPLICA_MAX_LAG_SECONDS)
+                branch_id = self.branch_scope()
+                change_id = latest_change_id(router.primary)
+                snapshot = self.snapshot(branch_id)
+                if self._due(snapshot, change_id):
+                    self._refresh.clear()
+                    self.busy = True
+                    try:
+                        snapshot = self._compute(router, branch_id, change_id)
+                        self.put_snapshot(snapshot)
+                    finally:
+                        self.busy = False
+                    self.last_error = None
+                    self.save_failed = False
+                    try:
+                        save_snapshot(snapshot)
+                    except (OSError, TypeError, ValueError) as e:   # disk, or json cannot write
+                        print(f"Could not save report snapshot: {e}")
+                        self.last_error = e
+                        self.save_failed = True
+                wait = POLL_SECONDS
+            except mysql.connector.Error as e:
+                self.last_error = e
+                self.save_failed = False
+                self.busy = False
+                if router is not None:
+                    try:
+                        router.primary.close()
+                    except mysql.connector.Error:
+                        pass
+                router = None
+                wait = RETRY_SECONDS
+            except Exception as e:
+                # a bug in a report query / dataset must not end the thread;
+                # the Reports page shows "refresh failed, retrying"
+                traceback.print_exc()
+                self.last_error = e
+                self.save_failed = False
+                self.busy = False
+                wait = RETRY_SECONDS
+            self._wake.wait(wait)
+            self._wake.clear()
+
+        if router is not None:
+            try:
+                router.primary.close()
+            except mysql.connector.Error:
+                pass
@@ -1,4 +1,10 @@
 # reports_view.py - Reports & Analytics screen
+#
+# Renders report datasets from report_data.py. With a ReportScheduler the
+# page shows the latest precomputed snapshot straight away (with an "as of"
+# time) and picks up new snapshots as the scheduler produces them; without
+# one it computes the reports on refresh.
+from datetime import datetime
 import tkinter as tk
 from tkinter import ttk, messagebox
 import mysql.connector
@@ -6,6 +12,10 @@ from matplotlib.ticker import MaxNLocator
 from matplotlib.figure import Figure
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 
+from pet_columns import PetColumns
+from report_data import compute_reports
+from trend_rollups import update_trend_rollups
+
 # Keep theme consistent with main.py
 BG = "#F5F5F7"
 CARD_BG = "#FFFFFF"
@@ -14,8 +24,12 @@ TEXT_SECONDARY = "#86868B"
 BORDER = "#E5E5EA"
 ACCENT = "#007AFF"
 
+# How often the page checks the scheduler for a newer snapshot
+SNAPSHOT_POLL_MS = 1000
+
 
-def init_reports(content, connection, current_role):
+def init_reports(content, connection, current_role, reader=None, branch_scope=None,
+                 scheduler=None):
     """
     Build the Reports & Analytics view.
 
@@ -27,26 +41,57 @@ def init_reports(content, connection, current_role):
         Open connection to the Pet_Adoption database.
     current_role : str
         Role of the logged-in user: 'admin', 'manager', 'staff', 'pending', etc.
+    reader : callable, optional
+        Returns the connection to run report queries on (e.g. a read
+        replica). Defaults to *connection*.
+    branch_scope : callable, optional
+        Returns the branch_id the session is scoped to, or None for all
+        branches. Checked on every refresh.
+    scheduler : report_scheduler.ReportScheduler, optional
+        Source of precomputed snapshots. Without one, refresh runs the
+        queries itself.
 
     Returns
     -------
     dict with:
         "frame"   -> tk.Frame  (root frame for this view)
-        "refresh" -> callable  (re-run queries and rebuild the UI)
+        "refresh" -> callable  (show the latest data)
     """
 
     # -------- Root frame --------
     frame = tk.Frame(content, bg=BG)
     frame.grid(row=0, column=0, sticky="nsew")
 
-    # Title
+    # Title row: title, "as of" time, manual refresh
+    title_row = tk.Frame(frame, bg=BG)
+    title_row.pack(fill="x", padx=40, pady=(30, 10))
+
     tk.Label(
-        frame,
+        title_row,
         text="Reports & Analytics",
         bg=BG,
         fg=TEXT_PRIMARY,
         font=("Segoe UI", 24, "bold"),
-    ).pack(anchor="w", padx=40, pady=(30, 10))
+    ).pack(side="left")
+
+    refresh_btn = tk.Button(
+        title_row,
+        text="Refresh",
+        relief="flat",
+        bd=0,
+        padx=16,
+        pady=6,
+        font=("Segoe UI", 10, "bold"),
+        bg=ACCENT,
+        fg="#FFFFFF",
+        cursor="hand2",
+    )
+    refresh_btn.pack(side="right")
+
+    as_of_label = tk.Label(
+        title_row, text="", bg=BG, fg=TEXT_SECONDARY, font=("Segoe UI", 10),
+    )
+    as_of_label.pack(side="right", padx=(0, 12))
 
     # -------- Scrollable region --------
     canvas = tk.Canvas(frame, bg=BG, highlightthickness=0, borderwidth=0)
@@ -66,662 +111,404 @@ def init_reports(content, connection, current_role):
 
     canvas.bind("<Configure>", _on_configure)
 
-    #Helper widgets
-
-    def make_section(parent, title, subtitle=None):
-        """Create a card-like section container."""
-        section = tk.Frame(parent, bg=BG)
-        section.pack(fill="x", padx=40, pady=(0, 25))
-
-        tk.Label(
-            section, text=title, bg=BG, fg=TEXT_PRIMARY,
-            font=("Segoe UI", 16, "bold"),
-        ).pack(anchor="w")
-
-        if subtitle:
-            tk.Label(
-                section, text=subtitle, bg=BG, fg=TEXT_SECONDARY,
-                font=("Segoe UI", 10),
-            ).pack(anchor="w", pady=(2, 8))
-
-        card = tk.Frame(
-            section,
-            bg=CARD_BG,
-            highlightthickness=1,
-            highlightbackground=BORDER,
-            bd=0,
-        )
-        card.pack(fill="both", expand=True)
-        return card
-
-    def make_summary_card(parent, title, value):
-        """Small KPI card used in the top summary row."""
-        card = tk.Frame(
-            parent,
-            bg=CARD_BG,
-            highlightthickness=1,
-            highlightbackground=BORDER,
-            bd=0,
-        )
-        card.pack(side="left", padx=10, ipadx=22, ipady=18, fill="both", expand=True)
-
-        tk.Label(
-            card,
-            text=title,
-            bg=CARD_BG,
-            fg=TEXT_SECONDARY,
-            font=("Segoe UI", 10, "bold"),
-        ).pack(anchor="w", padx=16, pady=(0, 4))
-
-        tk.Label(
-            card,
-            text=str(value),
-            bg=CARD_BG,
-            fg=ACCENT,
-            font=("Segoe UI", 24, "bold"),
-        ).pack(anchor="w", padx=16)
-        return card
-
-
-    def build_bar_chart(parent, title, labels, values):
-        """Render a simple matplotlib bar chart inside *parent*."""
-        if not labels:
-            tk.Label(
-                parent,
-                text="No data available for this report.",
-                bg=CARD_BG,
-                fg=TEXT_SECONDARY,
-                font=("Segoe UI", 10, "italic"),
-            ).pack(padx=16, pady=16, anchor="w")
-            return
-
-        fig = Figure(figsize=(5, 3.2), dpi=100)
+    # -------- Report views --------
+    # Every widget below is built once and then updated in place: KPI and
+    # stat labels get new text, tables apply row deltas and charts re-plot
+    # on their existing Figure. A section's parts are only rebuilt if their
+    # kinds (or a table's columns) change.
+
+    def empty_label(parent, text):
+        return tk.Label(parent, text=text, bg=CARD_BG, fg=TEXT_SECONDARY,
+                        font=("Segoe UI", 10, "italic"))
+
+    def show_one(shown_widget, hidden_widget, **pack):
+        """Pack shown_widget in place of hidden_widget (no-op if already so)."""
+        hidden_widget.pack_forget()
+        if not shown_widget.winfo_manager():
+            shown_widget.pack(**pack)
+
+    def make_chart(parent, figsize, plot):
+        """
+        Matplotlib chart with a "no data" fallback. Returns update(part);
+        plot(ax, part) draws the part's data onto a cleared axis.
+        """
+        empty = empty_label(parent, "No data available for this report.")
+        fig = Figure(figsize=figsize, dpi=100)
         ax = fig.add_subplot(111)
-        ax.bar(range(len(labels)), values)  # Use numeric x-axis
-        ax.set_title(title)
-        
-        # Set tick positions and labels
+        chart = FigureCanvasTkAgg(fig, master=parent)
+        widget = chart.get_tk_widget()
+
+        def update(part):
+            if not part["labels"]:
+                show_one(empty, widget, padx=16, pady=16, anchor="w")
+                return
+            ax.clear()
+            plot(ax, part)
+            ax.set_title(part["title"])
+            ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+            fig.tight_layout()
+            chart.draw_idle()
+            show_one(widget, empty, fill="both", expand=True)
+
+        return update
+
+    def plot_bar(ax, part):
+        labels = part["labels"]
+        ax.bar(range(len(labels)), part["values"])  # Use numeric x-axis
         ax.set_xticks(range(len(labels)))
         ax.set_xticklabels(labels, rotation=45, ha='right')
-        
-        # Force y-axis to use integers only
-        ax.yaxis.set_major_locator(MaxNLocator(integer=True))
-        
-        # Call tight_layout AFTER setting labels
-        fig.tight_layout()
-
-        canvas_chart = FigureCanvasTkAgg(fig, master=parent)
-        canvas_chart.draw()
-        canvas_chart.get_tk_widget().pack(fill="both", expand=True)
-
-    def build_table(parent, columns, rows, height=6):
-        """Simple ttk.Treeview table for textual reports."""
-        if not rows:
-            tk.Label(
-                parent,
-                text="No rows to display.",
-                bg=CARD_BG,
-                fg=TEXT_SECONDARY,
-                font=("Segoe UI", 10, "italic"),
-            ).pack(padx=16, pady=16, anchor="w")
-            return
 
+    def plot_line(ax, part):
+        labels = part["labels"]
+        for name, values in part["series"].items():
+            ax.plot(range(len(labels)), values, marker="o", label=name)
+        # Label every n-th period so long ranges stay readable
+        step = max(1, len(labels) // 12)
+        ax.set_xticks(range(0, len(labels), step))
+        ax.set_xticklabels(labels[::step], rotation=45, ha='right')
+        ax.legend()
+
+    def make_table(parent, part):
+        """ttk.Treeview table; update(part) applies the row changes."""
+        columns = tuple(part["columns"])
         style = ttk.Style(parent)
         style.configure("Reports.Treeview", background=CARD_BG, fieldbackground=CARD_BG,
                         rowheight=28, font=("Segoe UI", 10))
         style.configure("Reports.Treeview.Heading", font=("Segoe UI", 10, "bold"))
 
+        empty = empty_label(parent, "No rows to display.")
         # Create a frame to hold treeview + scrollbar
         table_frame = tk.Frame(parent, bg=CARD_BG)
-        table_frame.pack(fill="both", expand=True, padx=10, pady=10)
-
         tree = ttk.Treeview(
             table_frame,
             columns=columns,
             show="headings",
-            height=height,
+            height=part["height"],
             style="Reports.Treeview",
         )
-        
+
         # Add horizontal scrollbar for wide tables
         h_scroll = ttk.Scrollbar(table_frame, orient="horizontal", command=tree.xview)
         tree.configure(xscrollcommand=h_scroll.set)
-        
+
         tree.pack(side="top", fill="both", expand=True)
         h_scroll.pack(side="bottom", fill="x")
 
-        # Calculate column widths based on content
         for col in columns:
-            # Get max width needed for this column
-            max_width = len(str(col)) * 10  # Header width estimate
-            for row in rows:
-                col_idx = columns.index(col) if isinstance(columns, tuple) else list(columns).index(col)
-                cell_val = str(row[col_idx]) if col_idx < len(row) else ""
-                cell_width = len(cell_val) * 9  # Content width estimate
-                max_width = max(max_width, cell_width)
-            
-            # Set reasonable min/max bounds
-            col_width = max(100, min(max_width + 20, 300))
-            
             tree.heading(col, text=col, anchor="center")
-            tree.column(col, anchor="center", width=col_width, minwidth=80, stretch=True)
-
-        for row in rows:
-            tree.insert("", "end", values=row)
 
-    # Role specific builders
+        rows_shown = []     # row tuples currently in the tree, in order
+        widths = {}
 
-    def build_staff_reports(cur):
-        # --- 1. Pets by species (available only) ---
-        card = make_section(
-            scrollable,
-            "Staff Report 1: Available Pets by Species",
-            "Distribution of currently available pets, grouped by species.",
-        )
-        cur.execute(
-            """
-            SELECT COALESCE(species, 'Unknown') AS species, COUNT(*) AS total
-            FROM PET
-            WHERE adoption_status = 'Available'
-            GROUP BY COALESCE(species, 'Unknown')
-            ORDER BY total DESC
-            """
-        )
-        rows = cur.fetchall()
-        labels = [r[0] for r in rows]
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "Available pets by species", labels, values)
-
-        # --- 2. Available pets by branch ---
-        card = make_section(
-            scrollable,
-            "Staff Report 2: Available Pets by Branch",
-            "Helps staff see which branches have more animals to care for.",
-        )
-        cur.execute(
-            """
-            SELECT b.branch_name, COUNT(p.pet_id) AS total
-            FROM SHELTER_BRANCH b
-            LEFT JOIN PET p ON p.shelter_branch_id = b.branch_id
-                            AND p.adoption_status = 'Available'
-            GROUP BY b.branch_id, b.branch_name
-            ORDER BY total DESC, b.branch_name
-            """
-        )
-        rows = cur.fetchall()
-        labels = [r[0].split()[0] for r in rows]  # Just the first word
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "Available pets per branch", labels, values)
-
-        # --- 3. Recent medical records (last 30 days) ---
-        card = make_section(
-            scrollable,
-            "Staff Report 3: Recent Medical Activity (Last 30 Days)",
-            "Counts of medical records created in the last 30 days, grouped by type.",
-        )
-        cur.execute(
-            """
-            SELECT COALESCE(type, 'Unknown') AS type, COUNT(*) AS total
-            FROM MEDICAL_RECORD
-            WHERE date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-            GROUP BY COALESCE(type, 'Unknown')
-            ORDER BY total DESC
-            """
-        )
-        rows = cur.fetchall()
-        labels = [r[0] for r in rows]
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "Medical records (last 30 days)", labels, values)
-
-        # --- 4. Pet Age Statistics (MIN, MAX, AVG, COUNT) ---
-        card = make_section(
-            scrollable,
-            "Staff Report 4: Pet Age Statistics",
-            "Age analysis of available pets - youngest, oldest, average",
-        )
-        cur.execute(
-            """
-            SELECT 
-                MIN(age) AS youngest,
-                MAX(age) AS oldest,
-                ROUND(AVG(age), 1) AS avg_age,
-                COUNT(*) AS total_pets
-            FROM PET
-            WHERE adoption_status = 'Available' AND age IS NOT NULL
-            """
+        def update(part):
+            rows = [tuple(row) for row in part["rows"]]
+            if not rows:
+                show_one(empty, table_frame, padx=16, pady=16, anchor="w")
+            else:
+                show_one(table_frame, empty, fill="both", expand=True, padx=10, pady=10)
+
+            # Apply the delta: changed rows in place, then add / drop the tail
+            items = tree.get_children()
+            for i, row in enumerate(rows[:len(rows_shown)]):
+                if row != rows_shown[i]:
+                    tree.item(items[i], values=row)
+            for row in rows[len(rows_shown):]:
+                tree.insert("", "end", values=row)
+            if len(items) > len(rows):
+                tree.delete(*items[len(rows):])
+            rows_shown[:] = rows
+
+            # Size columns to their content
+            for idx, col in enumerate(columns):
+                max_width = len(str(col)) * 10  # Header width estimate
+                for row in rows:
+                    cell_val = str(row[idx]) if idx < len(row) else ""
+                    max_width = max(max_width, len(cell_val) * 9)  # Content width estimate
+                # Set reasonable min/max bounds
+                col_width = max(100, min(max_width + 20, 300))
+                if widths.get(col) != col_width:
+                    tree.column(col, anchor="center", width=col_width, minwidth=80, stretch=True)
+                    widths[col] = col_width
+
+        return update
+
+    def make_stats(parent, part):
+        """Row of small stat tiles: (label, value, aggregate or None)."""
+        empty = empty_label(parent, "")
+        stats_frame = tk.Frame(parent, bg=CARD_BG)
+        tiles = []          # (label_lbl, value_lbl, agg_lbl)
+
+        def add_tile():
+            stat_card = tk.Frame(stats_frame, bg="#F0F0F5", bd=1, relief="solid")
+            stat_card.pack(side="left", padx=8, ipadx=18, ipady=12, fill="both", expand=True)
+            label_lbl = tk.Label(stat_card, bg="#F0F0F5", fg=TEXT_SECONDARY,
+                                 font=("Segoe UI", 9, "bold"))
+            label_lbl.pack()
+            value_lbl = tk.Label(stat_card, bg="#F0F0F5", fg=ACCENT,
+                                 font=("Segoe UI", 16, "bold"))
+            value_lbl.pack()
+            agg_lbl = tk.Label(stat_card, bg="#F0F0F5", fg=TEXT_SECONDARY,
+                               font=("Segoe UI", 8))
+            tiles.append((stat_card, label_lbl, value_lbl, agg_lbl))
+
+        def update(part):
+            stats = part["stats"]
+            if not stats:
+                stats_frame.pack_forget()
+                if part["empty"]:
+                    empty.config(text=part["empty"])
+                    if not empty.winfo_manager():
+                        empty.pack(padx=16, pady=16, anchor="w")
+                else:
+                    empty.pack_forget()
+                return
+            show_one(stats_frame, empty, fill="x", padx=20, pady=15)
+
+            while len(tiles) < len(stats):
+                add_tile()
+            while len(tiles) > len(stats):
+                tiles.pop()[0].destroy()
+            for (_, label_lbl, value_lbl, agg_lbl), (label, val, agg) in zip(tiles, stats):
+                label_lbl.config(text=label)
+                value_lbl.config(text=val)
+                if agg:
+                    agg_lbl.config(text=f"({agg})")
+                    if not agg_lbl.winfo_manager():
+                        agg_lbl.pack()
+                else:
+                    agg_lbl.pack_forget()
+
+        return update
+
+    def make_note(parent, part):
+        note = tk.Label(parent, bg=CARD_BG)
+        note.pack(anchor="w")
+
+        def update(part):
+            if part["style"] == "accent":
+                note.config(text=part["text"], fg=ACCENT, font=("Segoe UI", 11, "bold"))
+                note.pack_configure(padx=16, pady=(10, 15))
+            else:
+                note.config(text=part["text"], fg=TEXT_SECONDARY, font=("Segoe UI", 10, "bold"))
+                note.pack_configure(padx=16, pady=(10, 5))
+
+        return update
+
+    def make_part(card, part):
+        """Build the widgets for one part; returns its update(part)."""
+        kind = part["kind"]
+        # Each part gets its own holder so parts keep their order in the card
+        holder = tk.Frame(card, bg=CARD_BG)
+        holder.pack(fill="both", expand=True)
+        if kind == "bar":
+            return make_chart(holder, (5, 3.2), plot_bar)
+        if kind == "line":
+            return make_chart(holder, (7, 3.2), plot_line)
+        if kind == "table":
+            return make_table(holder, part)
+        if kind == "stats":
+            return make_stats(holder, part)
+        return make_note(holder, part)
+
+    def part_layout(parts):
+        """What the widgets of a section depend on; anything else updates in place."""
+        return tuple((p["kind"], tuple(p.get("columns", ())), p.get("height"))
+                     for p in parts)
+
+    def make_section(key):
+        """Card-like section container, filled by update_section."""
+        section = tk.Frame(scrollable, bg=BG)
+        title_lbl = tk.Label(section, bg=BG, fg=TEXT_PRIMARY, font=("Segoe UI", 16, "bold"))
+        title_lbl.pack(anchor="w")
+        subtitle_lbl = tk.Label(section, bg=BG, fg=TEXT_SECONDARY, font=("Segoe UI", 10))
+        card = tk.Frame(
+            section,
+            bg=CARD_BG,
+            highlightthickness=1,
+            highlightbackground=BORDER,
+            bd=0,
         )
-        row = cur.fetchone()
-        if row and row[3] > 0:
-            stats_frame = tk.Frame(card, bg=CARD_BG)
-            stats_frame.pack(fill="x", padx=20, pady=15)
-            
-            stats = [
-                ("Youngest", f"{row[0]} yrs"),
-                ("Oldest", f"{row[1]} yrs"),
-                ("Average", f"{row[2]} yrs"),
-                ("Total Pets", str(row[3]))
-            ]
-            for label, val in stats:
-                stat_card = tk.Frame(stats_frame, bg="#F0F0F5", bd=1, relief="solid")
-                stat_card.pack(side="left", padx=8, ipadx=18, ipady=12, fill="both", expand=True)
-                tk.Label(stat_card, text=label, bg="#F0F0F5", fg=TEXT_SECONDARY,
-                         font=("Segoe UI", 9, "bold")).pack()
-                tk.Label(stat_card, text=val, bg="#F0F0F5", fg=ACCENT,
-                         font=("Segoe UI", 16, "bold")).pack()
+        card.pack(fill="both", expand=True)
+        view = {"frame": section, "title": title_lbl, "subtitle": subtitle_lbl,
+                "card": card, "layout": None, "updates": [], "parts": []}
+        section_views[key] = view
+        return view
+
+    def update_section(view, section):
+        view["title"].config(text=section["title"])
+        if section["subtitle"]:
+            view["subtitle"].config(text=section["subtitle"])
+            if not view["subtitle"].winfo_manager():
+                view["subtitle"].pack(anchor="w", pady=(2, 8), before=view["card"])
         else:
-            tk.Label(card, text="No age data available.", bg=CARD_BG, fg=TEXT_SECONDARY,
-                     font=("Segoe UI", 10, "italic")).pack(padx=16, pady=16, anchor="w")
-
-        # --- 5. Medical Records per Pet (COUNT, MAX) ---
-        card = make_section(
-            scrollable,
-            "Staff Report 5: Pets with Most Medical Records",
-            "Identifies high-care animals needing attention.",
-        )
-        cur.execute(
-            """
-            SELECT p.name, p.species, COUNT(m.record_id) AS record_count
-            FROM PET p
-            LEFT JOIN MEDICAL_RECORD m ON p.pet_id = m.pet_id
-            GROUP BY p.pet_id, p.name, p.species
-            HAVING COUNT(m.record_id) > 0
-            ORDER BY record_count DESC
-            LIMIT 10
-            """
-        )
-        rows = cur.fetchall()
-        columns = ("Pet Name", "Species", "# Records")
-        build_table(card, columns, rows, height=6)
-
-    def build_manager_reports(cur):
-        # --- 1. Adoption applications by status ---
-        card = make_section(
-            scrollable,
-            "Manager Report 1: Adoption Pipeline",
-            "Overview of adoption applications grouped by status. ",
-        )
-        cur.execute(
-            """
-            SELECT COALESCE(status, 'Unknown') AS status, COUNT(*) AS total
-            FROM ADOPTION_APPLICATION
-            GROUP BY COALESCE(status, 'Unknown')
-            ORDER BY total DESC
-            """
-        )
-        rows = cur.fetchall()
-        labels = [r[0] for r in rows]
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "Applications by status", labels, values)
-
-        # --- 2. Average pet age by species ---
-        card = make_section(
-            scrollable,
-            "Manager Report 2: Average Pet Age by Species",
-            "Helps plan long-term care and adoption strategies. ",
-        )
-        cur.execute(
-            """
-            SELECT COALESCE(species, 'Unknown') AS species,
-                   ROUND(AVG(age), 1) AS avg_age
-            FROM PET
-            WHERE age IS NOT NULL
-            GROUP BY COALESCE(species, 'Unknown')
-            ORDER BY avg_age DESC
-            """
-        )
-        rows = cur.fetchall()
-        labels = [r[0] for r in rows]
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "Average age (years)", labels, values)
-
-        # --- 3. Staff Distribution by Branch (COUNT, SUM) ---
-        card = make_section(
-            scrollable,
-            "Manager Report 3: Staff Distribution by Branch",
-            "Number of staff members at each branch for resource planning. ",
-        )
-        cur.execute(
-            """
-            SELECT b.branch_name, COUNT(s.staff_id) AS staff_count
-            FROM SHELTER_BRANCH b
-            LEFT JOIN STAFF s ON s.shelter_branch_id = b.branch_id
-            GROUP BY b.branch_id, b.branch_name
-            ORDER BY staff_count DESC
-            """
-        )
-        rows = cur.fetchall()
-        labels = [r[0].split()[0] for r in rows]
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "Staff per branch", labels, values)
-        
-        # Show total staff as summary
-        cur.execute("SELECT COUNT(*) FROM STAFF")
-        total = cur.fetchone()[0] or 0
-        tk.Label(card, text=f"Total Staff (SUM): {total}", bg=CARD_BG, fg=TEXT_SECONDARY,
-                 font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=16, pady=(0, 10))
-
-        # --- 4. Pet Age Range by Branch (MIN, MAX, AVG, COUNT) ---
-        card = make_section(
-            scrollable,
-            "Manager Report 4: Pet Age Range by Branch",
-            "Age statistics per branch for capacity and care planning. ",
-        )
-        cur.execute(
-            """
-            SELECT b.branch_name,
-                   MIN(p.age) AS min_age,
-                   MAX(p.age) AS max_age,
-                   ROUND(AVG(p.age), 1) AS avg_age,
-                   COUNT(p.pet_id) AS pet_count
-            FROM SHELTER_BRANCH b
-            LEFT JOIN PET p ON p.shelter_branch_id = b.branch_id AND p.age IS NOT NULL
-            GROUP BY b.branch_id, b.branch_name
-            ORDER BY b.branch_name
-            """
-        )
-        rows = cur.fetchall()
-        columns = ("Branch", "Min Age", "Max Age", "Avg Age", "Pet Count")
-        build_table(card, columns, rows, height=5)
-
-        # --- 5. Longest Shelter Stays (MIN arrival_date, DATEDIFF) ---
-        card = make_section(
-            scrollable,
-            "Manager Report 5: Longest Shelter Stays",
-            "Available pets waiting longest for adoption - prioritize outreach.",
-        )
-        cur.execute(
-            """
-            SELECT p.name, p.species, p.arrival_date,
-                   DATEDIFF(CURDATE(), p.arrival_date) AS days_in_shelter
-            FROM PET p
-            WHERE p.adoption_status = 'Available' AND p.arrival_date IS NOT NULL
-            ORDER BY days_in_shelter DESC
-            LIMIT 10
-            """
-        )
-        rows = cur.fetchall()
-        columns = ("Pet Name", "Species", "Arrival Date", "Days in Shelter")
-        build_table(card, columns, rows, height=6)
-
-    def build_admin_reports(cur):
-        # --- 1. Users by role ---
-        card = make_section(
-            scrollable,
-            "Admin Report 1: User Accounts by Role",
-            "Counts of login accounts in USER_ACCOUNT, grouped by role.",
-        )
-        try:
-            cur.execute(
-                """
-                SELECT role, COUNT(*) AS total
-                FROM USER_ACCOUNT
-                GROUP BY role
-                ORDER BY role
-                """
-            )
-            rows = cur.fetchall()
-        except mysql.connector.Error:
-            rows = []
-
-        labels = [r[0] for r in rows]
-        values = [r[1] for r in rows]
-        build_bar_chart(card, "User accounts by role", labels, values)
-
-        # --- 2. Most recent users ---
-        card = make_section(
-            scrollable,
-            "Admin Report 2: Recently Created Users",
-            "Most recent user accounts in the system.",
-        )
-        try:
-            cur.execute(
-                """
-                SELECT username, role, created_at
-                FROM USER_ACCOUNT
-                ORDER BY created_at DESC
-                LIMIT 5
-                """
+            view["subtitle"].pack_forget()
+
+        parts = section["parts"]
+        layout = part_layout(parts)
+        if layout != view["layout"]:
+            for w in view["card"].winfo_children():
+                w.destroy()
+            view["updates"] = [make_part(view["card"], p) for p in parts]
+            view["parts"] = [None] * len(parts)
+            view["layout"] = layout
+        for i, part in enumerate(parts):
+            if part != view["parts"][i]:
+                view["updates"][i](part)
+                view["parts"][i] = part
+
+    # ----------- Top KPI summary row (same for all roles) -----------
+    summary = tk.Frame(scrollable, bg=BG)
+    kpi_cards = []          # (card, title_lbl, value_lbl)
+
+    def update_kpis(kpis):
+        while len(kpi_cards) < len(kpis):
+            card = tk.Frame(
+                summary,
+                bg=CARD_BG,
+                highlightthickness=1,
+                highlightbackground=BORDER,
+                bd=0,
             )
-            rows = cur.fetchall()
-        except mysql.connector.Error:
-            rows = []
-
-        columns = ("Username", "Role", "Created")
-        build_table(card, columns, rows, height=5)
-
-        # --- 3. System-wide Pet Statistics (MIN, MAX, AVG, SUM, COUNT) ---
-        card = make_section(
-            scrollable,
-            "Admin Report 3: System-wide Pet Statistics",
-            "Comprehensive age analysis across all pets.",
-        )
-        cur.execute(
-            """
-            SELECT 
-                COUNT(*) AS total_pets,
-                MIN(age) AS min_age,
-                MAX(age) AS max_age,
-                ROUND(AVG(age), 1) AS avg_age,
-                SUM(age) AS total_age_sum
-            FROM PET
-            WHERE age IS NOT NULL
-            """
-        )
-        row = cur.fetchone()
-        if row and row[0] > 0:
-            stats_frame = tk.Frame(card, bg=CARD_BG)
-            stats_frame.pack(fill="x", padx=20, pady=15)
-            
-            stats = [
-                ("Total Pets", str(row[0]), "COUNT"),
-                ("Youngest", f"{row[1]} yrs", "MIN"),
-                ("Oldest", f"{row[2]} yrs", "MAX"),
-                ("Average Age", f"{row[3]} yrs", "AVG"),
-                ("Sum of Ages", f"{row[4]} yrs", "SUM")
-            ]
-            for label, val, agg in stats:
-                stat_card = tk.Frame(stats_frame, bg="#F0F0F5", bd=1, relief="solid")
-                stat_card.pack(side="left", padx=6, ipadx=14, ipady=10, fill="both", expand=True)
-                tk.Label(stat_card, text=f"{label}", bg="#F0F0F5", fg=TEXT_SECONDARY,
-                         font=("Segoe UI", 9, "bold")).pack()
-                tk.Label(stat_card, text=val, bg="#F0F0F5", fg=ACCENT,
-                         font=("Segoe UI", 14, "bold")).pack()
-                tk.Label(stat_card, text=f"({agg})", bg="#F0F0F5", fg=TEXT_SECONDARY,
-                         font=("Segoe UI", 8)).pack()
+            card.pack(side="left", padx=10, ipadx=22, ipady=18, fill="both", expand=True)
+            title_lbl = tk.Label(card, bg=CARD_BG, fg=TEXT_SECONDARY,
+                                 font=("Segoe UI", 10, "bold"))
+            title_lbl.pack(anchor="w", padx=16, pady=(0, 4))
+            value_lbl = tk.Label(card, bg=CARD_BG, fg=ACCENT, font=("Segoe UI", 24, "bold"))
+            value_lbl.pack(anchor="w", padx=16)
+            kpi_cards.append((card, title_lbl, value_lbl))
+        while len(kpi_cards) > len(kpis):
+            kpi_cards.pop()[0].destroy()
+        for (_, title_lbl, value_lbl), (title, value) in zip(kpi_cards, kpis):
+            title_lbl.config(text=title)
+            value_lbl.config(text=str(value))
+
+    # Pending / unknown role – an explanation instead of sections
+    msg_section = tk.Frame(scrollable, bg=BG)
+    msg_title = tk.Label(msg_section, bg=BG, fg=TEXT_PRIMARY, font=("Segoe UI", 16, "bold"))
+    msg_title.pack(anchor="w")
+    msg_text = tk.Label(msg_section, bg=BG, fg=TEXT_SECONDARY, justify="left",
+                        font=("Segoe UI", 11))
+    msg_text.pack(anchor="w", pady=(4, 0))
+
+    # -------- Rendering --------
+    section_views = {}      # section key -> widgets of that section
+    # keys of the sections on screen, in order (None = nothing laid out yet)
+    laid_out = {"keys": None, "message": False}
+    # computed_at of the snapshot on screen, so polling only redraws on change
+    shown = {"computed_at": None, "branch_id": None}
+    pets = PetColumns()         # kept between Refresh clicks, caught up each time
+
+    def render(data):
+        keys = [section["key"] for section in data["sections"]]
+        for section in data["sections"]:
+            view = section_views.get(section["key"]) or make_section(section["key"])
+            update_section(view, section)
+        update_kpis(data["kpis"])
+        if data["message"]:
+            msg_title.config(text=data["message"][0])
+            msg_text.config(text=data["message"][1])
+
+        # Re-pack only when the set or order of sections changed
+        has_message = bool(data["message"])
+        if (keys, has_message) != (laid_out["keys"], laid_out["message"]):
+            for key, view in list(section_views.items()):
+                view["frame"].pack_forget()
+                if key not in keys:
+                    view["frame"].destroy()
+                    del section_views[key]
+            msg_section.pack_forget()
+            if not summary.winfo_manager():
+                summary.pack(fill="x", padx=40, pady=(0, 20))
+            for key in keys:
+                section_views[key]["frame"].pack(fill="x", padx=40, pady=(0, 25))
+            if has_message:
+                msg_section.pack(fill="x", padx=40, pady=(0, 30))
+            laid_out["keys"], laid_out["message"] = keys, has_message
+        canvas.itemconfigure(window_id, state="normal")
+
+    def render_snapshot(snapshot):
+        render(snapshot["data"])
+        shown["computed_at"] = snapshot["computed_at"]
+        shown["branch_id"] = snapshot["branch_id"]
+        update_as_of()
+
+    def update_as_of():
+        if shown["computed_at"] is None:
+            text = "Preparing reports..."
         else:
-            tk.Label(card, text="No pet age data available.", bg=CARD_BG, fg=TEXT_SECONDARY,
-                     font=("Segoe UI", 10, "italic")).pack(padx=16, pady=16, anchor="w")
-
-        # --- 4. Medical Records Overview (COUNT, SUM, AVG) ---
-        card = make_section(
-            scrollable,
-            "Admin Report 4: Medical Records Overview",
-            "System-wide medical activity analysis.",
-        )
-        cur.execute(
-            """
-            SELECT COUNT(*) AS total_records,
-                   COUNT(DISTINCT pet_id) AS pets_with_records,
-                   ROUND(COUNT(*) / NULLIF(COUNT(DISTINCT pet_id), 0), 1) AS avg_records_per_pet
-            FROM MEDICAL_RECORD
-            """
-        )
-        row = cur.fetchone()
-        
-        # Get busiest vet staff
-        cur.execute(
-            """
-            SELECT CONCAT(s.first_name, ' ', s.last_name) AS vet_name, 
-                   COUNT(m.record_id) AS record_count
-            FROM MEDICAL_RECORD m
-            JOIN STAFF s ON m.vet_staff_id = s.staff_id
-            GROUP BY m.vet_staff_id, s.first_name, s.last_name
-            ORDER BY record_count DESC
-            LIMIT 5
-            """
-        )
-        vet_rows = cur.fetchall()
-        
-        if row:
-            stats_frame = tk.Frame(card, bg=CARD_BG)
-            stats_frame.pack(fill="x", padx=20, pady=15)
-            
-            stats = [
-                ("Total Records", str(row[0] or 0), "COUNT"),
-                ("Pets with Records", str(row[1] or 0), "COUNT"),
-                ("Avg per Pet", str(row[2] or 0), "AVG")
-            ]
-            for label, val, agg in stats:
-                stat_card = tk.Frame(stats_frame, bg="#F0F0F5", bd=1, relief="solid")
-                stat_card.pack(side="left", padx=8, ipadx=18, ipady=12, fill="both", expand=True)
-                tk.Label(stat_card, text=label, bg="#F0F0F5", fg=TEXT_SECONDARY,
-                         font=("Segoe UI", 9, "bold")).pack()
-                tk.Label(stat_card, text=val, bg="#F0F0F5", fg=ACCENT,
-                         font=("Segoe UI", 16, "bold")).pack()
-                tk.Label(stat_card, text=f"({agg})", bg="#F0F0F5", fg=TEXT_SECONDARY,
-                         font=("Segoe UI", 8)).pack()
-        
-        # Busiest vets table
-        if vet_rows:
-            tk.Label(card, text="Busiest Veterinary Staff (by record count):", bg=CARD_BG, 
-                     fg=TEXT_SECONDARY, font=("Segoe UI", 10, "bold")).pack(anchor="w", padx=16, pady=(10, 5))
-            columns = ("Staff Name", "Records Handled")
-            build_table(card, columns, vet_rows, height=4)
-
-        # --- 5. Branch Capacity Utilization (COUNT, SUM, AVG) ---
-        card = make_section(
-            scrollable,
-            "Admin Report 5: Branch Capacity Utilization",
-            "System-wide capacity analysis across all branches.",
-        )
-        cur.execute(
-            """
-            SELECT b.branch_name,
-                   COUNT(p.pet_id) AS current_pets,
-                   b.capacity,
-                   ROUND(COUNT(p.pet_id) * 100.0 / NULLIF(b.capacity, 0), 1) AS utilization_pct
-            FROM SHELTER_BRANCH b
-            LEFT JOIN PET p ON p.shelter_branch_id = b.branch_id
-            GROUP BY b.branch_id, b.branch_name, b.capacity
-            ORDER BY utilization_pct DESC
-            """
-        )
-        branch_rows = cur.fetchall()
-        columns = ("Branch", "Current Pets", "Capacity", "Utilization %")
-        build_table(card, columns, branch_rows, height=5)
-        
-        # System-wide summary
-        cur.execute(
-            """
-            SELECT SUM(pet_count) AS total_pets,
-                   SUM(capacity) AS total_capacity,
-                   ROUND(SUM(pet_count) * 100.0 / NULLIF(SUM(capacity), 0), 1) AS overall_utilization
-            FROM (
-                SELECT COUNT(p.pet_id) AS pet_count, COALESCE(b.capacity, 0) AS capacity
-                FROM SHELTER_BRANCH b
-                LEFT JOIN PET p ON p.shelter_branch_id = b.branch_id
-                GROUP BY b.branch_id, b.capacity
-            ) AS branch_stats
-            """
-        )
-        summary = cur.fetchone()
-        if summary and summary[1]:
-            tk.Label(card, 
-                     text=f"System Total: {summary[0] or 0} pets / {summary[1]} capacity = {summary[2] or 0}% utilization (SUM, AVG)",
-                     bg=CARD_BG, fg=ACCENT, font=("Segoe UI", 11, "bold")).pack(anchor="w", padx=16, pady=(10, 15))
+            at = datetime.fromisoformat(shown["computed_at"])
+            fmt = "%H:%M" if at.date() == datetime.now().date() else "%d %b %H:%M"
+            text = f"As of {at.strftime(fmt)}"
+        if scheduler is not None:
+            if scheduler.busy:
+                text += "  ·  refreshing..."
+            elif scheduler.last_error is not None and scheduler.save_failed:
+                text += "  ·  could not save report snapshot"
+            elif scheduler.last_error is not None:
+                text += "  ·  refresh failed, retrying"
+        as_of_label.config(text=text)
+
+    def current_branch():
+        return branch_scope() if branch_scope else None
+
+    def compute_now():
+        """Run the reports on the calling thread (no scheduler)."""
+        role = (current_role or "").lower()
+        if role in ("admin", "manager"):
+            # Fold in pets / applications changed since the last refresh
+            try:
+                update_trend_rollups(connection)
+            except mysql.connector.Error as e:
+                print(f"Trend rollup update failed: {e}")
+        try:
+            data = compute_reports(reader() if reader else connection, role, current_branch(),
+                                   pets)
+        except mysql.connector.Error as e:
+            messagebox.showerror("Reports Error", f"Could not load reports:\n{e}")
+            return
+        render_snapshot({"data": data, "branch_id": current_branch(),
+                         "computed_at": datetime.now().isoformat(timespec="seconds")})
 
     # Refresh logic – this is what main.py calls whenever the
     # Reports tab is opened.
 
+    def show_latest():
+        """Render the scheduler's snapshot for the current scope if it is newer."""
+        branch_id = current_branch()
+        snapshot = scheduler.snapshot(branch_id)
+        if snapshot is None:
+            if shown["branch_id"] != branch_id:
+                # Nothing for this branch scope yet; don't leave another on screen
+                canvas.itemconfigure(window_id, state="hidden")
+                shown["computed_at"] = None
+                shown["branch_id"] = branch_id
+        elif (snapshot["computed_at"], branch_id) != (shown["computed_at"], shown["branch_id"]):
+            render_snapshot(snapshot)
+        update_as_of()
+        return snapshot
+
     def refresh():
-        # Clear any existing dynamic content
-        for w in scrollable.winfo_children():
-            w.destroy()
+        if scheduler is None:
+            compute_now()
+        elif show_latest() is None:
+            # First visit to this branch scope: ask for it now
+            scheduler.request_refresh()
+            update_as_of()
+
+    def on_refresh_click():
+        if scheduler is None:
+            compute_now()
+        else:
+            scheduler.request_refresh()
+            update_as_of()
 
-        try:
-            cur = connection.cursor()
-
-            # ----------- Top KPI summary row (same for all roles) -----------
-            summary = tk.Frame(scrollable, bg=BG)
-            summary.pack(fill="x", padx=40, pady=(0, 20))
-
-            # Total pets
-            cur.execute("SELECT COUNT(*) FROM PET")
-            total_pets = cur.fetchone()[0] or 0
-
-            # Available pets
-            cur.execute("SELECT COUNT(*) FROM PET WHERE adoption_status = 'Available'")
-            available_pets = cur.fetchone()[0] or 0
-
-            # Adopted pets
-            cur.execute("SELECT COUNT(*) FROM PET WHERE adoption_status = 'Adopted'")
-            adopted_pets = cur.fetchone()[0] or 0
-
-            # Total medical records
-            cur.execute("SELECT COUNT(*) FROM MEDICAL_RECORD")
-            total_med = cur.fetchone()[0] or 0
-
-            # Total staff
-            cur.execute("SELECT COUNT(*) FROM STAFF")
-            total_staff = cur.fetchone()[0] or 0
-
-            # Total branches
-            cur.execute("SELECT COUNT(*) FROM SHELTER_BRANCH")
-            total_branches = cur.fetchone()[0] or 0
-
-            make_summary_card(summary, "Total Pets", total_pets)
-            make_summary_card(summary, "Available", available_pets)
-            make_summary_card(summary, "Adopted", adopted_pets)
-            make_summary_card(summary, "Medical Records", total_med)
-            make_summary_card(summary, "Staff", total_staff)
-            make_summary_card(summary, "Branches", total_branches)
-
-            # ----------- Role-based detail sections -----------
-            role = (current_role or "").lower()
-
-            if role == "admin":
-                # Admin gets everything
-                build_staff_reports(cur)
-                build_manager_reports(cur)
-                build_admin_reports(cur)
-            elif role == "manager":
-                build_manager_reports(cur)
-                build_staff_reports(cur)
-            elif role == "staff":
-                build_staff_reports(cur)
-            else:
-                # Pending / unknown role – show an explanation
-                msg_section = tk.Frame(scrollable, bg=BG)
-                msg_section.pack(fill="x", padx=40, pady=(0, 30))
+    refresh_btn.config(command=on_refresh_click)
 
-                tk.Label(
-                    msg_section,
-                    text="Limited access",
-                    bg=BG,
-                    fg=TEXT_PRIMARY,
-                    font=("Segoe UI", 16, "bold"),
-                ).pack(anchor="w")
-
-                tk.Label(
-                    msg_section,
-                    text=(
-                        "Your account does not have a staff, manager, or admin role, "
-                        "so detailed reports are hidden.\n"
-                        "Please contact an administrator if you believe this is an error."
-                    ),
-                    bg=BG,
-                    fg=TEXT_SECONDARY,
-                    justify="left",
-                    font=("Segoe UI", 11),
-                ).pack(anchor="w", pady=(4, 0))
+    def poll():
+        # Pick up snapshots finished in the background
+        show_latest()
+        frame.after(SNAPSHOT_POLL_MS, poll)
 
-        except mysql.connector.Error as e:
-            messagebox.showerror("Reports Error", f"Could not load reports:\n{e}")
-        finally:
-            try:
-                cur.close()
-            except Exception:
-                pass
     # Populate the reports on initial load
     try:
         refresh()
@@ -729,5 +516,14 @@ def init_reports(content, connection, current_role):
         print(f"Error in refresh: {e}")
         import traceback
         traceback.print_exc()
+    if scheduler is not None:
+        frame.after(SNAPSHOT_POLL_MS, poll)
+
+    def pets_changed(pet_ids):
+        """Called after this client writes pets, so the age aggregates follow."""
+        if scheduler is not None:
+            scheduler.note_pets_changed(pet_ids)
+        elif pets.loaded:
+            pets.refresh_pets(connection, pet_ids)
 
-    return {"frame": frame, "refresh": refresh}
\ No newline at end of file
+    return {"frame": frame, "refresh": refresh, "pets_changed": pets_changed}
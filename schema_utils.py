@@ -0,0 +1,79 @@
+import mysql.connector
+
+
+def index_exists(connection, table: str, index_name: str) -> bool:
+    """
+    Check information_schema for an index on a table in the current database.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND LOWER(table_name) = LOWER(%s)
+              AND index_name = %s
+            LIMIT 1
+        """, (table, index_name))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+
+def ensure_index(connection, table: str, index_name: str, columns: str):
+    """
+    Create an index if it does not exist yet.
+    MySQL has no CREATE INDEX IF NOT EXISTS, so check first.
+    Safe to call every time at startup.
+    """
+    if index_exists(connection, table, index_name):
+        return
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"CREATE INDEX {index_name} ON {table} ({columns})")
+        connection.commit()
+    except mysql.connector.Error as e:
+        # 1061 = duplicate key name (another client created it first)
+        if e.errno != 1061:
+            raise
+    finally:
+        cursor.close()
+
+
+def column_exists(connection, table: str, column: str) -> bool:
+    """
+    Check information_schema for a column of a table in the current database.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            SELECT 1
+            FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+              AND LOWER(table_name) = LOWER(%s)
+              AND LOWER(column_name) = LOWER(%s)
+            LIMIT 1
+        """, (table, column))
+        return cursor.fetchone() is not None
+    finally:
+        cursor.close()
+
+
+def ensure_column(connection, table: str, column: str, definition: str):
+    """
+    Add a column if it does not exist yet, e.g.
+    ensure_column(conn, "PET", "photo_hash", "CHAR(64) NULL").
+    Safe to call every time at startup.
+    """
+    if column_exists(connection, table, column):
+        return
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        connection.commit()
+    except mysql.connector.Error as e:
+        # 1060 = duplicate column name (another client added it first)
+        if e.errno != 1060:
+            raise
+    finally:
+        cursor.close()
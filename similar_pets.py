@@ -0,0 +1,177 @@
+# similar_pets.py - "similar pets" from precomputed feature vectors
+#
+# Every pet is turned into a fixed-length, unit-normalized vector:
+#   species       one-hot (hashed)
+#   breed words   hashed bag of words ("AM PIT BULL TER" -> AM, PIT, ...)
+#   color words   hashed bag of words, from the description
+#   size          one-hot, with some weight on the neighbouring sizes
+#   age           age band one-hot, with some weight on the neighbouring bands
+# so cosine similarity is a single matrix-vector product over all pets.
+#
+# SimilarPets keeps the vectors in one NumPy matrix. It is loaded once,
+# updated in place when this client adds / updates / deletes a pet, and
+# catches up with other clients' changes from the DATA_CHANGE log.
+import zlib
+
+import numpy as np
+
+from description_parser import SIZE_ORDER, color_tokens, parse_description
+from pet_index import PetIndex
+
+TOP_K = 8
+
+SPECIES_DIMS = 8
+BREED_DIMS = 64
+COLOR_DIMS = 32
+# Age bands, upper bounds in months
+AGE_BANDS = (6, 12, 24, 48, 84, 120)
+
+W_SPECIES = 3.0
+W_BREED = 2.0
+W_COLOR = 1.0
+W_SIZE = 1.0
+W_AGE = 1.5
+NEIGHBOUR = 0.5      # weight on the size / age band next to the pet's own
+
+_SPECIES_AT = 0
+_BREED_AT = _SPECIES_AT + SPECIES_DIMS
+_COLOR_AT = _BREED_AT + BREED_DIMS
+_SIZE_AT = _COLOR_AT + COLOR_DIMS
+_AGE_AT = _SIZE_AT + len(SIZE_ORDER)
+DIMS = _AGE_AT + len(AGE_BANDS) + 1
+
+PET_COLUMNS = "pet_id, name, species, breed, age, description, adoption_status"
+
+
+def _bucket(word, dims):
+    # crc32 rather than hash(): the same on every run
+    return zlib.crc32(word.encode("utf-8")) % dims
+
+
+def _one_hot_band(vector, at, count, index, weight):
+    vector[at + index] += weight
+    for near in (index - 1, index + 1):
+        if 0 <= near < count:
+            vector[at + near] += weight * NEIGHBOUR
+
+
+def pet_vector(species, breed, age, description):
+    """Unit-length feature vector for one pet (all zeros if nothing is known)."""
+    vector = np.zeros(DIMS, dtype=np.float32)
+    parsed = parse_description(description)
+
+    species = (species or "").strip().upper()
+    if species:
+        vector[_SPECIES_AT + _bucket(species, SPECIES_DIMS)] = W_SPECIES
+
+    breed_words = set((breed or "").upper().replace("/", " ").split())
+    for word in breed_words:
+        vector[_BREED_AT + _bucket(word, BREED_DIMS)] += W_BREED / np.sqrt(len(breed_words))
+
+    colors = color_tokens(parsed["color"])
+    for word in colors:
+        vector[_COLOR_AT + _bucket(word, COLOR_DIMS)] += W_COLOR / np.sqrt(len(colors))
+
+    if parsed["size"]:
+        _one_hot_band(vector, _SIZE_AT, len(SIZE_ORDER), SIZE_ORDER.index(parsed["size"]),
+                      W_SIZE)
+
+    months = parsed["age_months"]
+    if months is None and age is not None:
+        months = int(age) * 12
+    if months is not None:
+        band = sum(months >= bound for bound in AGE_BANDS)
+        _one_hot_band(vector, _AGE_AT, len(AGE_BANDS) + 1, band, W_AGE)
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class SimilarPets(PetIndex):
+    """
+    Feature vectors of all pets; similar(pet_id) returns the nearest
+    available pets by cosine similarity.
+    """
+
+    SQL = f"SELECT {PET_COLUMNS} FROM PET"
+
+    def __init__(self):
+        self._clear()
+
+    def _clear(self):
+        self.vectors = np.zeros((0, DIMS), dtype=np.float32)
+        self.available = np.zeros(0, dtype=bool)
+        self.pet_ids = np.zeros(0, dtype=np.int64)
+        self.size = 0                   # rows in use; the arrays grow by doubling
+        self.info = {}                  # pet_id -> (name, species, breed, age)
+        self._row = {}                  # pet_id -> row
+        self.change_id = None           # DATA_CHANGE high-water mark applied
+        self.loaded = False
+
+    # ---------- building ----------
+    def load(self, connection, change_id=None):
+        """Build the index from PET. change_id: the log position it reflects."""
+        rows = self.read_all(connection)
+        self._clear()
+        self._grow(len(rows))
+        for row in rows:
+            self.upsert(row)
+        self.change_id = change_id
+        self.loaded = True
+
+    def _grow(self, needed):
+        if needed <= len(self.pet_ids):
+            return
+        capacity = max(needed, 2 * len(self.pet_ids), 64)
+        vectors = np.zeros((capacity, DIMS), dtype=np.float32)
+        vectors[:self.size] = self.vectors[:self.size]
+        available = np.zeros(capacity, dtype=bool)
+        available[:self.size] = self.available[:self.size]
+        pet_ids = np.zeros(capacity, dtype=np.int64)
+        pet_ids[:self.size] = self.pet_ids[:self.size]
+        self.vectors, self.available, self.pet_ids = vectors, available, pet_ids
+
+    def upsert(self, row):
+        """Add or replace one pet; row is a PET_COLUMNS tuple."""
+        pet_id, name, species, breed, age, description, status = row
+        index = self._row.get(pet_id)
+        if index is None:
+            self._grow(self.size + 1)
+            index = self._row[pet_id] = self.size
+            self.size += 1
+        self.vectors[index] = pet_vector(species, breed, age, description)
+        self.available[index] = (status or "Available") == "Available"
+        self.pet_ids[index] = pet_id
+        self.info[pet_id] = (name, species, breed, age)
+
+    def remove(self, pet_id):
+        index = self._row.pop(pet_id, None)
+        if index is None:
+            return
+        self.info.pop(pet_id, None)
+        # move the last row into the hole
+        last = self.size - 1
+        if index != last:
+            moved = int(self.pet_ids[last])
+            self.vectors[index] = self.vectors[last]
+            self.available[index] = self.available[last]
+            self.pet_ids[index] = moved
+            self._row[moved] = index
+        self.size = last
+
+    # ---------- queries ----------
+    def similar(self, pet_id, k=TOP_K, available_only=True):
+        """[(pet_id, similarity 0..1)] most similar first, excluding pet_id itself."""
+        index = self._row.get(pet_id)
+        if index is None:
+            return []
+        scores = self.vectors[:self.size] @ self.vectors[index]
+        scores[index] = -1.0
+        if available_only:
+            scores[~self.available[:self.size]] = -1.0
+        k = min(k, self.size)
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(self.pet_ids[i]), float(scores[i])) for i in top if scores[i] > 0]
@@ -0,0 +1,178 @@
+# species.py - canonical species
+#
+# PET.species is free text ("CAT", "Cat ", "kitten", "python"). SPECIES holds
+# the canonical list: an integer id, a display name, a category for the
+# dashboard cards (Cat / Dog / Other) and the aliases that map to it.
+# PET.species_id points at it, so counts group on a small indexed integer
+# and every spelling of a species lands in the same bucket.
+#
+# map_species() fills PET.species_id from the free text in batches; values
+# no alias matches go to "Other" and are reported so aliases can be added.
+#
+# Run:  python species.py [--batch-size 2000] [--all]
+import argparse
+from collections import Counter
+
+import mysql.connector
+
+from change_tracking import ensure_change_table, record_change, record_changes
+from db_config import DB_CONFIG
+from schema_utils import ensure_column, ensure_index
+
+CATEGORIES = ("Cat", "Dog", "Other")
+OTHER = "Other"
+
+# name, category, aliases (matched after trimming and upper-casing)
+SPECIES_SEED = (
+    ("Cat", "Cat", "CAT, CATS, KITTEN, KITTY, FELINE, DOMESTIC CAT"),
+    ("Dog", "Dog", "DOG, DOGS, PUPPY, PUP, CANINE"),
+    ("Bird", "Other", "BIRD, PARAKEET, PARROT, BUDGIE, COCKATIEL"),
+    ("Rabbit", "Other", "RABBIT, BUNNY"),
+    ("Small Animal", "Other", "GUINEA PIG, HAMSTER, GERBIL, FERRET, RAT, MOUSE"),
+    ("Reptile", "Other", "REPTILE, SNAKE, PYTHON, LIZARD, TURTLE, TORTOISE"),
+    ("Other", "Other", "OTHER"),
+)
+
+BATCH_SIZE = 2000
+
+
+def _key(text):
+    return " ".join((text or "").upper().split())
+
+
+def ensure_species_table(connection):
+    """
+    Create SPECIES with the seed rows and PET.species_id if needed.
+    Safe to call every time at startup.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS SPECIES (
+                species_id  SMALLINT AUTO_INCREMENT PRIMARY KEY,
+                name        VARCHAR(50) NOT NULL UNIQUE,
+                category    VARCHAR(20) NOT NULL,
+                aliases     VARCHAR(500) NOT NULL DEFAULT ''
+            )
+        """)
+        cursor.execute("SELECT name FROM SPECIES")
+        existing = {name for (name,) in cursor.fetchall()}
+        for name, category, aliases in SPECIES_SEED:
+            if name in existing:
+                continue
+            cursor.execute("INSERT IGNORE INTO SPECIES (name, category, aliases) "
+                           "VALUES (%s, %s, %s)", (name, category, aliases))
+            if cursor.rowcount:
+                record_change(cursor, "SPECIES", "insert", cursor.lastrowid)
+        connection.commit()
+    finally:
+        cursor.close()
+    ensure_column(connection, "PET", "species_id", "SMALLINT NULL")
+    ensure_index(connection, "PET", "idx_pet_species_id", "species_id")
+    ensure_index(connection, "PET", "idx_pet_branch_species_id",
+                 "shelter_branch_id, species_id")
+
+
+class SpeciesCatalog:
+    """The SPECIES table in memory: ids, names, categories and aliases."""
+
+    def __init__(self, rows):
+        self.names = {}             # species_id -> name
+        self.categories = {}        # species_id -> category
+        self._aliases = {}          # alias -> species_id
+        for species_id, name, category, aliases in rows:
+            self.names[species_id] = name
+            self.categories[species_id] = category
+            self._aliases[_key(name)] = species_id
+            for alias in aliases.split(","):
+                if alias.strip():
+                    self._aliases[_key(alias)] = species_id
+
+    @classmethod
+    def load(cls, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT species_id, name, category, aliases FROM SPECIES")
+            return cls(cursor.fetchall())
+        finally:
+            cursor.close()
+
+    def resolve(self, text):
+        """species_id for a name or alias, or None."""
+        return self._aliases.get(_key(text))
+
+    def category(self, species_id):
+        return self.categories.get(species_id, OTHER)
+
+    def other_id(self):
+        return self.resolve(OTHER)
+
+
+def map_species(connection, batch_size=BATCH_SIZE, only_missing=True):
+    """
+    Set PET.species_id from PET.species, batch_size pets per transaction.
+    Returns (pets changed, Counter of species texts no alias matched).
+    """
+    catalog = SpeciesCatalog.load(connection)
+    fallback = catalog.other_id()
+    missing = "AND species_id IS NULL" if only_missing else ""
+    unmapped = Counter()
+    changed = 0
+    after_id = 0
+    cursor = connection.cursor()
+    try:
+        while True:
+            cursor.execute(f"""
+                SELECT pet_id, species, species_id
+                FROM PET
+                WHERE pet_id > %s {missing}
+                ORDER BY pet_id
+                LIMIT %s
+            """, (after_id, batch_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            after_id = rows[-1][0]
+
+            updates = []
+            for pet_id, text, current in rows:
+                species_id = catalog.resolve(text)
+                if species_id is None:
+                    unmapped[_key(text)] += 1
+                    species_id = fallback
+                if species_id != current:
+                    updates.append((species_id, pet_id))
+            if updates:
+                cursor.executemany("UPDATE PET SET species_id = %s WHERE pet_id = %s",
+                                   updates)
+                record_changes(cursor, [("PET", "update", pet_id) for _, pet_id in updates])
+                changed += len(updates)
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return changed, unmapped
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Map PET.species onto the SPECIES table")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--all", action="store_true",
+                        help="re-map every pet, e.g. after adding aliases")
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        ensure_change_table(connection)
+        ensure_species_table(connection)
+        changed, unmapped = map_species(connection, args.batch_size, not args.all)
+    finally:
+        connection.close()
+
+    print(f"Mapped {changed} pet(s)")
+    if unmapped:
+        print(f"Species with no matching alias (counted as {OTHER}):")
+        for text, count in unmapped.most_common():
+            print(f"  {text or '(empty)':<30} {count}")
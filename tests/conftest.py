@@ -0,0 +1,164 @@
+# conftest.py - shared fixtures for the in-memory index tests
+#
+# The PET indexes only need a DB-API connection that understands the %s
+# placeholders mysql.connector uses; an in-memory SQLite database with the
+# columns they read stands in for the server.
+import os
+import random
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SCHEMA = """
+    CREATE TABLE SPECIES (
+        species_id  INTEGER PRIMARY KEY,
+        name        TEXT NOT NULL,
+        category    TEXT NOT NULL,
+        aliases     TEXT NOT NULL DEFAULT ''
+    );
+    CREATE TABLE PET (
+        pet_id             INTEGER PRIMARY KEY,
+        name               TEXT,
+        gender             TEXT,
+        species            TEXT,
+        species_id         INTEGER,
+        breed              TEXT,
+        age                INTEGER,
+        age_months         INTEGER,
+        description        TEXT,
+        adoption_status    TEXT,
+        shelter_branch_id  INTEGER,
+        photo_hash         TEXT,
+        arrival_date       TEXT
+    );
+    CREATE TABLE DATA_CHANGE (
+        change_id   INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name  TEXT NOT NULL,
+        row_id      INTEGER NOT NULL,
+        op          TEXT NOT NULL
+    );
+"""
+SPECIES = ((1, "Cat", "Cat"), (2, "Dog", "Dog"), (3, "Bird", "Other"),
+           (4, "Rabbit", "Other"), (5, "Small Animal", "Other"))
+NAMES = ("Franky", "Luna", "Max", "Bella", "Milo", "Daisy", "Rocky", "Coco")
+BREEDS = {1: ("DSH", "DMH", "SIAMESE MIX"), 2: ("LAB RETR", "AM PIT BULL TER", "BEAGLE"),
+          3: ("PARAKEET",), 4: ("LOP", "REX"), 5: ("GUINEA PIG", "HAMSTER")}
+# descriptions use the intake export format "AGE, SIZE, COLOR"
+COLORS = ("BLACK", "WHITE", "GRAY / WHITE", "ORG", "BRN TABBY", "TORTIE")
+SIZES = ("SMALL", "MED", "LARGE", "TOY", "X-LRG")
+STATUSES = ("Available", "Available", "Adopted", "Pending")
+
+
+class Cursor:
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+
+    def execute(self, sql, params=()):
+        self._cursor.execute(sql.replace("%s", "?"), tuple(params))
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    """sqlite3 behind the cursor interface the indexes use."""
+
+    def __init__(self):
+        self.db = sqlite3.connect(":memory:")
+        self.db.executescript(SCHEMA)
+        self.db.executemany("INSERT INTO SPECIES (species_id, name, category) VALUES (?, ?, ?)",
+                            SPECIES)
+
+    def cursor(self):
+        return Cursor(self.db)
+
+    # ---------- test helpers ----------
+    def pet_row(self, rng, pet_id):
+        species_id = rng.choice([s[0] for s in SPECIES] + [None])
+        species = dict((s[0], s[1]) for s in SPECIES).get(species_id, "Other")
+        months = rng.choice([None, rng.randrange(1, 150)])
+        if months is None:
+            age_text = "NO AGE"
+        elif months < 12:
+            age_text = f"{months} MONTHS"
+        else:
+            age_text = f"{months // 12} YEAR {months % 12} MONTHS"
+        description = ", ".join((
+            age_text,
+            rng.choice(SIZES) if rng.random() < 0.8 else "",
+            rng.choice(COLORS) if rng.random() < 0.8 else ""))
+        return {
+            "pet_id": pet_id,
+            "name": rng.choice(NAMES),
+            "gender": rng.choice(("M", "F", None)),
+            "species": species.upper() if rng.random() < 0.5 else species,
+            "species_id": species_id,
+            "breed": rng.choice(BREEDS.get(species_id, ("MIX",))),
+            "age": None if months is None else months // 12,
+            "age_months": months,
+            "description": description,
+            "adoption_status": rng.choice(STATUSES),
+            "shelter_branch_id": rng.choice((1, 2, 3, None)),
+            "photo_hash": None,
+            "arrival_date": f"2024-{rng.randrange(1, 13):02}-{rng.randrange(1, 29):02}",
+        }
+
+    def put_pet(self, row, op="insert"):
+        columns = ", ".join(row)
+        marks = ", ".join("?" * len(row))
+        self.db.execute(f"INSERT OR REPLACE INTO PET ({columns}) VALUES ({marks})",
+                        tuple(row.values()))
+        self.log("PET", op, row["pet_id"])
+
+    def delete_pet(self, pet_id):
+        self.db.execute("DELETE FROM PET WHERE pet_id = ?", (pet_id,))
+        self.log("PET", "delete", pet_id)
+
+    def log(self, table_name, op, row_id):
+        self.db.execute("INSERT INTO DATA_CHANGE (table_name, row_id, op) VALUES (?, ?, ?)",
+                        (table_name, row_id, op))
+
+    def last_change_id(self):
+        return self.db.execute("SELECT COALESCE(MAX(change_id), 0) FROM DATA_CHANGE").fetchone()[0]
+
+    def churn(self, rng, count):
+        """Update, delete and insert some pets; returns the pet ids touched."""
+        ids = [pet_id for (pet_id,) in self.db.execute("SELECT pet_id FROM PET")]
+        next_id = max(ids, default=0) + 1
+        touched = []
+        for _ in range(count):
+            roll = rng.random()
+            if roll < 0.4 and ids:
+                pet_id = rng.choice(ids)
+                self.put_pet(self.pet_row(rng, pet_id), "update")
+            elif roll < 0.6 and ids:
+                pet_id = ids.pop(rng.randrange(len(ids)))
+                self.delete_pet(pet_id)
+            else:
+                pet_id = next_id
+                next_id += 1
+                ids.append(pet_id)
+                self.put_pet(self.pet_row(rng, pet_id))
+            touched.append(pet_id)
+        return touched
+
+
+@pytest.fixture
+def rng():
+    return random.Random(20240611)
+
+
+@pytest.fixture
+def pet_db(rng):
+    """An in-memory database with 300 random pets and an empty change log."""
+    connection = Connection()
+    for pet_id in range(1, 301):
+        connection.put_pet(connection.pet_row(rng, pet_id))
+    connection.db.execute("DELETE FROM DATA_CHANGE")
+    return connection
@@ -0,0 +1,70 @@
+import pytest
+
+from age_aggregates import ANY, AgeAggregates
+
+BRANCHES = (1, 2, None)
+SPECIES = (1, 2, 3, None)
+
+
+def naive_stats(pets, branch_id=ANY, species_id=ANY, available=False):
+    """(count, total, min, max) over the pets of one group, recomputed."""
+    ages = [age for age, branch, species, avail in pets.values()
+            if age is not None
+            and (branch_id == ANY or branch == branch_id)
+            and (species_id == ANY or species == species_id)
+            and (avail or not available)]
+    return len(ages), sum(ages), min(ages, default=None), max(ages, default=None)
+
+
+def check_against_naive(aggregates, pets):
+    for available in (False, True):
+        for branch_id in (ANY,) + BRANCHES:
+            for species_id in (ANY,) + SPECIES:
+                stats = aggregates.stats(branch_id, species_id, available)
+                assert (stats.count, stats.total, stats.min, stats.max) == \
+                    naive_stats(pets, branch_id, species_id, available)
+            by_species = aggregates.by_species(branch_id, available)
+            expected = {species_id: naive_stats(pets, branch_id, species_id, available)
+                        for species_id in SPECIES}
+            assert {species_id: (s.count, s.total, s.min, s.max)
+                    for species_id, s in by_species.items()} == \
+                {species_id: found for species_id, found in expected.items() if found[0]}
+
+
+def random_pet(rng):
+    return (rng.choice([None] + list(range(0, 16))), rng.choice(BRANCHES),
+            rng.choice(SPECIES), rng.random() < 0.5)
+
+
+def test_build_matches_naive(rng):
+    pets = {pet_id: random_pet(rng) for pet_id in range(200)}
+    aggregates = AgeAggregates()
+    aggregates.build((pet_id, *values) for pet_id, values in pets.items())
+    check_against_naive(aggregates, pets)
+
+
+def test_changes_match_naive(rng):
+    pets = {pet_id: random_pet(rng) for pet_id in range(200)}
+    aggregates = AgeAggregates()
+    aggregates.build((pet_id, *values) for pet_id, values in pets.items())
+    # enough removals that the heaps get compacted along the way
+    for step in range(3000):
+        pet_id = rng.randrange(260)
+        if rng.random() < 0.3:
+            pets.pop(pet_id, None)
+            aggregates.remove(pet_id)
+        else:
+            pets[pet_id] = random_pet(rng)
+            aggregates.set_pet(pet_id, *pets[pet_id])
+        if step % 250 == 0:
+            check_against_naive(aggregates, pets)
+    check_against_naive(aggregates, pets)
+
+
+def test_avg_and_empty_group():
+    aggregates = AgeAggregates()
+    aggregates.build([(1, 2, 1, 1, True), (2, 5, 1, 1, False), (3, None, 1, 1, True)])
+    assert aggregates.stats(1, 1).avg == pytest.approx(3.5)
+    assert aggregates.stats(1, 1, available=True).avg == 2
+    empty = aggregates.stats(2)
+    assert (empty.count, empty.min, empty.max, empty.avg) == (0, None, None, None)
@@ -0,0 +1,91 @@
+from itertools import combinations
+
+import pytest
+
+from pet_duplicates import (DUP_COLUMNS, THRESHOLD, DuplicateIndex, band_keys,
+                            find_duplicate_pairs, shingles, signatures, similarity)
+from pet_index import PetIndex
+
+
+def add_copies(connection, rng, count):
+    """Re-enter some pets under "*NAME", as intake does; returns (original, copy) ids."""
+    rows = connection.db.execute("SELECT * FROM PET ORDER BY pet_id").fetchall()
+    columns = [d[0] for d in connection.db.execute("SELECT * FROM PET").description]
+    next_id = rows[-1][0] + 1
+    copies = []
+    for row in rng.sample(rows, count):
+        copy = dict(zip(columns, row), pet_id=next_id)
+        copy["name"] = "*" + copy["name"].upper()
+        connection.put_pet(copy)
+        copies.append((row[0], next_id))
+        next_id += 1
+    return copies
+
+
+def signed(rows):
+    """{pet_id: (signature, band keys)} of the rows with any shingles."""
+    kept = [row for row in rows if shingles(*row[1:])]
+    sigs = signatures([shingles(*row[1:]) for row in kept])
+    return {row[0]: (sig, keys) for row, sig, keys in zip(kept, sigs, band_keys(sigs))}
+
+
+def naive_pairs(rows, threshold=THRESHOLD):
+    """Every pair sharing an LSH bucket with similarity >= threshold, compared one by one."""
+    found = {}
+    for (a, (sig_a, keys_a)), (b, (sig_b, keys_b)) in combinations(signed(rows).items(), 2):
+        if (keys_a == keys_b).any() and similarity(sig_a, sig_b) >= threshold:
+            found[(min(a, b), max(a, b))] = similarity(sig_a, sig_b)
+    return found
+
+
+def test_pairs_match_naive_comparison(pet_db, rng):
+    copies = add_copies(pet_db, rng, 15)
+    rows = pet_db.db.execute(f"SELECT {DUP_COLUMNS} FROM PET").fetchall()
+
+    found = find_duplicate_pairs(rows)
+    assert {(a, b): score for a, b, score in found} == pytest.approx(naive_pairs(rows))
+    assert [score for _, _, score in found] == sorted((s for _, _, s in found), reverse=True)
+    # exact re-entries are always caught
+    pairs = {(a, b) for a, b, _ in found}
+    assert all((min(pair), max(pair)) in pairs for pair in copies)
+
+
+def naive_candidates(connection, record, threshold=THRESHOLD):
+    rows = connection.db.execute(f"SELECT {DUP_COLUMNS} FROM PET").fetchall()
+    sig = signatures([shingles(*record)])
+    keys = band_keys(sig)[0]
+    return {pet_id: similarity(sig[0], other_sig)
+            for pet_id, (other_sig, other_keys) in signed(rows).items()
+            if (keys == other_keys).any() and similarity(sig[0], other_sig) >= threshold}
+
+
+def check_candidates(index, connection):
+    rows = connection.db.execute(f"SELECT {DUP_COLUMNS} FROM PET ORDER BY pet_id").fetchall()
+    for row in rows[::5]:
+        record = ("*" + (row[1] or ""), *row[2:])
+        assert dict(index.candidates(*record)) == pytest.approx(
+            naive_candidates(connection, record))
+
+
+def test_candidates_after_refresh_and_catch_up(pet_db, rng):
+    add_copies(pet_db, rng, 10)
+    index = DuplicateIndex()
+    index.load(pet_db, pet_db.last_change_id())
+    check_candidates(index, pet_db)
+
+    index.refresh_pets(pet_db, pet_db.churn(rng, 40))
+    check_candidates(index, pet_db)
+
+    pet_db.churn(rng, 40)
+    index.catch_up(pet_db)
+    assert index.change_id == pet_db.last_change_id()
+    check_candidates(index, pet_db)
+
+
+def test_index_without_upsert_cannot_be_built():
+    class Incomplete(PetIndex):
+        def remove(self, pet_id):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
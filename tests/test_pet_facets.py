@@ -0,0 +1,74 @@
+from pet_facets import FACET_SQL, FACETS, UNKNOWN, FacetIndex, facet_values
+
+
+def naive_filter(connection, selection, within=None):
+    """filter() one pet at a time: (matching pet ids, {facet: {value: count}})."""
+    pets = {row[0]: facet_values(row) for row in connection.db.execute(FACET_SQL)}
+    within = within or {}
+    base = {pet_id: values for pet_id, values in pets.items()
+            if all(values[facet] in wanted for facet, wanted in within.items())}
+
+    def matches(values, skip=None):
+        return all(values[facet] in wanted for facet, wanted in selection.items()
+                   if wanted and facet != skip)
+
+    counts = {}
+    for facet in FACETS:
+        # every value some pet has is listed, with 0 if the other filters hide it
+        counts[facet] = {values[facet]: 0 for values in pets.values()}
+        for values in base.values():
+            if matches(values, skip=facet):
+                counts[facet][values[facet]] += 1
+    return {pet_id for pet_id, values in base.items() if matches(values)}, counts
+
+
+def check_against_naive(index, connection, selections):
+    for selection, within in selections:
+        bits, counts = index.filter(selection, within)
+        pet_ids, expected = naive_filter(connection, selection, within)
+        assert counts == expected
+        assert [row[0] for row in index.rows(bits)] == sorted(pet_ids)
+        assert bits.bit_count() == len(pet_ids)
+
+
+SELECTIONS = [
+    ({}, None),
+    ({"species": {"Cat"}}, None),
+    ({"species": {"Cat", "Dog"}, "status": {"Available"}}, None),
+    ({"age": {"Under 6 months", "6-12 months"}, "gender": {"F"}}, {"branch": {1}}),
+    ({"branch": {2, UNKNOWN}, "gender": set()}, None),
+    ({"breed": {"BEAGLE"}, "age": {UNKNOWN}}, {"branch": {3}}),
+]
+
+
+def test_counts_match_naive(pet_db):
+    index = FacetIndex()
+    index.load(pet_db, pet_db.last_change_id())
+    check_against_naive(index, pet_db, SELECTIONS)
+
+
+def test_counts_after_refresh_pets(pet_db, rng):
+    index = FacetIndex()
+    index.load(pet_db, pet_db.last_change_id())
+    # deletes free slots that the inserts then reuse
+    index.refresh_pets(pet_db, pet_db.churn(rng, 80))
+    check_against_naive(index, pet_db, SELECTIONS)
+    index.refresh_pets(pet_db, pet_db.churn(rng, 80))
+    check_against_naive(index, pet_db, SELECTIONS)
+
+
+def test_counts_after_catch_up(pet_db, rng):
+    index = FacetIndex()
+    index.load(pet_db, pet_db.last_change_id())
+    pet_db.churn(rng, 120)
+    index.catch_up(pet_db)
+    assert index.change_id == pet_db.last_change_id()
+    check_against_naive(index, pet_db, SELECTIONS)
+
+
+def test_rows_limit_keeps_pet_id_order(pet_db):
+    index = FacetIndex()
+    index.load(pet_db)
+    bits, _ = index.filter({"status": {"Available"}})
+    rows = index.rows(bits, limit=10)
+    assert [row[0] for row in rows] == [row[0] for row in index.rows(bits)][:10]
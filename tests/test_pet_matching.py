@@ -0,0 +1,127 @@
+import math
+import random
+
+import pytest
+
+from description_parser import normalize_size, parse_description
+from pet_matching import (W_AGE, W_GENDER, W_SIZE, W_WORDS, MatchEngine,
+                          parse_preferences, pet_words, species_name)
+
+SPECIES = ("Cat", "CAT", "kitten", "Dog", "puppy", "Rabbit", "bunny", "Small Animal",
+           "Guinea Pig", "Bird", None)
+BREEDS = ("DSH", "SIAMESE", "LAB RETR", "AM PIT BULL TER", "LOP", None)
+AGES = ("NO AGE", "3 MONTHS", "1 YEAR 2 MONTHS", "4 YEARS", "9 YEARS")
+SIZES = ("SMALL", "MED", "LARGE", "")
+COLORS = ("BLACK", "GRAY / WHITE", "BRN TABBY", "")
+PREFERENCES = (
+    "small female cat under 2 years, black or gray",
+    "a kitten", "puppy", "large dog 2-5 years", "bunny please", "rabbit or guinea pig",
+    "hamster", "senior", "male, brown tabby", "young small animal", "any friendly pet",
+    "lab retriever over 3 years", "bird", "",
+)
+
+
+def random_pets(rng, count):
+    return [(pet_id, rng.choice(SPECIES), rng.choice(BREEDS), rng.choice(("M", "F", None)),
+             rng.choice((None, 0, 1, 3, 8)),
+             ", ".join((rng.choice(AGES), rng.choice(SIZES), rng.choice(COLORS))))
+            for pet_id in range(1, count + 1)]
+
+
+def naive_score(criteria, pet, vocabulary):
+    """The documented scoring rules, for one adopter and one pet."""
+    _, species, breed, gender, age, description = pet
+    parsed = parse_description(description)
+    if criteria["species"] and species_name(species) not in criteria["species"]:
+        return -math.inf
+    score = 0.0
+    gender = (gender or "").upper()[:1] or None
+    if criteria["gender"] and gender:
+        score += W_GENDER if criteria["gender"] == gender else -W_GENDER
+    wanted_size = normalize_size(criteria["size"])
+    if wanted_size and parsed["size"]:
+        score += W_SIZE if wanted_size == parsed["size"] else -W_SIZE
+    months = parsed["age_months"]
+    if months is None and age is not None:
+        months = int(age) * 12
+    low, high = criteria["age_min"], criteria["age_max"]
+    if (low is not None or high is not None) and months is not None:
+        distance = max((low or 0) - months, months - (math.inf if high is None else high), 0)
+        score += W_AGE if distance == 0 else -min(distance / 12.0, W_AGE)
+    # only words some pet has can ever match, and only those count
+    words = {w for w in criteria["words"] if w in vocabulary}
+    common = words & pet_words(breed, parsed["color"])
+    return score + W_WORDS * len(common) / max(len(words), 1)
+
+
+def naive_matches(pets, adopters):
+    vocabulary = set().union(*(pet_words(p[2], parse_description(p[5])["color"]) for p in pets))
+    result = {}
+    for adopter_id, preferences in adopters:
+        criteria = parse_preferences(preferences)
+        scores = {pet[0]: naive_score(criteria, pet, vocabulary) for pet in pets}
+        result[adopter_id] = {pet_id: s for pet_id, s in scores.items() if math.isfinite(s)}
+    return result
+
+
+def test_scores_match_naive_pairs():
+    rng = random.Random(7)
+    pets = random_pets(rng, 250)
+    adopters = [(adopter_id, rng.choice(PREFERENCES)) for adopter_id in range(1, 120)]
+    engine = MatchEngine(pets, adopters)
+
+    found = engine.matches_for_adopters(k=len(pets))
+    expected = naive_matches(pets, adopters)
+    for adopter_id, _ in adopters:
+        assert dict(found[adopter_id]) == pytest.approx(expected[adopter_id], abs=1e-4)
+        scores = [score for _, score in found[adopter_id]]
+        assert scores == sorted(scores, reverse=True)
+
+    # the pet side is the same table read the other way
+    by_pet = engine.matches_for_pets(k=len(adopters))
+    for pet_id, matches in by_pet.items():
+        for adopter_id, score in matches:
+            assert score == pytest.approx(expected[adopter_id][pet_id], abs=1e-4)
+
+
+def test_top_k_is_the_best_k():
+    rng = random.Random(11)
+    pets = random_pets(rng, 300)
+    adopters = [(adopter_id, rng.choice(PREFERENCES)) for adopter_id in range(1, 40)]
+    found = MatchEngine(pets, adopters).matches_for_adopters(k=5)
+    expected = naive_matches(pets, adopters)
+    for adopter_id, matches in found.items():
+        best = sorted(expected[adopter_id].values(), reverse=True)[:5]
+        assert [score for _, score in matches] == pytest.approx(best, abs=1e-4)
+
+
+def test_species_words_match_every_spelling():
+    pets = [(1, "Rabbit", None, None, None, ""), (2, "bunny", None, None, None, ""),
+            (3, "Small Animal", None, None, None, ""), (4, "Guinea Pig", None, None, None, ""),
+            (5, "kitten", None, None, None, ""), (6, "CAT", None, None, None, ""),
+            (7, "Other", None, None, None, ""), (8, "Dog", None, None, None, "")]
+    adopters = [(1, "a bunny"), (2, "hamster or guinea pig"), (3, "cat")]
+    found = MatchEngine(pets, adopters).matches_for_adopters(k=10)
+    assert {pet_id for pet_id, _ in found[1]} == {1, 2}
+    assert {pet_id for pet_id, _ in found[2]} == {3, 4}
+    assert {pet_id for pet_id, _ in found[3]} == {5, 6}
+
+
+def test_size_and_age_rank_matching_pets_first():
+    pets = [(1, "Dog", None, "M", None, "2 YEARS, SMALL, BLACK"),
+            (2, "Dog", None, "M", None, "9 YEARS, SMALL, BLACK"),
+            (3, "Dog", None, "M", None, "2 YEARS, LARGE, BLACK"),
+            (4, "Cat", None, "M", None, "2 YEARS, SMALL, BLACK")]
+    found = MatchEngine(pets, [(1, "small dog 1-3 years")]).matches_for_adopters()
+    # right size and age, wrong size, wrong age; the cat is not a dog
+    assert [pet_id for pet_id, _ in found[1]] == [1, 3, 2]
+
+
+def test_no_adopters_or_no_pets():
+    pets = [(1, "Cat", "DSH", "F", 2, "1 YEAR, SMALL, BLACK")]
+    adopters = [(1, "small cat")]
+    assert MatchEngine(pets, []).matches_for_pets() == {1: []}
+    assert MatchEngine(pets, []).matches_for_adopters() == {}
+    assert MatchEngine([], adopters).matches_for_adopters() == {1: []}
+    assert MatchEngine([], adopters).matches_for_pets() == {}
+    assert MatchEngine([], []).matches_for_adopters() == {}
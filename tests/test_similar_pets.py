@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from similar_pets import PET_COLUMNS, SimilarPets, pet_vector
+
+
+def naive_similar(connection, pet_id, k, available_only=True):
+    """similar() one pet at a time: cosine of every other pet's vector."""
+    rows = connection.db.execute(f"SELECT {PET_COLUMNS} FROM PET").fetchall()
+    by_id = {row[0]: row for row in rows}
+    target = pet_vector(*[by_id[pet_id][i] for i in (2, 3, 4, 5)])
+    scores = {}
+    for other_id, _, species, breed, age, description, status in rows:
+        if other_id == pet_id:
+            continue
+        if available_only and (status or "Available") != "Available":
+            continue
+        score = float(np.dot(pet_vector(species, breed, age, description), target))
+        if score > 0:
+            scores[other_id] = score
+    return sorted(scores.values(), reverse=True)[:k], scores
+
+
+def check_against_naive(index, connection, k=8):
+    pet_ids = [pet_id for (pet_id,) in connection.db.execute("SELECT pet_id FROM PET")]
+    assert index.size == len(pet_ids)
+    for pet_id in pet_ids[::7]:
+        found = index.similar(pet_id, k)
+        best, scores = naive_similar(connection, pet_id, k)
+        # ties may come back in any order: compare the scores, and the ids by score
+        assert [score for _, score in found] == pytest.approx(best, abs=1e-5)
+        for other_id, score in found:
+            assert score == pytest.approx(scores[other_id], abs=1e-5)
+
+
+def test_similar_matches_naive_cosine(pet_db):
+    index = SimilarPets()
+    index.load(pet_db, pet_db.last_change_id())
+    check_against_naive(index, pet_db)
+
+
+def test_similar_after_refresh_and_catch_up(pet_db, rng):
+    index = SimilarPets()
+    index.load(pet_db, pet_db.last_change_id())
+
+    index.refresh_pets(pet_db, pet_db.churn(rng, 40))
+    check_against_naive(index, pet_db)
+
+    pet_db.churn(rng, 40)
+    index.catch_up(pet_db)
+    assert index.change_id == pet_db.last_change_id()
+    check_against_naive(index, pet_db)
+
+
+def test_similar_excludes_the_pet_and_unavailable_pets(pet_db):
+    index = SimilarPets()
+    index.load(pet_db)
+    unavailable = {pet_id for (pet_id,) in pet_db.db.execute(
+        "SELECT pet_id FROM PET WHERE adoption_status <> 'Available'")}
+    for pet_id in (1, 2, 3):
+        found = [other_id for other_id, _ in index.similar(pet_id, 20)]
+        assert pet_id not in found
+        assert not unavailable & set(found)
@@ -0,0 +1,341 @@
+# trend_rollups.py - weekly / monthly intake and adoption counts
+#
+# TREND_ROLLUP holds, per period (week starting Monday, or month), branch
+# and species:
+#   intake     pets by arrival_date
+#   adoptions  approved applications by decision_date
+#
+# The counts are kept up to date incrementally. TREND_CONTRIB remembers what
+# each pet / application last contributed (day, branch, species); on update
+# only rows logged in DATA_CHANGE after the ROLLUP_STATE high-water mark are
+# re-read, their old contribution is subtracted and the new one added. Reads
+# go through the *_all views, so archiving (pet_archive.py) does not remove
+# anything from the trends.
+#
+# Run:  python trend_rollups.py [--rebuild]
+import argparse
+from collections import Counter
+from datetime import timedelta
+
+import mysql.connector
+
+from change_tracking import ensure_change_table
+from db_config import DB_CONFIG
+from pet_archive import ensure_archive_tables
+
+STATE_NAME = "trend"
+
+# change_ids are assigned at INSERT but become visible at COMMIT, so a slow
+# transaction can commit an id below the high-water mark. Re-reading the
+# last few ids is harmless (a row whose contribution has not changed is
+# skipped) and picks those up.
+REPLAY_CHANGES = 50
+
+
+def ensure_rollup_tables(connection):
+    """
+    Create TREND_ROLLUP, TREND_CONTRIB and ROLLUP_STATE if needed.
+    Safe to call every time at startup.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS TREND_ROLLUP (
+                period_type   ENUM('week', 'month') NOT NULL,
+                period_start  DATE NOT NULL,
+                branch_id     INT NOT NULL,
+                species       VARCHAR(50) NOT NULL,
+                intake        INT NOT NULL DEFAULT 0,
+                adoptions     INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (period_type, period_start, branch_id, species),
+                KEY idx_trend_branch (period_type, branch_id, period_start)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS TREND_CONTRIB (
+                source     ENUM('intake', 'adoption') NOT NULL,
+                row_id     INT NOT NULL,
+                pet_id     INT NOT NULL,
+                day        DATE NOT NULL,
+                branch_id  INT NOT NULL,
+                species    VARCHAR(50) NOT NULL,
+                PRIMARY KEY (source, row_id),
+                KEY idx_contrib_pet (pet_id)
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ROLLUP_STATE (
+                name            VARCHAR(32) PRIMARY KEY,
+                last_change_id  BIGINT NOT NULL
+            )
+        """)
+        connection.commit()
+    finally:
+        cursor.close()
+
+
+def _species(value):
+    return (value or "").strip() or "Unknown"
+
+
+def _period_starts(day):
+    """[(period_type, period_start)] for one date."""
+    return [("week", day - timedelta(days=day.weekday())),
+            ("month", day.replace(day=1))]
+
+
+def _begin(connection):
+    """Start a transaction explicitly on autocommit connections."""
+    if connection.autocommit:
+        connection.start_transaction()
+
+
+def _in_list(values):
+    return ", ".join(["%s"] * len(values))
+
+
+def _current_contribs(cursor, pet_ids, app_ids):
+    """
+    {(source, row_id): (pet_id, day, branch_id, species)} as the rows are now.
+    """
+    result = {}
+    if pet_ids:
+        ids = list(pet_ids)
+        cursor.execute(f"""
+            SELECT pet_id, arrival_date, shelter_branch_id, species
+            FROM pet_all
+            WHERE pet_id IN ({_in_list(ids)}) AND arrival_date IS NOT NULL
+        """, ids)
+        for pet_id, day, branch_id, species in cursor.fetchall():
+            result[("intake", pet_id)] = (pet_id, day, branch_id or 0, _species(species))
+
+    if pet_ids or app_ids:
+        conds, params = [], []
+        if app_ids:
+            conds.append(f"a.application_id IN ({_in_list(app_ids)})")
+            params += list(app_ids)
+        if pet_ids:
+            conds.append(f"a.pet_id IN ({_in_list(pet_ids)})")
+            params += list(pet_ids)
+        cursor.execute(f"""
+            SELECT a.application_id, a.pet_id, a.decision_date,
+                   p.shelter_branch_id, p.species
+            FROM adoption_application_all a
+            JOIN pet_all p ON p.pet_id = a.pet_id
+            WHERE a.status = 'Approved' AND a.decision_date IS NOT NULL
+              AND ({" OR ".join(conds)})
+        """, params)
+        for app_id, pet_id, day, branch_id, species in cursor.fetchall():
+            result[("adoption", app_id)] = (pet_id, day, branch_id or 0, _species(species))
+    return result
+
+
+def _stored_contribs(cursor, pet_ids, app_ids):
+    conds, params = [], []
+    if pet_ids:
+        conds.append(f"pet_id IN ({_in_list(pet_ids)})")
+        params += list(pet_ids)
+    if app_ids:
+        conds.append(f"(source = 'adoption' AND row_id IN ({_in_list(app_ids)}))")
+        params += list(app_ids)
+    if not conds:
+        return {}
+    cursor.execute(f"""
+        SELECT source, row_id, pet_id, day, branch_id, species
+        FROM TREND_CONTRIB
+        WHERE {" OR ".join(conds)}
+    """, params)
+    return {(source, row_id): (pet_id, day, branch_id, species)
+            for source, row_id, pet_id, day, branch_id, species in cursor.fetchall()}
+
+
+def _apply(cursor, stored, current):
+    """Write the difference between stored and current contributions."""
+    deltas = Counter()
+    upserts, deletes = [], []
+    for key in stored.keys() | current.keys():
+        old, new = stored.get(key), current.get(key)
+        if old == new:
+            continue
+        source, row_id = key
+        column = 0 if source == "intake" else 1
+        for contrib, sign in ((old, -1), (new, 1)):
+            if contrib is None:
+                continue
+            _, day, branch_id, species = contrib
+            for period_type, start in _period_starts(day):
+                deltas[(period_type, start, branch_id, species, column)] += sign
+        if new is None:
+            deletes.append(key)
+        else:
+            upserts.append((source, row_id) + new)
+
+    rows = {}
+    for (period_type, start, branch_id, species, column), n in deltas.items():
+        if n:
+            key = (period_type, start, branch_id, species)
+            intake, adoptions = rows.get(key, (0, 0))
+            rows[key] = (intake + n, adoptions) if column == 0 else (intake, adoptions + n)
+    if rows:
+        cursor.executemany("""
+            INSERT INTO TREND_ROLLUP
+                (period_type, period_start, branch_id, species, intake, adoptions)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            ON DUPLICATE KEY UPDATE intake = intake + VALUES(intake),
+                                    adoptions = adoptions + VALUES(adoptions)
+        """, [key + counts for key, counts in rows.items()])
+    if upserts:
+        cursor.executemany("""
+            REPLACE INTO TREND_CONTRIB (source, row_id, pet_id, day, branch_id, species)
+            VALUES (%s, %s, %s, %s, %s, %s)
+        """, upserts)
+    if deletes:
+        cursor.executemany(
+            "DELETE FROM TREND_CONTRIB WHERE source = %s AND row_id = %s", deletes
+        )
+    return len(upserts) + len(deletes)
+
+
+def rebuild_trend_rollups(connection):
+    """Recompute everything from pet_all / adoption_application_all."""
+    _begin(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT COALESCE(MAX(change_id), 0) FROM DATA_CHANGE")
+        high_water = cursor.fetchone()[0]
+        cursor.execute("DELETE FROM TREND_CONTRIB")
+        cursor.execute("DELETE FROM TREND_ROLLUP")
+        cursor.execute("""
+            INSERT INTO TREND_CONTRIB (source, row_id, pet_id, day, branch_id, species)
+            SELECT 'intake', pet_id, pet_id, arrival_date,
+                   COALESCE(shelter_branch_id, 0),
+                   COALESCE(NULLIF(TRIM(species), ''), 'Unknown')
+            FROM pet_all
+            WHERE arrival_date IS NOT NULL
+        """)
+        cursor.execute("""
+            INSERT INTO TREND_CONTRIB (source, row_id, pet_id, day, branch_id, species)
+            SELECT 'adoption', a.application_id, a.pet_id, a.decision_date,
+                   COALESCE(p.shelter_branch_id, 0),
+                   COALESCE(NULLIF(TRIM(p.species), ''), 'Unknown')
+            FROM adoption_application_all a
+            JOIN pet_all p ON p.pet_id = a.pet_id
+            WHERE a.status = 'Approved' AND a.decision_date IS NOT NULL
+        """)
+        for period_type, start_expr in (
+            ("week", "DATE_SUB(day, INTERVAL WEEKDAY(day) DAY)"),
+            ("month", "DATE_SUB(day, INTERVAL DAYOFMONTH(day) - 1 DAY)"),
+        ):
+            cursor.execute(f"""
+                INSERT INTO TREND_ROLLUP
+                    (period_type, period_start, branch_id, species, intake, adoptions)
+                SELECT %s, {start_expr}, branch_id, species,
+                       SUM(source = 'intake'), SUM(source = 'adoption')
+                FROM TREND_CONTRIB
+                GROUP BY {start_expr}, branch_id, species
+            """, (period_type,))
+        cursor.execute("""
+            REPLACE INTO ROLLUP_STATE (name, last_change_id) VALUES (%s, %s)
+        """, (STATE_NAME, high_water))
+        connection.commit()
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def update_trend_rollups(connection):
+    """
+    Apply PET / ADOPTION_APPLICATION changes logged since the last run.
+    Runs a full rebuild the first time. Returns the number of contribution
+    rows changed. The ROLLUP_STATE row lock keeps concurrent clients from
+    applying the same changes twice.
+    """
+    _begin(connection)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "SELECT last_change_id FROM ROLLUP_STATE WHERE name = %s FOR UPDATE",
+            (STATE_NAME,)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            connection.rollback()
+            rebuild_trend_rollups(connection)
+            return -1
+        high_water = row[0]
+
+        cursor.execute("""
+            SELECT table_name, row_id, change_id
+            FROM DATA_CHANGE
+            WHERE table_name IN ('PET', 'ADOPTION_APPLICATION')
+              AND change_id > %s
+        """, (max(high_water - REPLAY_CHANGES, 0),))
+        changes = cursor.fetchall()
+        if not changes:
+            connection.rollback()
+            return 0
+
+        pet_ids = {r[1] for r in changes if r[0] == "PET"}
+        app_ids = {r[1] for r in changes if r[0] == "ADOPTION_APPLICATION"}
+        stored = _stored_contribs(cursor, pet_ids, app_ids)
+        current = _current_contribs(cursor, pet_ids, app_ids)
+        applied = _apply(cursor, stored, current)
+
+        cursor.execute(
+            "UPDATE ROLLUP_STATE SET last_change_id = %s WHERE name = %s",
+            (max(high_water, max(r[2] for r in changes)), STATE_NAME)
+        )
+        connection.commit()
+        return applied
+    except mysql.connector.Error:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def fetch_trend(connection, period_type, since, branch_id=None):
+    """
+    [(period_start, intake, adoptions)] from since onwards, oldest first,
+    summed over species (and branches unless branch_id is given).
+    """
+    sql = """
+        SELECT period_start, SUM(intake), SUM(adoptions)
+        FROM TREND_ROLLUP
+        WHERE period_type = %s AND period_start >= %s
+    """
+    params = [period_type, since]
+    if branch_id is not None:
+        sql += " AND branch_id = %s"
+        params.append(branch_id)
+    sql += " GROUP BY period_start ORDER BY period_start"
+    cursor = connection.cursor()
+    try:
+        cursor.execute(sql, params)
+        return [(start, int(intake), int(adoptions))
+                for start, intake, adoptions in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Update intake / adoption trend rollups")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute from scratch instead of applying new changes")
+    args = parser.parse_args()
+
+    connection = mysql.connector.connect(**DB_CONFIG)
+    try:
+        ensure_change_table(connection)
+        ensure_archive_tables(connection)
+        ensure_rollup_tables(connection)
+        if args.rebuild:
+            rebuild_trend_rollups(connection)
+            print("Trend rollups rebuilt")
+        else:
+            applied = update_trend_rollups(connection)
+            print("Trend rollups rebuilt" if applied < 0 else f"Applied {applied} change(s)")
+    finally:
+        connection.close()
@@ -3,7 +3,8 @@ from tkinter import ttk, messagebox, simpledialog
 import mysql.connector
 from datetime import date
 
-from auth_utils import fetch_all_users, update_user_role, update_user_password
+from auth_utils import USER_COLUMNS, fetch_all_users, update_user_password
+from change_tracking import record_changes
 
 BG = "#F5F5F7"
 CARD_BG = "#FFFFFF"
@@ -13,11 +14,124 @@ BORDER = "#E5E5EA"
 
 
 ROLE_CHOICES = ("pending", "staff", "manager", "admin")
+ROLE_FILTER_ALL = "all roles"
+PAGE_SIZE = 50
 
 
-def init_user_management(content, connection):
+def _placeholder_ssn(user_id) -> str:
+    """
+    STAFF.ssn is UNIQUE NOT NULL, so every staff row created from a user
+    account needs its own placeholder. Area 9xx is never issued.
+    """
+    digits = f"9{int(user_id):08d}"[-9:]
+    return f"{digits[:3]}-{digits[3:5]}-{digits[5:]}"
+
+
+def _split_name(user):
+    full_name = (user.get("full_name") or user["username"] or "").strip()
+    if full_name:
+        parts = full_name.split()
+        return parts[0], " ".join(parts[1:]) or "(none)"
+    return user["username"], "(none)"
+
+
+def apply_role_change(connection, users, new_role, branch_id=None, staff_title=None):
+    """
+    Change the role of several users in one transaction.
+    users are dicts with USER_COLUMNS keys (their current values).
+    Users becoming 'staff' get a STAFF row created, or their existing row
+    (matched by email) moved to branch_id / staff_title. Pass branch_id=None
+    to only change the role.
+    Returns usernames for which no staff row could be created (no email).
+    """
+    skipped = []
+    cur = connection.cursor()
+    try:
+        placeholders = ", ".join(["%s"] * len(users))
+        cur.execute(
+            f"UPDATE USER_ACCOUNT SET role = %s WHERE user_id IN ({placeholders})",
+            (new_role, *[u["user_id"] for u in users]),
+        )
+
+        new_staff = [u for u in users if new_role == "staff" and u["role"] != "staff"]
+        if new_staff and branch_id is not None:
+            skipped = [u["username"] for u in new_staff if not u.get("email")]
+            new_staff = [u for u in new_staff if u.get("email")]
+
+        if new_staff and branch_id is not None:
+            # If a staff row already exists for this email, just update branch/role
+            emails = [u["email"] for u in new_staff]
+            placeholders = ", ".join(["%s"] * len(emails))
+            cur.execute(
+                f"SELECT staff_id, email FROM staff WHERE email IN ({placeholders})",
+                tuple(emails),
+            )
+            existing = {email: staff_id for staff_id, email in cur.fetchall()}
+
+            updates = [(staff_title, branch_id, existing[u["email"]])
+                       for u in new_staff if u["email"] in existing]
+            inserts = []
+            for u in new_staff:
+                if u["email"] in existing:
+                    continue
+                first_name, last_name = _split_name(u)
+                inserts.append((
+                    first_name,
+                    last_name,
+                    u["email"],
+                    u.get("phone") or "",
+                    staff_title,
+                    u["created_at"].date(),    # hire date = account creation
+                    _placeholder_ssn(u["user_id"]),
+                    branch_id,
+                ))
+
+            changes = [("STAFF", "update", staff_id) for _, _, staff_id in updates]
+            if updates:
+                cur.executemany(
+                    """
+                    UPDATE staff
+                       SET role = %s,
+                           shelter_branch_id = %s
+                     WHERE staff_id = %s
+                    """,
+                    updates,
+                )
+            if inserts:
+                cur.executemany(
+                    """
+                    INSERT INTO staff
+                    (first_name, last_name, email, phone,
+                     role, hire_date, ssn, shelter_branch_id)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                    """,
+                    inserts,
+                )
+                new_emails = [row[2] for row in inserts]
+                placeholders = ", ".join(["%s"] * len(new_emails))
+                cur.execute(
+                    f"SELECT staff_id FROM staff WHERE email IN ({placeholders})",
+                    tuple(new_emails),
+                )
+                changes += [("STAFF", "insert", staff_id) for (staff_id,) in cur.fetchall()]
+            record_changes(cur, changes)
+
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cur.close()
+    return skipped
+
+
+def init_user_management(content, connection, audit=None, on_commit=None):
     """
     Creates the User Management frame (admin-only).
+    on_commit: called after this page commits on connection (the app's
+    read-your-own-writes bookkeeping, e.g. DatabaseRouter.mark_write).
+    audit: an audit_log.AuditLog that role changes, password resets and
+    deletions are recorded in.
     Returns dict with:
       {
         "frame": <Frame>,
@@ -27,6 +141,10 @@ def init_user_management(content, connection):
     frame = tk.Frame(content, bg=BG)
     frame.grid(row=0, column=0, sticky="nsew")
 
+    def committed():
+        if on_commit is not None:
+            on_commit()
+
     # Title
     tk.Label(
         frame,
@@ -53,14 +171,40 @@ def init_user_management(content, connection):
         font=("Segoe UI", 11, "bold")
     ).pack(anchor="w", padx=24, pady=(16, 4))
 
+    # Search / role filter bar
+    filter_row = tk.Frame(table_card, bg=CARD_BG)
+    filter_row.pack(fill="x", padx=24, pady=(0, 8))
+
+    search_var = tk.StringVar()
+    search_entry = tk.Entry(
+        filter_row,
+        textvariable=search_var,
+        bg="white",
+        fg=TEXT_PRIMARY,
+        relief="solid",
+        bd=1,
+        font=("Segoe UI", 10)
+    )
+    search_entry.pack(side="left", fill="x", expand=True, ipady=3, padx=(0, 8))
+
+    role_filter_var = tk.StringVar(value=ROLE_FILTER_ALL)
+    ttk.Combobox(filter_row, textvariable=role_filter_var, width=12,
+                 values=(ROLE_FILTER_ALL,) + ROLE_CHOICES,
+                 state="readonly").pack(side="left", padx=(0, 8))
+
     cols = ("UserID", "Username", "FullName", "Email", "Phone", "Role", "CreatedAt")
-    tree = ttk.Treeview(table_card, columns=cols, show="headings", height=16)
+    tree = ttk.Treeview(table_card, columns=cols, show="headings", height=16,
+                        selectmode="extended")
     for col, w in zip(cols, (70, 120, 150, 170, 100, 90, 160)):
         tree.heading(col, text=col)
         tree.column(col, width=w, anchor="w")
 
     scroll = tk.Scrollbar(table_card, orient="vertical", command=tree.yview)
     tree.configure(yscrollcommand=scroll.set)
+    # Paging controls (packed before the tree so they stay at the bottom)
+    page_row = tk.Frame(table_card, bg=CARD_BG)
+    page_row.pack(side="bottom", fill="x", padx=24, pady=(4, 12))
+
     tree.pack(side="left", fill="both", expand=True, padx=2, pady=(0, 4))
     scroll.pack(side="right", fill="y")
 
@@ -80,7 +224,13 @@ def init_user_management(content, connection):
         font=("Segoe UI", 11, "bold")
     ).pack(anchor="w", pady=(0, 10))
 
-    selected_user_id = {"value": None}
+    # "value" is the single selected user (password reset / delete),
+    # "all" every selected user_id (role changes).
+    selected_user_id = {"value": None, "all": []}
+
+    # Rows from the last refresh, keyed by user_id, so handlers can use the
+    # full user record without re-reading USER_ACCOUNT.
+    users_by_id = {}
 
     # Helper to add labeled read-only entry
     def ro_field(label_text):
@@ -123,8 +273,8 @@ def init_user_management(content, connection):
     role_combo.pack(fill="x", pady=(0, 6))
 
     def on_change_role():
-        uid = selected_user_id["value"]
-        if uid is None:
+        uids = selected_user_id["all"]
+        if not uids:
             messagebox.showwarning("No selection", "Select a user first.")
             return
 
@@ -134,107 +284,80 @@ def init_user_management(content, connection):
             return
 
         try:
-            # Get full user info (for hire_date, name, email, phone)
-            cur = connection.cursor(dictionary=True)
-            cur.execute("SELECT * FROM user_account WHERE user_id = %s", (uid,))
-            user_row = cur.fetchone()
-            cur.close()
+            # Full user info (for hire_date, name, email, phone) from the
+            # rows already loaded; only read the ones the page does not have.
+            user_rows = [users_by_id[str(u)] for u in uids if str(u) in users_by_id]
+            missing = [u for u in uids if str(u) not in users_by_id]
+            if missing:
+                cur = connection.cursor()
+                placeholders = ", ".join(["%s"] * len(missing))
+                cur.execute(
+                    f"SELECT {', '.join(USER_COLUMNS)} FROM user_account "
+                    f"WHERE user_id IN ({placeholders})",
+                    tuple(missing),
+                )
+                user_rows.extend(cur.fetchall())
+                cur.close()
 
-            if not user_row:
+            if not user_rows:
                 messagebox.showerror("Error", "User record not found.")
                 return
 
-            old_role = user_row["role"]
-
-            # Always update the role in user_account
-            update_user_role(connection, uid, new_role)
+            users = [dict(zip(USER_COLUMNS, r)) for r in user_rows]
+            new_staff = [u for u in users
+                         if new_role == "staff" and u["role"] != "staff"]
 
-            # If they are now staff (and weren't before), create/update staff row
-            if new_role == "staff" and old_role != "staff":
-                # Ask for branch and staff role (job title)
+            # Ask for branch and staff role (job title) once for the whole selection
+            branch_id = None
+            staff_title = None
+            if new_staff:
                 branch_id = simpledialog.askinteger(
                     "Branch ID",
-                    "Enter Branch ID for this staff member:",
+                    f"Enter Branch ID for {len(new_staff)} new staff member(s):",
                     parent=frame,
                     minvalue=1,
                 )
-                if branch_id is None:
-                    # User cancelled; role is changed, but no staff record
-                    messagebox.showinfo(
-                        "Role Updated",
-                        "Role changed to staff, but staff record was not created "
-                        "because no branch ID was provided."
+                if branch_id is not None:
+                    staff_title = simpledialog.askstring(
+                        "Staff Role",
+                        "Enter staff role / job title (e.g. 'Veterinarian'):",
+                        parent=frame,
                     )
-                    refresh()
-                    return
-
-                staff_title = simpledialog.askstring(
-                    "Staff Role",
-                    "Enter staff role / job title (e.g. 'Veterinarian'):",
-                    parent=frame,
+                    if not staff_title:
+                        staff_title = "Staff"
+
+            skipped = apply_role_change(
+                connection,
+                users,
+                new_role,
+                branch_id=branch_id,
+                staff_title=staff_title,
+            )
+            committed()
+            if audit is not None:
+                for u in users:
+                    audit.record("change_role", "USER_ACCOUNT", u["user_id"],
+                                 {"role": u["role"]}, {"role": new_role})
+
+            if new_staff and branch_id is None:
+                # User cancelled; role is changed, but no staff record
+                messagebox.showinfo(
+                    "Role Updated",
+                    "Role changed to staff, but staff records were not created "
+                    "because no branch ID was provided."
+                )
+            elif skipped:
+                messagebox.showinfo(
+                    "Role Updated",
+                    f"Role updated for {len(users)} user(s).\n"
+                    "No staff record was created for users without an email:\n"
+                    + ", ".join(skipped)
+                )
+            else:
+                messagebox.showinfo(
+                    "Role Updated",
+                    f"Role updated for {len(users)} user(s)."
                 )
-                if not staff_title:
-                    staff_title = "Staff"
-
-                # Build staff fields from user_account
-                full_name = (user_row.get("full_name") or user_row["username"] or "").strip()
-                if full_name:
-                    parts = full_name.split()
-                    first_name = parts[0]
-                    last_name = " ".join(parts[1:]) or "(none)"
-                else:
-                    first_name = user_row["username"]
-                    last_name = "(none)"
-
-                email = user_row.get("email") or ""
-                phone = user_row.get("phone") or ""
-                created_at = user_row["created_at"]      # datetime
-                hire_date = created_at.date()            # date only
-                ssn_default = "999-99-9999"
-
-                cur = connection.cursor(dictionary=True)
-
-                # If a staff row already exists for this email, just update branch/role
-                if email:
-                    cur.execute("SELECT staff_id FROM staff WHERE email = %s", (email,))
-                    existing = cur.fetchone()
-                else:
-                    existing = None
-
-                if existing:
-                    cur.execute(
-                        """
-                        UPDATE staff
-                           SET role = %s,
-                               shelter_branch_id = %s
-                         WHERE staff_id = %s
-                        """,
-                        (staff_title, branch_id, existing["staff_id"]),
-                    )
-                else:
-                    cur.execute(
-                        """
-                        INSERT INTO staff
-                        (first_name, last_name, email, phone,
-                         role, hire_date, ssn, shelter_branch_id)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                        """,
-                        (
-                            first_name,
-                            last_name,
-                            email,
-                            phone,
-                            staff_title,
-                            hire_date,
-                            ssn_default,
-                            branch_id,
-                        ),
-                    )
-
-                connection.commit()
-                cur.close()
-
-            messagebox.showinfo("Role Updated", "User role updated successfully.")
             refresh()
 
         except Exception as e:
@@ -284,6 +407,7 @@ def init_user_management(content, connection):
 
                 connection.commit()
                 cur.close()
+                committed()
             except Exception as e:
                 messagebox.showerror("Error", f"Could not insert staff row:\n{e}")
                 return
@@ -346,7 +470,7 @@ def init_user_management(content, connection):
     def on_reset_password():
         uid = selected_user_id["value"]
         if uid is None:
-            messagebox.showwarning("No selection", "Select a user first.")
+            messagebox.showwarning("No selection", "Select a single user first.")
             return
         p1 = pw1_var.get()
         p2 = pw2_var.get()
@@ -358,6 +482,9 @@ def init_user_management(content, connection):
             return
         try:
             update_user_password(connection, uid, p1)
+            committed()
+            if audit is not None:
+                audit.record("reset_password", "USER_ACCOUNT", uid)
             messagebox.showinfo("Password Reset", "Password updated successfully.")
             pw1_var.set("")
             pw2_var.set("")
@@ -388,7 +515,7 @@ def init_user_management(content, connection):
     def on_delete_user():
         uid = selected_user_id["value"]
         if uid is None:
-            messagebox.showwarning("No selection", "Select a user first.")
+            messagebox.showwarning("No selection", "Select a single user first.")
             return
         if not messagebox.askyesno(
             "Delete User",
@@ -396,18 +523,17 @@ def init_user_management(content, connection):
         ):
             return
         try:
+            # the row as the list loaded it; no extra read for the audit log
+            row = users_by_id.get(str(uid))
+            before = dict(zip(USER_COLUMNS, row)) if row is not None else None
             cur = connection.cursor()
             cur.execute("DELETE FROM USER_ACCOUNT WHERE user_id = %s", (uid,))
             connection.commit()
             cur.close()
+            committed()
+            if audit is not None:
+                audit.record("delete", "USER_ACCOUNT", uid, before)
             messagebox.showinfo("Deleted", "User deleted.")
-            selected_user_id["value"] = None
-            ent_username.config(state="normal")
-            ent_username.delete(0, "end")
-            ent_username.config(state="readonly")
-            ent_role.config(state="normal")
-            ent_role.delete(0, "end")
-            ent_role.config(state="readonly")
             refresh()
         except Exception as e:
             messagebox.showerror("Error", f"Could not delete user:\n{e}")
@@ -425,36 +551,116 @@ def init_user_management(content, connection):
     ).pack(fill="x", pady=(2, 0))
 
     # ---------- Refresh ----------
+    # Keyset paging state: after_id of every page visited so far
+    # (None for the first page) and whether a next page exists.
+    paging = {"starts": [None], "has_next": False}
+
+    def clear_selection():
+        # bulk actions (role change) use "all"; single-user ones need "value"
+        selected_user_id["value"] = None
+        selected_user_id["all"] = []
+        for entry in (ent_username, ent_role):
+            entry.config(state="normal")
+            entry.delete(0, "end")
+            entry.config(state="readonly")
+
     def refresh():
+        # the rows are reloaded (another page, filter or a deleted user):
+        # nothing selected before may still be on screen
+        clear_selection()
         for r in tree.get_children():
             tree.delete(r)
 
+        role_filter = role_filter_var.get()
         try:
-            users = fetch_all_users(connection)
+            users = fetch_all_users(
+                connection,
+                search=search_var.get().strip() or None,
+                role=None if role_filter == ROLE_FILTER_ALL else role_filter,
+                after_id=paging["starts"][-1],
+                limit=PAGE_SIZE + 1,
+            )
         except mysql.connector.Error as e:
             messagebox.showerror("Error", f"Could not load users:\n{e}")
             return
 
+        paging["has_next"] = len(users) > PAGE_SIZE
+        users = users[:PAGE_SIZE]
+
+        users_by_id.clear()
         for u in users:
+            user_id, username, full_name, email, phone, role, created_at = u
+            users_by_id[str(user_id)] = u
             tree.insert(
                 "",
                 "end",
                 values=(
-                    u["user_id"],
-                    u["username"],
-                    u["full_name"] or "",
-                    u["email"] or "",
-                    u["phone"] or "",
-                    u["role"],
-                    u["created_at"],
+                    user_id,
+                    username,
+                    full_name or "",
+                    email or "",
+                    phone or "",
+                    role,
+                    created_at,
                 ),
             )
 
+        page_label.config(text=f"Page {len(paging['starts'])}")
+        prev_btn.config(state="normal" if len(paging["starts"]) > 1 else "disabled")
+        next_btn.config(state="normal" if paging["has_next"] else "disabled")
+
+    def on_search(*_):
+        paging["starts"] = [None]
+        refresh()
+
+    def on_next_page():
+        children = tree.get_children()
+        if not paging["has_next"] or not children:
+            return
+        last_id = tree.item(children[-1], "values")[0]
+        paging["starts"].append(int(last_id))
+        refresh()
+
+    def on_prev_page():
+        if len(paging["starts"]) > 1:
+            paging["starts"].pop()
+            refresh()
+
+    tk.Button(filter_row, text="Search", command=on_search,
+              relief="flat", padx=10, cursor="hand2").pack(side="left")
+    search_entry.bind("<Return>", on_search)
+    role_filter_var.trace_add("write", lambda *_: on_search())
+
+    prev_btn = tk.Button(page_row, text="< Prev", command=on_prev_page,
+                         relief="flat", padx=10, cursor="hand2")
+    prev_btn.pack(side="left")
+    page_label = tk.Label(page_row, text="Page 1", bg=CARD_BG,
+                          fg=TEXT_SECONDARY, font=("Segoe UI", 9))
+    page_label.pack(side="left", padx=10)
+    next_btn = tk.Button(page_row, text="Next >", command=on_next_page,
+                         relief="flat", padx=10, cursor="hand2")
+    next_btn.pack(side="left")
+
     # When selecting a row
     def on_select(event):
         sel = tree.selection()
         if not sel:
             return
+        selected_user_id["all"] = [tree.item(i, "values")[0] for i in sel]
+        if len(sel) > 1:
+            # bulk actions (role change) use "all"; single-user ones need "value"
+            selected_user_id["value"] = None
+            ent_username.config(state="normal")
+            ent_username.delete(0, "end")
+            ent_username.insert(0, f"{len(sel)} users selected")
+            ent_username.config(state="readonly")
+            roles = {tree.item(i, "values")[5] for i in sel}
+            ent_role.config(state="normal")
+            ent_role.delete(0, "end")
+            ent_role.insert(0, ", ".join(sorted(roles)))
+            ent_role.config(state="readonly")
+            return
+
         item = tree.item(sel[0])
         vals = item["values"]
         if not vals: